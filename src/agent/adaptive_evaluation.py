@@ -0,0 +1,221 @@
+"""Adaptive repetitions - repeat an example only while its scores are uncertain.
+
+``--repetitions N`` runs every example N times whether its scores vary or
+not. In adaptive mode every example first runs ``min_repetitions`` times.
+After each round, the 95% confidence interval (Student t) of the mean of
+each evaluator score is computed per example. An example whose widest
+interval is still wider than ``target`` (half-width) is scheduled for as
+many further runs as its observed variance says it needs to get there, up
+to ``max_repetitions``. Deterministic examples stop at the minimum; noisy
+ones get the runs. With few distinct score values two runs can agree by
+chance, so raise ``min_repetitions`` for coarse judges.
+
+A global ``budget`` caps the graph runs of the whole evaluation. When a
+round asks for more than is left, the examples with the widest intervals
+are served first.
+
+``report()`` gives, per example, the runs made and each score's mean and
+interval half-width (None below two scores). It also gives the runs saved
+against running every example ``max_repetitions`` times.
+
+Usage:
+    python -m agent.run_evaluation --local data/golden_dataset.jsonl --adaptive --target-ci 0.1 --budget 200
+"""
+
+import math
+import statistics
+from typing import Any, AsyncIterator, Iterable, Iterator, Sequence
+
+from langchain_core.runnables import Runnable
+
+from agent.local_evaluation import (
+    DEFAULT_CONCURRENCY,
+    Evaluator,
+    Example,
+    aevaluate_runs,
+    iterate,
+    read_examples,
+)
+
+DEFAULT_TARGET = 0.1
+DEFAULT_MIN_REPETITIONS = 2
+DEFAULT_MAX_REPETITIONS = 10
+
+# Two-sided 95% Student t critical values by degrees of freedom; normal beyond
+# fmt: off
+_T95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+# fmt: on
+
+
+def _finite(value: float) -> float | None:
+    return None if math.isinf(value) else value
+
+
+def t_critical(df: int) -> float:
+    """Two-sided 95% Student t critical value."""
+    return _T95[df - 1] if df <= len(_T95) else 1.96
+
+
+def half_width(scores: Sequence[float]) -> float:
+    """Half-width of the 95% confidence interval of the mean (inf below two scores)."""
+    if len(scores) < 2:
+        return math.inf
+    return (
+        t_critical(len(scores) - 1) * statistics.stdev(scores) / math.sqrt(len(scores))
+    )
+
+
+class AdaptiveRepetitions:
+    """Schedule repetitions per example until its score intervals are tight."""
+
+    def __init__(
+        self,
+        evaluators: Sequence[Evaluator],
+        target: float = DEFAULT_TARGET,
+        min_repetitions: int = DEFAULT_MIN_REPETITIONS,
+        max_repetitions: int = DEFAULT_MAX_REPETITIONS,
+        budget: int | None = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        graph: Runnable | None = None,
+    ) -> None:
+        """Validate the bounds; no example has run yet."""
+        if target <= 0:
+            raise ValueError("target must be positive")
+        if not 1 <= min_repetitions <= max_repetitions:
+            raise ValueError("Need 1 <= min_repetitions <= max_repetitions")
+        self.evaluators = list(evaluators)
+        self.target = target
+        self.min_repetitions = min_repetitions
+        self.max_repetitions = max_repetitions
+        self.budget = budget
+        self.concurrency = concurrency
+        self.graph = graph
+        self.example_ids: list[str] = []
+        # example id -> runs made / evaluator key -> scores
+        self.runs: dict[str, int] = {}
+        self.scores: dict[str, dict[str, list[float]]] = {}
+
+    @property
+    def used(self) -> int:
+        """Graph runs made so far, across all examples."""
+        return sum(self.runs.values())
+
+    def _half_width(self, example_id: str) -> float:
+        """Widest score interval of an example."""
+        scores = self.scores.get(example_id, {})
+        return max((half_width(values) for values in scores.values()), default=math.inf)
+
+    def _needed(self, example_id: str) -> int:
+        """Further runs an example needs for its intervals to reach the target."""
+        runs = self.runs.get(example_id, 0)
+        if runs < self.min_repetitions:
+            return self.min_repetitions - runs
+        scores = self.scores.get(example_id, {})
+        # Done at the cap, when tight, or when nothing ever scored (all errors)
+        if (
+            runs >= self.max_repetitions
+            or not scores
+            or self._half_width(example_id) <= self.target
+        ):
+            return 0
+        needed = 0
+        for values in scores.values():
+            if len(values) < 2:
+                needed = max(needed, 1)
+                continue
+            # n at which t * s / sqrt(n) meets the target, at the current t and s
+            n = math.ceil(
+                (t_critical(len(values) - 1) * statistics.stdev(values) / self.target)
+                ** 2
+            )
+            needed = max(needed, n - len(values))
+        return min(max(needed, 1), self.max_repetitions - runs)
+
+    def _allocate(self, requests: dict[str, int]) -> dict[str, int]:
+        """Trim the runs requested per example to the remaining budget, widest intervals first."""
+        if self.budget is None:
+            return requests
+        remaining = self.budget - self.used
+        granted = {}
+        # Stable sort: ties (e.g. the first round) keep dataset order
+        for example_id in sorted(requests, key=self._half_width, reverse=True):
+            count = min(requests[example_id], remaining)
+            if count <= 0:
+                break
+            granted[example_id] = count
+            remaining -= count
+        return granted
+
+    def _record(self, row: dict) -> None:
+        self.runs[row["example_id"]] = self.runs.get(row["example_id"], 0) + 1
+        scores = self.scores.setdefault(row["example_id"], {})
+        for key, score in row["scores"].items():
+            if score is not None:
+                scores.setdefault(key, []).append(float(score))
+
+    async def aevaluate(self, examples: Iterable[Example]) -> AsyncIterator[dict]:
+        """Yield result rows round by round until every example is done or the budget is spent."""
+        examples = list(examples)
+        self.example_ids = [example.id for example in examples]
+        while True:
+            requests = {e.id: n for e in examples if (n := self._needed(e.id)) > 0}
+            plan = self._allocate(requests)
+            if not plan:
+                return
+            # Repetitions continue from each example's previous round
+            runs = [
+                (example, self.runs.get(example.id, 0) + i)
+                for example in examples
+                for i in range(plan.get(example.id, 0))
+            ]
+            async for row in aevaluate_runs(
+                runs, self.evaluators, self.graph, self.concurrency
+            ):
+                self._record(row)
+                yield row
+
+    def evaluate_file(self, path: str) -> Iterator[dict]:
+        """Evaluate a JSONL dataset adaptively, yielding result rows as they complete."""
+        yield from iterate(self.aevaluate(read_examples(path)))
+
+    def report(self) -> dict[str, Any]:
+        """Report the runs made and saved, and the achieved intervals per example and evaluator."""
+        examples: dict[str, Any] = {}
+        widths: dict[str, list[float]] = {}
+        for example_id in self.example_ids:
+            scores = {}
+            for key, values in sorted(self.scores.get(example_id, {}).items()):
+                width = half_width(values)
+                scores[key] = {
+                    "n": len(values),
+                    "mean": statistics.fmean(values),
+                    "half_width": _finite(width),
+                }
+                widths.setdefault(key, []).append(width)
+            examples[example_id] = {
+                "runs": self.runs.get(example_id, 0),
+                "converged": self._half_width(example_id) <= self.target,
+                "scores": scores,
+            }
+        fixed = len(examples) * self.max_repetitions
+        return {
+            "target_half_width": self.target,
+            "runs": self.used,
+            "budget": self.budget,
+            "fixed_runs": fixed,
+            "saved_runs": fixed - self.used,
+            "converged": sum(e["converged"] for e in examples.values()),
+            # None when some example has fewer than two scores for the key
+            "half_widths": {
+                key: {
+                    "mean": _finite(statistics.fmean(values)),
+                    "max": _finite(max(values)),
+                }
+                for key, values in sorted(widths.items())
+            },
+            "examples": examples,
+        }
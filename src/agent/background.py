@@ -0,0 +1,55 @@
+"""Background event loop - runs coroutines that must outlive a single graph run.
+
+Work such as prefetching Spotify searches while the graph waits at an
+interrupt can't live on the caller's loop (sync invoke has none, and an
+ainvoke loop may be gone by the time the thread resumes). ``submit`` runs a
+coroutine on a shared daemon-thread loop and returns a concurrent Future that
+both sync (``.result()``) and async (``asyncio.wrap_future``) code can wait on.
+Long-lived async clients (e.g. HTTP connection pools) should be created and
+used only on this loop.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Coroutine, TypeVar
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    """Lazily started asyncio loop on a daemon thread."""
+
+    def __init__(self, name: str = "dj-agent-background") -> None:
+        """Create the runner; its thread starts on first use."""
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Return the event loop, starting its thread if it is not running."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name=self.name, daemon=True
+                )
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> "concurrent.futures.Future[T]":
+        """Schedule ``coro`` on the background loop."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """Run ``coro`` on the background loop and block for its result."""
+        return self.submit(coro).result(timeout)
+
+    async def arun(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Run ``coro`` on the background loop and await it from another loop."""
+        return await asyncio.wrap_future(self.submit(coro))
+
+
+background = BackgroundLoop()
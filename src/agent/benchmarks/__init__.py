@@ -0,0 +1,6 @@
+"""Offline benchmarks for the DJ Agent graph.
+
+Each module is runnable with ``python -m agent.benchmarks.<name>`` and swaps the
+graph's chat model for the deterministic fake in ``fake_llm`` so results do not
+depend on network or provider latency.
+"""
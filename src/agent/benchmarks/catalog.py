@@ -0,0 +1,175 @@
+"""Track catalog benchmark - build time, memory and lookup latency at scale.
+
+Builds a ``TrackCatalog`` from synthetic tracks (names assembled from random
+syllables, so trigram frequencies are roughly natural-language-like) and
+times exact, typo'd and hallucinated lookups.
+
+Usage:
+    python -m agent.benchmarks.catalog
+    python -m agent.benchmarks.catalog --tracks 100000 --lookups 2000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from agent.catalog import TrackCatalog
+from agent.track_cache import track_key
+
+SYLLABLES = [
+    "ka",
+    "lo",
+    "mi",
+    "ra",
+    "to",
+    "ne",
+    "su",
+    "vi",
+    "da",
+    "ber",
+    "lin",
+    "mor",
+    "tech",
+    "no",
+    "sol",
+    "ar",
+    "el",
+    "on",
+    "ix",
+    "un",
+    "der",
+    "ground",
+    "night",
+    "fall",
+    "echo",
+    "deep",
+    "blue",
+    "ri",
+    "va",
+    "zen",
+    "ko",
+    "pha",
+    "se",
+]
+WORDS = [
+    "love",
+    "night",
+    "dream",
+    "fire",
+    "city",
+    "lights",
+    "dance",
+    "heart",
+    "time",
+    "moon",
+    "rain",
+    "summer",
+    "echo",
+    "shadow",
+    "river",
+    "gold",
+    "ghost",
+    "wave",
+    "signal",
+    "machine",
+    "desire",
+    "storm",
+    "glass",
+    "velvet",
+    "static",
+    "silence",
+]
+
+
+def _name(rng: random.Random, parts: int) -> str:
+    return " ".join(
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        for _ in range(parts)
+    )
+
+
+def synthetic_tracks(count: int, seed: int = 7) -> list[dict]:
+    """Return ``count`` random tracks, about ten per artist (deterministic per seed)."""
+    rng = random.Random(seed)
+    artists = [_name(rng, rng.randint(1, 2)) for _ in range(max(count // 10, 1))]
+    return [
+        {
+            "artist": rng.choice(artists),
+            "title": " ".join(
+                rng.choice(WORDS) for _ in range(rng.randint(1, 4))
+            ).title(),
+            "spotify_uri": f"spotify:track:{i:022d}",
+        }
+        for i in range(count)
+    ]
+
+
+def _typo(rng: random.Random, text: str) -> str:
+    i = rng.randrange(len(text))
+    return text[:i] + text[i + 1 :]
+
+
+def rss_mb() -> float:
+    """Return the current resident set size (Linux), in MB."""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * 4096 / 1e6
+
+
+def time_lookups(
+    catalog: TrackCatalog, queries: list[tuple[str, str]]
+) -> tuple[float, float]:
+    """p50 and p99 lookup latency in microseconds."""
+    samples = []
+    for artist, title in queries:
+        start = time.perf_counter()
+        catalog.search(artist, title)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def main() -> None:
+    """Run the catalog benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the local track catalog")
+    parser.add_argument("--tracks", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    tracks = synthetic_tracks(args.tracks)
+
+    before = rss_mb()
+    start = time.perf_counter()
+    catalog = TrackCatalog(tracks)
+    build = time.perf_counter() - start
+    memory = rss_mb() - before
+
+    sample = rng.sample(tracks, args.lookups)
+    queries = {
+        "exact": [(t["artist"], t["title"]) for t in sample],
+        "typo": [(t["artist"], _typo(rng, t["title"])) for t in sample],
+        "hallucinated": [(_name(rng, 2), "Nonexistent Song") for _ in sample],
+    }
+    recovered = 0
+    for (artist, title), original in zip(queries["typo"], sample):
+        match = catalog.check({"artist": artist, "title": title})[1]
+        # Synthetic titles repeat, so compare names rather than URIs
+        recovered += match is not None and track_key(
+            match["artist"], match["title"]
+        ) == track_key(original["artist"], original["title"])
+
+    print(f"Catalog: {len(catalog):,} tracks")
+    print(
+        f"Build:   {build:.1f} s, {memory:.0f} MB index + rows (excluding the input list)"
+    )
+    print(f"{'lookup':<13}  {'p50 (us)':>9}  {'p99 (us)':>9}")
+    for kind, batch in queries.items():
+        p50, p99 = time_lookups(catalog, batch)
+        print(f"{kind:<13}  {p50:>9.0f}  {p99:>9.0f}")
+    print(f"Typos repaired to the original track: {recovered / len(sample):.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Cold start - time to import the graph and evaluators in a fresh interpreter.
+
+Each sample is a new ``python`` process importing the module, so nothing is
+shared with earlier runs but the OS file cache. Also reports whether the
+provider SDKs were pulled in by the import (they should only load when a
+model or judge is first used), plus the slowest imports from
+``python -X importtime`` for the first module.
+
+Usage:
+    python -m agent.benchmarks.cold_start
+    python -m agent.benchmarks.cold_start --runs 20 --modules agent.graph
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+MODULES = ["agent", "agent.graph", "agent.evaluators", "agent.run_evaluation"]
+# Modules that should not be imported until first use
+LAZY_MODULES = ["langchain_openai", "openai", "numpy"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, *(name for name in {lazy!r} if name in sys.modules))
+"""
+
+
+def import_time(module: str) -> tuple[float, list[str]]:
+    """Seconds to import ``module`` in a fresh interpreter, and the lazy modules it loaded."""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, lazy=LAZY_MODULES)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed, *loaded = result.stdout.split()
+    return float(elapsed), loaded
+
+
+def slowest_imports(module: str, top: int) -> list[tuple[int, str]]:
+    """Cumulative microseconds of the ``top`` slowest direct imports of ``module``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # (depth, cumulative us, name); a module's imports are listed before it
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        rows.append(
+            ((len(name) - len(name.lstrip())) // 2, int(parts[1]), name.strip())
+        )
+
+    # ``import a.b`` lists a.b where a's import ran it, and again at the top level
+    index = max(
+        (i for i, row in enumerate(rows) if row[2] == module), key=lambda i: rows[i][0]
+    )
+    depth = rows[index][0]
+    children = []
+    for row_depth, micros, name in reversed(rows[:index]):
+        if row_depth <= depth:
+            break
+        if row_depth == depth + 1:
+            children.append((micros, name))
+    return sorted(children, reverse=True)[:top]
+
+
+def main() -> None:
+    """Run the cold-start benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark cold-start import time")
+    parser.add_argument(
+        "--runs", type=int, default=10, help="Fresh interpreters per module"
+    )
+    parser.add_argument(
+        "--modules", nargs="+", default=MODULES, help="Modules to import"
+    )
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    print(f"{'module':<22}  {'p50 ms':>8}  {'min ms':>8}  eagerly imported")
+    for module in args.modules:
+        samples, loaded = [], []
+        for _ in range(args.runs):
+            elapsed, loaded = import_time(module)
+            samples.append(elapsed * 1000)
+        print(
+            f"{module:<22}  {statistics.median(samples):>8.1f}  {min(samples):>8.1f}  "
+            f"{', '.join(loaded) or '-'}"
+        )
+
+    print(f"\nSlowest imports under {args.modules[0]} (cumulative ms)")
+    for micros, name in slowest_imports(args.modules[0], args.top):
+        print(f"{micros / 1000:>8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Concurrent-turn throughput of the compiled graph with a fake chat model.
+
+Compares native async nodes (``graph.ainvoke``) against the executor-bound
+baseline, where every turn occupies a worker thread for the whole LLM wait
+(``graph.invoke`` dispatched through the default thread pool, which is how
+sync-only nodes behave under the LangGraph server).
+
+Usage:
+    python -m agent.benchmarks.concurrency
+    python -m agent.benchmarks.concurrency --sessions 10 100 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import time
+
+from agent.benchmarks.fake_llm import FakeChatModel, patched_llm
+from agent.graph import graph
+
+INPUTS = {"messages": [{"role": "human", "content": "hey! what's good?"}]}
+
+
+async def run_async(sessions: int) -> float:
+    """Run ``sessions`` concurrent turns via graph.ainvoke, return wall time."""
+    start = time.perf_counter()
+    await asyncio.gather(*(graph.ainvoke(INPUTS) for _ in range(sessions)))
+    return time.perf_counter() - start
+
+
+async def run_executor(sessions: int) -> float:
+    """Run ``sessions`` concurrent turns on the default thread pool."""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(loop.run_in_executor(None, graph.invoke, INPUTS) for _ in range(sessions))
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Run the concurrency benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark concurrent graph turns")
+    parser.add_argument(
+        "--sessions",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="Numbers of parallel sessions to run",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Fake model latency per call in seconds",
+    )
+    args = parser.parse_args()
+
+    modes = {"async": run_async, "executor": run_executor}
+
+    print(f"Fake LLM latency: {args.latency * 1000:.0f} ms/call (2 calls per turn)")
+    print(f"{'sessions':>8}  {'mode':<8}  {'wall s':>8}  {'turns/s':>9}")
+    with patched_llm(FakeChatModel(latency=args.latency)):
+        for sessions in args.sessions:
+            for mode, run in modes.items():
+                elapsed = asyncio.run(run(sessions))
+                print(
+                    f"{sessions:>8}  {mode:<8}  {elapsed:>8.2f}  {sessions / elapsed:>9.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
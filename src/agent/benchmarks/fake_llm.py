@@ -0,0 +1,219 @@
+"""Deterministic fake chat model for benchmarks and unit tests."""
+
+import asyncio
+import hashlib
+import importlib
+import json
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Iterator
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from pydantic import Field, PrivateAttr
+
+
+def default_structured_outputs() -> dict[str, dict]:
+    """Canned structured outputs keyed by schema name."""
+    return {
+        "ChatClassification": {
+            "intent": "greeting",
+            "confidence": 0.95,
+            "signals": {},
+        },
+        "PlaylistProposal": {
+            "tracks": [
+                {"artist": "Tycho", "title": "Awake", "spotify_uri": None},
+                {"artist": "Four Tet", "title": "Baby", "spotify_uri": None},
+                {"artist": "Bonobo", "title": "Kerala", "spotify_uri": None},
+            ],
+            "vibe_description": "Warm electronic builds for an easy start.",
+        },
+    }
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that sleeps for ``latency`` seconds and returns canned output.
+
+    Plain calls return ``response``. ``with_structured_output(schema)`` returns
+    the entry of ``structured_outputs`` named after the schema, serialized as
+    JSON and parsed back, so the call still goes through the normal chat model
+    callbacks like a real provider call would.
+
+    When streamed, the first chunk arrives after ``latency`` and each following
+    word-sized chunk after ``token_latency``; a non-streamed call takes as long
+    as the whole stream would.
+
+    Every response carries approximate ``usage_metadata``. With
+    ``prompt_cache=True`` the model also mimics provider prefix caching: the
+    longest message-aligned prompt prefix seen before is reported as
+    ``cache_read`` tokens.
+    """
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    response: str = "Love that. What have you been spinning lately?"
+    structured_outputs: dict[str, dict] = Field(
+        default_factory=default_structured_outputs
+    )
+    prompt_cache: bool = False
+
+    _seen_prefixes: set[str] = PrivateAttr(default_factory=set)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-dj"
+
+    def _content(self, structured_output: str | None) -> str:
+        if structured_output is None:
+            return self.response
+        return json.dumps(self.structured_outputs[structured_output])
+
+    def _generation_time(self, content: str) -> float:
+        return self.latency + self.token_latency * (len(_tokens(content)) - 1)
+
+    def _usage(self, messages: list[BaseMessage], content: str) -> UsageMetadata:
+        prompt_tokens = count_tokens_approximately(messages)
+        cached = 0
+        if self.prompt_cache:
+            digest = hashlib.sha256()
+            prefix_tokens = 0
+            for message in messages:
+                digest.update(f"{message.type}:{message.text}\x00".encode())
+                prefix_tokens += count_tokens_approximately([message])
+                key = digest.hexdigest()
+                if key in self._seen_prefixes:
+                    cached = prefix_tokens
+                self._seen_prefixes.add(key)
+        completion_tokens = count_tokens_approximately([AIMessage(content=content)])
+        return UsageMetadata(
+            input_tokens=prompt_tokens,
+            output_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+            input_token_details={"cache_read": cached},
+        )
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        structured_output: str | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        content = self._content(structured_output)
+        if delay := self._generation_time(content):
+            time.sleep(delay)
+        message = AIMessage(
+            content=content, usage_metadata=self._usage(messages, content)
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        structured_output: str | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        content = self._content(structured_output)
+        if delay := self._generation_time(content):
+            await asyncio.sleep(delay)
+        message = AIMessage(
+            content=content, usage_metadata=self._usage(messages, content)
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        structured_output: str | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        content = self._content(structured_output)
+        for i, token in enumerate(_tokens(content)):
+            delay = self.latency if i == 0 else self.token_latency
+            if delay:
+                time.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        # Like OpenAI with stream_usage, report usage in a final empty chunk
+        usage = self._usage(messages, content)
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(content="", usage_metadata=usage)
+        )
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        structured_output: str | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        content = self._content(structured_output)
+        for i, token in enumerate(_tokens(content)):
+            delay = self.latency if i == 0 else self.token_latency
+            if delay:
+                await asyncio.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        usage = self._usage(messages, content)
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(content="", usage_metadata=usage)
+        )
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Runnable:  # type: ignore[override]
+        """Bind the canned structured output registered under the schema's name."""
+        name = schema["title"] if isinstance(schema, dict) else schema.__name__
+        return self.bind(structured_output=name) | JsonOutputParser()
+
+
+def _tokens(text: str) -> list[str]:
+    """Split text into word-sized chunks that concatenate back to ``text``."""
+    return re.findall(r"\s*\S+", text) or [text]
+
+
+@contextmanager
+def patched_llm(
+    model: BaseChatModel, tiers: dict[str, BaseChatModel] | None = None
+) -> Iterator[BaseChatModel]:
+    """Swap the graph's chat models for fakes within the block.
+
+    ``model`` replaces the module-level ``llm``; ``tiers`` maps other model
+    names (e.g. the classifier cascade's cheap tier) to their fakes and
+    defaults to ``model`` for any name not listed.
+    """
+    # ``agent.graph`` the attribute is the compiled graph, so go through sys.modules
+    graph_module = importlib.import_module("agent.graph")
+    # Read from the module dict - ``graph_module.llm`` would build the real model
+    original_llm = vars(graph_module).get("llm")
+    original_get_chat_model = graph_module.get_chat_model
+    tiers = tiers or {}
+    graph_module.llm = model
+    graph_module.get_chat_model = lambda model_name: tiers.get(model_name, model)
+    try:
+        yield model
+    finally:
+        if original_llm is None:
+            del graph_module.llm
+        else:
+            graph_module.llm = original_llm
+        graph_module.get_chat_model = original_get_chat_model
@@ -0,0 +1,302 @@
+"""Fake Spotify Web API - a local HTTP server for tests and offline benchmarks.
+
+Implements just enough of the API used by ``agent.spotify``:
+
+    POST /api/token                   client-credentials / refresh-token grant
+    GET  /v1/search                   track search (q='track:"<title>" artist:"<artist>"')
+    GET  /v1/me                       current user
+    POST /v1/users/<id>/playlists     create a playlist
+    GET  /v1/playlists/<id>/tracks    track count (only ``total`` is returned)
+    POST /v1/playlists/<id>/tracks    add up to 100 tracks
+
+Every response is delayed by ``latency`` seconds, and when ``rate_limit`` is
+set only that many requests per second are served; the rest get a 429 with a
+``Retry-After`` header, like the real API. Request counts and the peak number
+of concurrent requests are recorded for assertions, and created playlists
+are kept in ``playlists``. ``fail_add_tracks`` makes that many add-tracks
+calls fail with a 500 after they were applied, to exercise retries.
+
+Usage:
+    with FakeSpotifyServer(latency=0.05) as server:
+        client = SpotifyClient(api_url=server.api_url, token_url=server.token_url, ...)
+
+    # Benchmarks: serve from a child process so the server doesn't compete
+    # with the client for the GIL
+    with serve_in_process(latency=0.05) as (api_url, token_url):
+        ...
+"""
+
+import hashlib
+import json
+import multiprocessing
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator
+from urllib.parse import parse_qs, urlparse
+
+QUERY_RE = re.compile(r'track:"(?P<title>[^"]*)"\s+artist:"(?P<artist>[^"]*)"')
+CREATE_PLAYLIST_RE = re.compile(r"/v1/users/(?P<user>[^/]+)/playlists")
+ADD_TRACKS_RE = re.compile(r"/v1/playlists/(?P<playlist>[^/]+)/tracks")
+USER_ID = "fake-user"
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Default backlog of 5 drops connects when a client opens its pool at once
+    request_queue_size = 128
+
+
+def fake_uri(artist: str, title: str) -> str:
+    """Deterministic track URI for an artist/title pair."""
+    digest = hashlib.sha256(f"{artist.lower()}\x00{title.lower()}".encode()).hexdigest()
+    return f"spotify:track:{digest[:22]}"
+
+
+class FakeSpotifyServer:
+    """Threaded fake of the Spotify Web API on an ephemeral localhost port."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        rate_limit: int | None = None,
+        retry_after: int = 1,
+        unknown_artists: tuple[str, ...] = (),
+        fail_add_tracks: int = 0,
+    ) -> None:
+        """Bind to a free local port; call ``start()`` (or use as a context manager) to serve."""
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.unknown_artists = {a.lower() for a in unknown_artists}
+        self.fail_add_tracks = fail_add_tracks
+        self.playlists: dict[str, dict] = {}
+        self.requests: dict[str, int] = {}
+        self.rate_limited = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._window: list[float] = []
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """Return the server's root URL."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self) -> str:
+        """Return the Web API base URL, for ``SpotifyClient(api_url=...)``."""
+        return f"{self.base_url}/v1"
+
+    @property
+    def token_url(self) -> str:
+        """Return the token endpoint, for ``SpotifyClient(token_url=...)``."""
+        return f"{self.base_url}/api/token"
+
+    def start(self) -> "FakeSpotifyServer":
+        """Serve requests on a daemon thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Shut the server down and release its port."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeSpotifyServer":
+        """Start serving."""
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        """Stop serving."""
+        self.stop()
+
+    # -------------------------------------------------------------------------
+
+    def _admit(self) -> bool:
+        """Count the request; False when it is over the rate limit."""
+        with self._lock:
+            if self.rate_limit is not None:
+                now = time.monotonic()
+                self._window = [t for t in self._window if now - t < 1.0]
+                if len(self._window) >= self.rate_limit:
+                    self.rate_limited += 1
+                    return False
+                self._window.append(now)
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            return True
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _count(self, route: str) -> None:
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def _search(self, query: str) -> dict:
+        match = QUERY_RE.search(query)
+        if match is None or match["artist"].lower() in self.unknown_artists:
+            return {"tracks": {"items": []}}
+        item = {
+            "uri": fake_uri(match["artist"], match["title"]),
+            "name": match["title"],
+            "artists": [{"name": match["artist"]}],
+        }
+        return {"tracks": {"items": [item]}}
+
+    def _create_playlist(self, body: dict) -> dict:
+        with self._lock:
+            playlist_id = f"playlist{len(self.playlists) + 1}"
+            self.playlists[playlist_id] = {"name": body.get("name"), "uris": []}
+        return {
+            "id": playlist_id,
+            "name": body.get("name"),
+            "external_urls": {
+                "spotify": f"https://open.spotify.com/playlist/{playlist_id}"
+            },
+        }
+
+    def _add_tracks(self, playlist_id: str, body: dict) -> tuple[int, dict]:
+        uris = body.get("uris") or []
+        with self._lock:
+            playlist = self.playlists.get(playlist_id)
+            if playlist is None:
+                return 404, {"error": {"status": 404}}
+            if len(uris) > 100:
+                return 400, {"error": {"status": 400, "message": "Too many tracks"}}
+            playlist["uris"].extend(uris)
+            if self.fail_add_tracks:
+                self.fail_add_tracks -= 1
+                return 500, {"error": {"status": 500}}
+        return 201, {"snapshot_id": f"{playlist_id}-{len(playlist['uris'])}"}
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _send(
+                self, status: int, body: dict, headers: dict | None = None
+            ) -> None:
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _serve(self, route: str, respond) -> None:
+                server._count(route)
+                if not server._admit():
+                    self._send(
+                        429,
+                        {"error": {"status": 429}},
+                        {"Retry-After": str(server.retry_after)},
+                    )
+                    return
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    respond()
+                finally:
+                    server._release()
+
+            def _authorized(self) -> bool:
+                if self.headers.get("Authorization") == "Bearer fake-token":
+                    return True
+                self._send(401, {"error": {"status": 401}})
+                return False
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length)
+                path = urlparse(self.path).path
+                if path == "/api/token":
+                    self._serve(
+                        "token",
+                        lambda: self._send(
+                            200,
+                            {
+                                "access_token": "fake-token",
+                                "token_type": "Bearer",
+                                "expires_in": 3600,
+                            },
+                        ),
+                    )
+                    return
+                if not self._authorized():
+                    return
+                body = json.loads(raw or b"{}")
+                if CREATE_PLAYLIST_RE.fullmatch(path):
+                    self._serve(
+                        "create_playlist",
+                        lambda: self._send(201, server._create_playlist(body)),
+                    )
+                elif match := ADD_TRACKS_RE.fullmatch(path):
+                    self._serve(
+                        "add_tracks",
+                        lambda: self._send(
+                            *server._add_tracks(match["playlist"], body)
+                        ),
+                    )
+                else:
+                    self._send(404, {"error": {"status": 404}})
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                if not self._authorized():
+                    return
+                if url.path == "/v1/search":
+                    query = parse_qs(url.query).get("q", [""])[0]
+                    self._serve(
+                        "search", lambda: self._send(200, server._search(query))
+                    )
+                elif url.path == "/v1/me":
+                    self._serve("me", lambda: self._send(200, {"id": USER_ID}))
+                elif (match := ADD_TRACKS_RE.fullmatch(url.path)) and match[
+                    "playlist"
+                ] in server.playlists:
+                    total = len(server.playlists[match["playlist"]]["uris"])
+                    self._serve(
+                        "playlist_tracks", lambda: self._send(200, {"total": total})
+                    )
+                else:
+                    self._send(404, {"error": {"status": 404}})
+
+        return Handler
+
+
+def _serve_forever(connection: Any, kwargs: dict) -> None:
+    server = FakeSpotifyServer(**kwargs)
+    connection.send((server.api_url, server.token_url))
+    server._server.serve_forever()
+
+
+@contextmanager
+def serve_in_process(**kwargs: Any) -> Iterator[tuple[str, str]]:
+    """Run a FakeSpotifyServer in a child process, yielding (api_url, token_url)."""
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=_serve_forever, args=(child, kwargs), daemon=True
+    )
+    process.start()
+    try:
+        yield parent.recv()
+    finally:
+        process.terminate()
+        process.join()
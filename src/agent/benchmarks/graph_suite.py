@@ -0,0 +1,358 @@
+"""Graph benchmark suite - framework overhead, throughput, memory and history scaling per route.
+
+Every route runs through the same checkpointed graph the server would build,
+with the deterministic fake chat model and simulated Spotify:
+
+- chat      classify_intent -> chat
+- clarify   classify_intent -> clarify
+- playlist  classify_intent -> generate_playlist -> interrupt, then resume
+            "yes" -> search_spotify -> create_spotify_playlist
+
+Measurements:
+
+- overhead: wall time per turn with a zero-latency model, i.e. everything
+  but the LLM (a playlist turn includes its resume)
+- throughput: turns/s of ``graph.batch`` and ``graph.abatch`` with
+  ``--latency`` per model call
+- memory: traced allocations retained per conversation thread in the
+  in-memory checkpointer
+- history: overhead per turn as the conversation grows
+
+``--save`` writes the results as JSON; ``--compare`` checks them against a
+saved run and exits non-zero when any metric regressed by more than
+``--tolerance``.
+
+Usage:
+    python -m agent.benchmarks.graph_suite --save baseline.json
+    python -m agent.benchmarks.graph_suite --compare baseline.json
+    python -m agent.benchmarks.graph_suite --quick
+"""
+
+import argparse
+import asyncio
+import gc
+import importlib.metadata
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.types import Command
+
+from agent.benchmarks.fake_llm import FakeChatModel, patched_llm
+from agent.graph import Context, builder, graph
+from agent.instrumentation import instrumentation_enabled
+from agent.spotify import configure
+
+ROUTES = {
+    "chat": {"intent": "ask_question", "confidence": 0.9, "signals": {}},
+    "clarify": {"intent": "explore", "confidence": 0.5, "signals": {}},
+    "playlist": {
+        "intent": "request_playlist",
+        "confidence": 0.95,
+        "signals": {"genre": "techno"},
+    },
+}
+# Misses the fast-path classifier, so every turn pays an LLM classification
+MESSAGE = "my dog ate my homework"
+HISTORY_LENGTHS = (0, 20, 100, 400)
+
+# LLM classification every turn, as in production for uncached messages
+CONTEXT = Context(classifier_model=None, classification_cache=False)
+
+# Metrics where larger is better; everything else is a cost
+HIGHER_IS_BETTER = ("throughput",)
+
+
+def _history(messages: int) -> list[dict]:
+    """Build a conversation of ``messages`` earlier messages, then the benchmark turn."""
+    turns = [
+        {
+            "role": "human" if i % 2 == 0 else "ai",
+            "content": f"Message {i} about some records I like",
+        }
+        for i in range(messages)
+    ]
+    return turns + [{"role": "human", "content": MESSAGE}]
+
+
+class Runner:
+    """A checkpointed graph with the production config and a fake model."""
+
+    def __init__(self, model: FakeChatModel) -> None:
+        """Compile a fresh graph with its own in-memory checkpointer."""
+        self.model = model
+        self.graph = builder.compile(checkpointer=InMemorySaver()).with_config(
+            graph.config
+        )
+        self._threads = 0
+
+    def _configs(self, count: int) -> list[dict]:
+        start, self._threads = self._threads, self._threads + count
+        return [
+            {"configurable": {"thread_id": f"bench-{i}"}}
+            for i in range(start, start + count)
+        ]
+
+    def turn(self, route: str, history: int = 0) -> None:
+        """Run one turn down ``route`` on a new thread, resuming the interrupt for playlists."""
+        self.model.structured_outputs["ChatClassification"] = ROUTES[route]
+        (config,) = self._configs(1)
+        self.graph.invoke({"messages": _history(history)}, config, context=CONTEXT)
+        if route == "playlist":
+            self.graph.invoke(Command(resume="yes"), config, context=CONTEXT)
+
+    def batch(self, route: str, count: int) -> None:
+        """Run ``count`` turns down ``route`` with ``graph.batch``."""
+        self.model.structured_outputs["ChatClassification"] = ROUTES[route]
+        configs = self._configs(count)
+        self.graph.batch([{"messages": _history(0)}] * count, configs, context=CONTEXT)
+        if route == "playlist":
+            self.graph.batch([Command(resume="yes")] * count, configs, context=CONTEXT)
+
+    async def abatch(self, route: str, count: int) -> None:
+        """Run ``count`` turns down ``route`` with ``graph.abatch``."""
+        self.model.structured_outputs["ChatClassification"] = ROUTES[route]
+        configs = self._configs(count)
+        await self.graph.abatch(
+            [{"messages": _history(0)}] * count, configs, context=CONTEXT
+        )
+        if route == "playlist":
+            await self.graph.abatch(
+                [Command(resume="yes")] * count, configs, context=CONTEXT
+            )
+
+
+def _timed_turns(
+    runner: Runner, route: str, turns: int, history: int = 0
+) -> list[float]:
+    for _ in range(3):
+        runner.turn(route, history)
+    samples = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        runner.turn(route, history)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def measure_overhead(turns: int) -> dict[str, dict[str, float]]:
+    """Time single turns per route against a zero-latency model."""
+    runner = Runner(FakeChatModel(latency=0))
+    results = {}
+    with patched_llm(runner.model):
+        for route in ROUTES:
+            samples = sorted(_timed_turns(runner, route, turns))
+            results[route] = {
+                "mean_ms": statistics.fmean(samples),
+                "p50_ms": statistics.median(samples),
+                "p95_ms": samples[int(len(samples) * 0.95)],
+            }
+    return results
+
+
+def measure_throughput(count: int, latency: float) -> dict[str, dict[str, float]]:
+    """Measure batch and abatch turns per second per route at the given model latency."""
+    runner = Runner(FakeChatModel(latency=latency))
+    results = {}
+    with patched_llm(runner.model):
+        for route in ROUTES:
+            start = time.perf_counter()
+            runner.batch(route, count)
+            batch = count / (time.perf_counter() - start)
+            start = time.perf_counter()
+            asyncio.run(runner.abatch(route, count))
+            abatch = count / (time.perf_counter() - start)
+            results[route] = {"batch_turns_per_s": batch, "abatch_turns_per_s": abatch}
+    return results
+
+
+def measure_memory(threads: int) -> dict[str, float]:
+    """Measure the memory retained per finished thread, per route."""
+    results = {}
+    for route in ROUTES:
+        runner = Runner(FakeChatModel(latency=0))
+        with patched_llm(runner.model):
+            runner.turn(route)
+            gc.collect()
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            for _ in range(threads):
+                runner.turn(route)
+            gc.collect()
+            retained = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+        results[route] = retained / threads / 1024
+    return results
+
+
+def measure_history(
+    turns: int, lengths: tuple[int, ...] = HISTORY_LENGTHS
+) -> dict[str, dict[str, float]]:
+    """Time single turns per route as the conversation history grows."""
+    runner = Runner(FakeChatModel(latency=0))
+    results: dict[str, dict[str, float]] = {}
+    with patched_llm(runner.model):
+        for route in ROUTES:
+            results[route] = {
+                str(length): statistics.median(
+                    _timed_turns(runner, route, turns, length)
+                )
+                for length in lengths
+            }
+    return results
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(turns: int, batch: int, latency: float, threads: int) -> dict[str, Any]:
+    """Run every measurement and return the results with run metadata."""
+    # Simulated Spotify URIs and playlists, whatever the environment says
+    configure(None)
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "langgraph": importlib.metadata.version("langgraph"),
+            "instrumentation": instrumentation_enabled(),
+            "params": {
+                "turns": turns,
+                "batch": batch,
+                "latency": latency,
+                "threads": threads,
+            },
+        },
+        "overhead": measure_overhead(turns),
+        "throughput": measure_throughput(batch, latency),
+        "memory_kb_per_thread": measure_memory(threads),
+        "history_p50_ms": measure_history(max(turns // 5, 5)),
+    }
+
+
+def _flatten(results: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if key == "meta":
+            continue
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Metrics of ``current`` that are worse than ``baseline`` by more than ``tolerance``."""
+    old, new = _flatten(baseline), _flatten(current)
+    regressions = []
+    for name in sorted(old.keys() & new.keys()):
+        if not old[name]:
+            continue
+        change = (new[name] - old[name]) / old[name]
+        if name.startswith(HIGHER_IS_BETTER):
+            change = -change
+        if change > tolerance:
+            regressions.append(
+                f"{name}: {old[name]:.2f} -> {new[name]:.2f} ({change:+.0%} worse)"
+            )
+    return regressions
+
+
+def print_results(results: dict[str, Any]) -> None:
+    """Print the suite results as tables."""
+    params = results["meta"]["params"]
+    print(f"Overhead per turn, zero-latency model ({params['turns']} turns)")
+    print(
+        f"{'route':<9}  {'mean ms':>8}  {'p50 ms':>8}  {'p95 ms':>8}  {'KB/thread':>9}"
+    )
+    for route, row in results["overhead"].items():
+        memory = results["memory_kb_per_thread"][route]
+        print(
+            f"{route:<9}  {row['mean_ms']:>8.2f}  {row['p50_ms']:>8.2f}  {row['p95_ms']:>8.2f}  {memory:>9.1f}"
+        )
+
+    print(
+        f"\nThroughput, {params['batch']} turns at {params['latency'] * 1000:.0f} ms per model call"
+    )
+    print(f"{'route':<9}  {'batch/s':>8}  {'abatch/s':>9}")
+    for route, row in results["throughput"].items():
+        print(
+            f"{route:<9}  {row['batch_turns_per_s']:>8.1f}  {row['abatch_turns_per_s']:>9.1f}"
+        )
+
+    lengths = list(next(iter(results["history_p50_ms"].values())))
+    print("\nOverhead p50 ms by earlier messages in the conversation")
+    print(f"{'route':<9}  " + "  ".join(f"{length:>7}" for length in lengths))
+    for route, row in results["history_p50_ms"].items():
+        print(f"{route:<9}  " + "  ".join(f"{row[length]:>7.2f}" for length in lengths))
+
+
+def main() -> None:
+    """Run the graph benchmark suite from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the graph's framework overhead"
+    )
+    parser.add_argument("--turns", type=int, default=100, help="Timed turns per route")
+    parser.add_argument(
+        "--batch", type=int, default=100, help="Inputs per batch/abatch call"
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Fake model latency for throughput (s)",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=200, help="Threads for the memory measurement"
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="Small run for a smoke check"
+    )
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to check for regressions")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="Allowed relative regression"
+    )
+    args = parser.parse_args()
+
+    if args.quick:
+        args.turns, args.batch, args.threads = 20, 20, 20
+    results = run_suite(args.turns, args.batch, args.latency, args.threads)
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.tolerance)
+        print(f"\nCompared with {args.compare} (git {baseline['meta'].get('git')}):")
+        for line in regressions or ["no regressions"]:
+            print(f"  {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Playlist streaming benchmark - time to first track and to a fully resolved playlist.
+
+Each run asks for an N-track playlist and stops at the confirm_playlist
+interrupt. "first track" is when the first track reaches the caller: the
+whole proposal in batch mode, the first custom stream event with
+``Context.stream_playlist``. "resolved" is when every track has a Spotify URI
+(the prefetch that search_spotify would pick up). The fake LLM generates
+word-sized tokens at a fixed rate; the fake Spotify API runs in a child process
+and the client's rate limiter is disabled so only overlap is measured.
+
+Usage:
+    python -m agent.benchmarks.playlist_streaming
+    python -m agent.benchmarks.playlist_streaming --token-latency 0.01 --search-latency 0.1
+"""
+
+import argparse
+import time
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from agent.background import background
+from agent.benchmarks.fake_llm import FakeChatModel, patched_llm
+from agent.benchmarks.fake_spotify import serve_in_process
+from agent.graph import Context, builder
+from agent.spotify import SpotifyClient, configure, track_prefetcher
+
+SIZES = (3, 20, 100)
+INPUTS = {
+    "messages": [
+        {"role": "human", "content": "Make me a 45-minute techno set for tonight"}
+    ]
+}
+
+
+def proposal(size: int, run: str) -> dict:
+    """Return a proposal of ``size`` tracks that no cache has seen."""
+    # Unique names per run so the track cache never answers for the API
+    tracks = [
+        {"artist": f"Artist {run}-{i}", "title": f"Track {i}", "spotify_uri": None}
+        for i in range(size)
+    ]
+    return {"tracks": tracks, "vibe_description": "Dark, driving warehouse techno."}
+
+
+def run(graph, model: FakeChatModel, size: int, stream: bool) -> tuple[float, float]:
+    """One proposal turn, return (seconds to first track, seconds to all resolved)."""
+    run_id = f"{'stream' if stream else 'batch'}-{size}"
+    model.structured_outputs["PlaylistProposal"] = proposal(size, run_id)
+    config = {"configurable": {"thread_id": run_id}}
+    context = Context(
+        classifier_model=None,
+        classification_cache=False,
+        playlist_length=size,
+        stream_playlist=stream,
+    )
+
+    start = time.perf_counter()
+    first_track = None
+    state: dict = {}
+    for mode, chunk in graph.stream(
+        INPUTS, config, stream_mode=["custom", "values"], context=context
+    ):
+        if mode == "custom" and "track" in chunk and first_track is None:
+            first_track = time.perf_counter() - start
+        elif mode == "values":
+            state = chunk
+            if first_track is None and state.get("proposed_tracks"):
+                first_track = time.perf_counter() - start
+
+    resolved = track_prefetcher.take(run_id, state["proposed_tracks"])
+    assert resolved is not None and all(t["spotify_uri"] for t in resolved)
+    return first_track or 0.0, time.perf_counter() - start
+
+
+def main() -> None:
+    """Run the playlist streaming benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark streamed playlist generation"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.3, help="Fake LLM time to first token (s)"
+    )
+    parser.add_argument(
+        "--token-latency", type=float, default=0.005, help="Fake LLM time per token (s)"
+    )
+    parser.add_argument(
+        "--search-latency", type=float, default=0.05, help="Fake Spotify latency (s)"
+    )
+    args = parser.parse_args()
+
+    model = FakeChatModel(latency=args.latency, token_latency=args.token_latency)
+    model.structured_outputs["ChatClassification"] = {
+        "intent": "request_playlist",
+        "confidence": 0.95,
+        "signals": {},
+    }
+    graph = builder.compile(checkpointer=InMemorySaver())
+
+    print(
+        f"Fake LLM: {args.latency * 1000:.0f} ms + {args.token_latency * 1000:.0f} ms/token, "
+        f"fake Spotify: {args.search_latency * 1000:.0f} ms/search"
+    )
+    print(f"{'tracks':>6}  {'mode':<6}  {'first track (s)':>15}  {'resolved (s)':>12}")
+    with (
+        serve_in_process(latency=args.search_latency) as (api_url, token_url),
+        patched_llm(model),
+    ):
+        client = SpotifyClient(
+            "id", "secret", api_url=api_url, token_url=token_url, rate_limit=None
+        )
+        configure(client)
+        try:
+            for size in SIZES:
+                for stream in (False, True):
+                    first, total = run(graph, model, size, stream)
+                    mode = "stream" if stream else "batch"
+                    print(f"{size:>6}  {mode:<6}  {first:>15.2f}  {total:>12.2f}")
+        finally:
+            configure(None)
+            background.run(client.aclose())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Embedding retrieval benchmark - index build time, query latency and memory at scale.
+
+Builds an index of synthetic tracks (see benchmarks/catalog.py) tagged with
+random genres and moods in a temporary directory, then times signal queries
+against the memory-mapped matrix. "RSS" is the resident set growth over the
+queries: file-backed pages of the memory map, reclaimable by the kernel, not
+a copy of the matrix.
+
+Usage:
+    python -m agent.benchmarks.retrieval
+    python -m agent.benchmarks.retrieval --tracks 100000 --chunk-rows 16384
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from typing import Iterator
+
+from agent.benchmarks.catalog import rss_mb, synthetic_tracks
+from agent.fast_classifier import SIGNAL_LEXICON
+from agent.retrieval import EmbeddingIndex, build_index, hash_embed
+
+
+def tagged_tracks(count: int, seed: int = 5) -> Iterator[dict]:
+    """Return synthetic tracks with a random genre and two moods each."""
+    rng = random.Random(seed)
+    for track in synthetic_tracks(count):
+        yield {
+            **track,
+            "genre": rng.choice(SIGNAL_LEXICON["genre"]),
+            "mood": rng.sample(SIGNAL_LEXICON["mood"], 2),
+        }
+
+
+def main() -> None:
+    """Run the retrieval benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark embedding retrieval")
+    parser.add_argument("--tracks", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("-k", type=int, default=20)
+    parser.add_argument("--chunk-rows", type=int, default=65_536)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        build_index(tagged_tracks(args.tracks), directory)
+        build = time.perf_counter() - start
+
+        before = rss_mb()
+        index = EmbeddingIndex(directory)
+        queries = [
+            {
+                "genre": rng.choice(SIGNAL_LEXICON["genre"]),
+                "mood": rng.choice(SIGNAL_LEXICON["mood"]),
+            }
+            for _ in range(args.queries)
+        ]
+        samples = []
+        for signals in queries:
+            query_start = time.perf_counter()
+            vector = hash_embed([" ".join(signals.values())])[0]
+            rows = index.top_k(vector, args.k, args.chunk_rows)
+            index.tracks([row for _, row in rows])
+            samples.append((time.perf_counter() - query_start) * 1000)
+        memory = rss_mb() - before
+
+    samples.sort()
+    matrix_mb = args.tracks * index.dim * 4 / 1e6
+    print(
+        f"Index:  {args.tracks:,} tracks x {index.dim} dims ({matrix_mb:.0f} MB matrix), built in {build:.1f} s"
+    )
+    print(
+        f"Query:  p50 {statistics.median(samples):.0f} ms, p99 {samples[int(len(samples) * 0.99)]:.0f} ms "
+        f"(top {args.k}, {args.chunk_rows:,}-row chunks)"
+    )
+    print(f"RSS:    +{memory:.0f} MB over {args.queries} queries")
+
+
+if __name__ == "__main__":
+    main()
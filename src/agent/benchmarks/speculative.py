@@ -0,0 +1,173 @@
+"""Speculative chat benchmark - wall time and wasted tokens per turn.
+
+Every turn misses the fast path and the classification cache, so it pays an
+LLM classification. With ``Context.speculative_chat`` the chat reply is
+generated concurrently and kept only when the turn routes to chat; the
+"clarify" route shows the cost when the speculation is thrown away.
+
+With ``Context.speculative_playlist`` a clarify turn also generates a
+playlist proposal in the background; the next turn's latency (up to the
+confirm interrupt) is measured when it confirms with the same signals and
+when the answer changes them.
+
+Usage:
+    python -m agent.benchmarks.speculative
+    python -m agent.benchmarks.speculative --latency 0.5 --turns 20
+"""
+
+import argparse
+import asyncio
+import time
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from agent.benchmarks.fake_llm import FakeChatModel, patched_llm
+from agent.graph import Context, builder, graph
+from agent.metrics import metrics
+
+INPUTS = {"messages": [{"role": "human", "content": "my dog ate my homework"}]}
+
+# Classification returned by the fake model for each route
+ROUTES = {
+    "chat": {"intent": "ask_question", "confidence": 0.9, "signals": {}},
+    "clarify": {"intent": "explore", "confidence": 0.5, "signals": {}},
+}
+
+
+async def run_turns(turns: int, context: Context) -> float:
+    """Run sequential turns, return mean wall time per turn in seconds."""
+    start = time.perf_counter()
+    for _ in range(turns):
+        await graph.ainvoke(INPUTS, context=context)
+    return (time.perf_counter() - start) / turns
+
+
+# Clarify turn, then the answer's classification for each scenario
+CLARIFY = {
+    "intent": "explore",
+    "confidence": 0.6,
+    "signals": {"genre": "techno", "mood": "dark"},
+}
+ANSWERS = {
+    "same": {
+        "intent": "request_playlist",
+        "confidence": 0.9,
+        "signals": {"genre": "techno"},
+    },
+    "changed": {
+        "intent": "request_playlist",
+        "confidence": 0.9,
+        "signals": {"genre": "house"},
+    },
+}
+
+
+def run_playlist_turns(
+    turns: int, think: float, answer: dict, context: Context, model: FakeChatModel
+) -> float:
+    """Clarify then answer on fresh threads, return mean seconds of the answer turn."""
+    graph = builder.compile(checkpointer=InMemorySaver())
+    total = 0.0
+    for i in range(turns):
+        config = {
+            "configurable": {
+                "thread_id": f"{answer['signals']['genre']}-{context.speculative_playlist}-{i}"
+            }
+        }
+        model.structured_outputs["ChatClassification"] = CLARIFY
+        graph.invoke(
+            {"messages": [{"role": "human", "content": "hmm, something for later"}]},
+            config,
+            context=context,
+        )
+        # The user reading the question and typing an answer
+        time.sleep(think)
+
+        model.structured_outputs["ChatClassification"] = answer
+        start = time.perf_counter()
+        graph.invoke(
+            {"messages": [{"role": "human", "content": "the usual"}]},
+            config,
+            context=context,
+        )
+        total += time.perf_counter() - start
+    return total / turns
+
+
+def main() -> None:
+    """Run the speculative chat benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark speculative chat generation"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="Fake model latency per call (s)"
+    )
+    parser.add_argument("--turns", type=int, default=10, help="Turns per configuration")
+    parser.add_argument(
+        "--think",
+        type=float,
+        default=0.5,
+        help="User think time after a clarify turn (s)",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"Fake LLM latency: {args.latency * 1000:.0f} ms/call, {args.turns} turns each"
+    )
+    print(
+        f"{'route':<8}  {'speculative':<11}  {'ms/turn':>8}  {'wasted tokens/turn':>18}"
+    )
+
+    for route, classification in ROUTES.items():
+        model = FakeChatModel(latency=args.latency)
+        model.structured_outputs["ChatClassification"] = classification
+        with patched_llm(model):
+            for speculative in (False, True):
+                context = Context(
+                    classifier_model=None,
+                    classification_cache=False,
+                    speculative_chat=speculative,
+                )
+                wasted_before = metrics.counter("speculative_chat_wasted_tokens_total")
+                per_turn = asyncio.run(run_turns(args.turns, context))
+                wasted = (
+                    metrics.counter("speculative_chat_wasted_tokens_total")
+                    - wasted_before
+                )
+                print(
+                    f"{route:<8}  {str(speculative):<11}  {per_turn * 1000:>8.0f}"
+                    f"  {wasted / args.turns:>18.0f}"
+                )
+
+    print()
+    print(f"Clarify, {args.think * 1000:.0f} ms think time, then the answer turn")
+    print(
+        f"{'answer':<8}  {'speculative':<11}  {'ms/turn':>8}  {'wasted tokens/turn':>18}"
+    )
+    model = FakeChatModel(latency=args.latency)
+    with patched_llm(model):
+        for name, answer in ANSWERS.items():
+            for speculative in (False, True):
+                context = Context(
+                    classifier_model=None,
+                    classification_cache=False,
+                    speculative_playlist=speculative,
+                )
+                wasted_before = metrics.counter(
+                    "speculative_playlist_wasted_tokens_total"
+                )
+                per_turn = run_playlist_turns(
+                    args.turns, args.think, answer, context, model
+                )
+                wasted = (
+                    metrics.counter("speculative_playlist_wasted_tokens_total")
+                    - wasted_before
+                )
+                print(
+                    f"{name:<8}  {str(speculative):<11}  {per_turn * 1000:>8.0f}"
+                    f"  {wasted / args.turns:>18.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Cache building blocks - an in-memory LRU with TTLs and a persistent SQLite store.
+
+Both map string keys to JSON-serializable values and return ``MISSING`` on a
+miss, so ``None`` can be cached as a real value (e.g. negative results).
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Union
+
+MISSING: Any = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional TTL per entry.
+
+    ``on_evict`` is called with the key of every entry dropped for capacity or
+    expiry, so secondary indexes can stay in sync.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float | None = None,
+        on_evict: Callable[[str], None] | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Create an empty cache; ``on_evict`` is called with each key dropped for size or age."""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[Any, float | None]] = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        """Return the cached value, or MISSING if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self.clock():
+                del self._entries[key]
+                evicted = key
+            else:
+                self._entries.move_to_end(key)
+                return value
+        self._evicted([evicted])
+        return MISSING
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        """Store ``value``; ``ttl_seconds`` overrides the cache default."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = self.clock() + ttl if ttl is not None else None
+        evicted = []
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+        self._evicted(evicted)
+
+    def delete(self, key: str) -> None:
+        """Remove ``key`` if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        """Return the number of entries, expired ones included until they are next read."""
+        return len(self._entries)
+
+    def _evicted(self, keys: list[str]) -> None:
+        if self.on_evict is not None:
+            for key in keys:
+                self.on_evict(key)
+
+
+class SQLiteStore:
+    """Persistent key/value store with expiry, shareable across processes.
+
+    Uses WAL journaling and a busy timeout so several worker processes can
+    read and write the same file concurrently.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        table: str = "cache",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Open (or create) the database at ``path`` and its table."""
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table!r}")
+        self.path = str(path)
+        self.table = table
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def get(self, key: str) -> Any:
+        """Return the stored value, or MISSING if absent or expired."""
+        return self.get_with_ttl(key)[0]
+
+    def get_with_ttl(self, key: str) -> tuple[Any, float | None]:
+        """Return the stored value and its remaining seconds (None: no expiry).
+
+        The value is MISSING if absent or expired.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return MISSING, None
+        value, expires_at = row
+        if expires_at is None:
+            return json.loads(value), None
+        remaining = expires_at - self.clock()
+        if remaining <= 0:
+            self.delete(key)
+            return MISSING, None
+        return json.loads(value), remaining
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        """Store ``value`` as JSON, expiring after ``ttl_seconds`` if given."""
+        expires_at = self.clock() + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+
+    def delete(self, key: str) -> None:
+        """Remove ``key`` if present."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        """Remove every row of the table."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def purge_expired(self) -> int:
+        """Delete expired rows, returning how many were removed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (self.clock(),),
+            )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
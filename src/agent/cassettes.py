@@ -0,0 +1,177 @@
+"""LLM cassettes - record model responses once, replay them on every later run.
+
+A ``Cassette`` stores responses in a SQLite file keyed by the SHA-256 of the
+model, its parameters (temperature, bound tools, response format, ...) and
+the prompt messages, so a replayed call returns exactly what the recorded
+call did, in microseconds and without network access.
+
+- Graph models: ``Cassette`` is a LangChain ``BaseCache`` passed as the chat
+  model's ``cache``. Models built with a cassette have streaming disabled,
+  since LangChain's ``stream()`` bypasses the cache; a streamed node then
+  receives the whole reply as one chunk.
+- Judges: ``chat_completion()`` wraps ``client.chat.completions.create``.
+
+Modes:
+    replay  return recorded responses; record misses from the live model (default)
+    strict  return recorded responses; a miss raises ``CassetteMiss``
+    record  always call the live model and (re-)record the response
+
+Configured from the environment by ``get_cassette()``:
+    DJ_CASSETTE       SQLite path of the cassette (unset = live calls only)
+    DJ_CASSETTE_MODE  replay, strict or record (default replay)
+
+Metrics:
+    cassette_total{kind, outcome}  kind = chat_model or completion;
+                                   outcome = hit, miss or recorded
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Sequence, Union
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from agent.cache import MISSING, SQLiteStore
+from agent.metrics import metrics
+
+MODES = ("replay", "strict", "record")
+
+
+class CassetteMiss(LookupError):
+    """No recorded response for a call made in strict mode."""
+
+
+def cassette_key(*parts: str) -> str:
+    """Return the cassette key of a call, from the parts that identify it."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _dump_generations(generations: Sequence[Generation]) -> list[dict]:
+    dumped = []
+    for generation in generations:
+        entry: dict[str, Any] = {
+            "text": generation.text,
+            "info": generation.generation_info,
+        }
+        if isinstance(generation, ChatGeneration):
+            entry["message"] = messages_to_dict([generation.message])[0]
+        dumped.append(entry)
+    return dumped
+
+
+def _load_generations(dumped: list[dict]) -> list[Generation]:
+    return [
+        ChatGeneration(
+            message=messages_from_dict([entry["message"]])[0],
+            generation_info=entry["info"],
+        )
+        if "message" in entry
+        else Generation(text=entry["text"], generation_info=entry["info"])
+        for entry in dumped
+    ]
+
+
+class Cassette(BaseCache):
+    """Recorded LLM responses in a SQLite file."""
+
+    def __init__(self, path: Union[str, Path], mode: str = "replay") -> None:
+        """Open the cassette file at ``path`` in ``mode`` (replay, strict or record)."""
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}, expected one of {MODES}")
+        self.path = str(path)
+        self.mode = mode
+        self._store = SQLiteStore(path, table="cassette")
+
+    def get(self, key: str, kind: str) -> Any:
+        """Return the recorded value for ``key``, or MISSING when the live call should be made."""
+        if self.mode == "record":
+            return MISSING
+        value = self._store.get(key)
+        if value is MISSING:
+            metrics.incr("cassette_total", kind=kind, outcome="miss")
+            if self.mode == "strict":
+                raise CassetteMiss(
+                    f"No recorded {kind} response in {self.path} (key {key[:12]})"
+                )
+        else:
+            metrics.incr("cassette_total", kind=kind, outcome="hit")
+        return value
+
+    def put(self, key: str, value: Any, kind: str) -> None:
+        """Record ``value`` under ``key``."""
+        self._store.set(key, value)
+        metrics.incr("cassette_total", kind=kind, outcome="recorded")
+
+    # BaseCache, as consulted by BaseChatModel before and after each call
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        """Return the recorded generations of a chat model call, or None."""
+        value = self.get(cassette_key(llm_string, prompt), "chat_model")
+        return None if value is MISSING else _load_generations(value)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Record the generations of a chat model call."""
+        self.put(
+            cassette_key(llm_string, prompt),
+            _dump_generations(return_val),
+            "chat_model",
+        )
+
+    # A SQLite read is far cheaper than the executor hop of the default async versions
+    async def alookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        """Async variant of lookup."""
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(
+        self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE
+    ) -> None:
+        """Async variant of update."""
+        self.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        """Remove every recording."""
+        self._store.clear()
+
+    def close(self) -> None:
+        """Close the cassette file."""
+        self._store.close()
+
+
+def chat_completion(
+    client: Callable[[], Any], cassette: Cassette | None = None, **request: Any
+) -> Any:
+    """``client().chat.completions.create(**request)`` through the cassette.
+
+    The client is only created for live calls, so replays need no API key.
+    """
+    cassette = cassette or get_cassette()
+    if cassette is None:
+        return client().chat.completions.create(**request)
+
+    from openai.types.chat import ChatCompletion
+
+    key = cassette_key(
+        "chat.completions", json.dumps(request, sort_keys=True, default=str)
+    )
+    recorded = cassette.get(key, "completion")
+    if recorded is not MISSING:
+        return ChatCompletion.model_validate(recorded)
+    response = client().chat.completions.create(**request)
+    cassette.put(key, response.model_dump(mode="json"), "completion")
+    return response
+
+
+@lru_cache(maxsize=1)
+def get_cassette() -> Cassette | None:
+    """Cassette from DJ_CASSETTE, opened once per process (None if unset)."""
+    path = os.getenv("DJ_CASSETTE")
+    return Cassette(path, os.getenv("DJ_CASSETTE_MODE") or "replay") if path else None
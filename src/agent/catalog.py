@@ -0,0 +1,315 @@
+"""Local track catalog - validate LLM-proposed tracks before any network I/O.
+
+Proposed tracks are looked up in an in-process catalog loaded from a JSONL
+dump (or Parquet, with pyarrow) of {"artist", "title", "spotify_uri"?} rows:
+
+- exact: the normalized artist/title is in the catalog
+- repaired: a close match (typos, missing words) replaces the proposal,
+  including its spotify_uri when the dump has one, so no search is needed
+- rejected: nothing close enough; the track is most likely hallucinated
+
+Rows may also carry audio features - "bpm", "energy" (0-1) and "key" (Camelot
+"8A", or Spotify's pitch class plus "mode") - used to sequence proposals.
+
+Lookups use a character trigram inverted index over the distinct artist
+names. Posting lists are compact ``array("I")`` ids; a query only counts the
+postings of its rarest trigrams, scores the best candidates by trigram Dice
+similarity, then compares titles within the matched artists.
+
+Configured from the environment by ``get_catalog()``:
+    DJ_TRACK_CATALOG  path to a .jsonl or .parquet dump (unset = no validation)
+
+Usage:
+    # Check a dump and try some lookups
+    python -m agent.catalog tracks.jsonl "Daft Punk" "One More Tme"
+"""
+
+import argparse
+import json
+import math
+import os
+from array import array
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+from agent.metrics import metrics
+from agent.sequencing import TrackFeatures, camelot_key
+from agent.track_cache import normalize_name
+
+DEFAULT_MIN_SIMILARITY = 0.7
+EXACT_SIMILARITY = 1.0
+# Rarest query trigrams whose postings are counted, artist candidates
+# scored, and artists whose tracks are compared
+PROBE_TRIGRAMS = 6
+MAX_CANDIDATES = 16
+MAX_ARTISTS = 3
+# Title similarity credited to a title one edit away from a catalog title of
+# the same artist, where short titles ("Ech" / "Echo") score a low Dice
+ONE_EDIT_SIMILARITY = 0.85
+
+
+def _padded(name: str) -> str:
+    return f" {normalize_name(name)} "
+
+
+def _trigrams(key: str) -> set[str]:
+    return {key[i : i + 3] for i in range(len(key) - 2)}
+
+
+def _dice(a: set[str], b: set[str]) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+
+def _one_edit_apart(a: str, b: str) -> bool:
+    """Return True if one insertion, deletion or substitution turns ``a`` into ``b``."""
+    if abs(len(a) - len(b)) > 1 or a == b:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i + (len(a) == len(b)) :] == b[i + 1 :]
+
+
+class TrackCatalog:
+    """In-memory catalog with a fuzzy artist/title index.
+
+    Artists are matched first (exactly via a dict, else through the trigram
+    index over distinct artist names), then titles are compared within the
+    matched artists' tracks. Similarity is artist similarity times title
+    similarity.
+    """
+
+    def __init__(
+        self, records: Iterable[dict], min_similarity: float = DEFAULT_MIN_SIMILARITY
+    ) -> None:
+        """Index ``records`` (dicts with artist, title and an optional spotify_uri)."""
+        self.min_similarity = min_similarity
+        self._artist_ids: dict[str, int] = {}
+        self._artist_names: list[str] = []
+        self._artist_rows: list[array] = []
+        self._titles: list[str] = []
+        self._title_keys: list[str] = []
+        self._uris: list[str | None] = []
+        self._artist_of = array("I")
+        self._postings: dict[str, array] = {}
+        # Audio features, NaN / -1 when unknown
+        self._bpm = array("f")
+        self._energy = array("f")
+        self._key = array("b")
+
+        for row, record in enumerate(records):
+            artist_key = _padded(record["artist"])
+            artist_id = self._artist_ids.get(artist_key)
+            if artist_id is None:
+                artist_id = self._add_artist(artist_key, record["artist"])
+            self._artist_rows[artist_id].append(row)
+            self._artist_of.append(artist_id)
+            self._titles.append(record["title"])
+            self._title_keys.append(_padded(record["title"]))
+            self._uris.append(record.get("spotify_uri"))
+            self._bpm.append(record.get("bpm") or math.nan)
+            energy = record.get("energy")
+            self._energy.append(math.nan if energy is None else energy)
+            key = camelot_key(record)
+            self._key.append(-1 if key is None else key)
+
+    def _add_artist(self, key: str, name: str) -> int:
+        artist_id = len(self._artist_names)
+        self._artist_ids[key] = artist_id
+        self._artist_names.append(name)
+        self._artist_rows.append(array("I"))
+        for gram in _trigrams(key):
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array("I")
+            posting.append(artist_id)
+        return artist_id
+
+    @classmethod
+    def load(
+        cls, path: str, min_similarity: float = DEFAULT_MIN_SIMILARITY
+    ) -> "TrackCatalog":
+        """Build from a .jsonl or .parquet dump."""
+        return cls(read_records(path), min_similarity)
+
+    def __len__(self) -> int:
+        """Return the number of tracks."""
+        return len(self._titles)
+
+    def _track(self, row: int) -> dict:
+        return {
+            "artist": self._artist_names[self._artist_of[row]],
+            "title": self._titles[row],
+            "spotify_uri": self._uris[row],
+        }
+
+    def _row(self, artist: str, title: str) -> int | None:
+        """Row of an exact (normalized) artist/title match."""
+        artist_id = self._artist_ids.get(_padded(artist))
+        if artist_id is None:
+            return None
+        title_key = _padded(title)
+        return next(
+            (
+                row
+                for row in self._artist_rows[artist_id]
+                if self._title_keys[row] == title_key
+            ),
+            None,
+        )
+
+    def features(self, track: dict) -> TrackFeatures | None:
+        """Audio features of a catalog track (None if it isn't in the catalog)."""
+        row = self._row(track["artist"], track["title"])
+        if row is None:
+            return None
+        bpm, energy, key = self._bpm[row], self._energy[row], self._key[row]
+        return TrackFeatures(
+            bpm=None if math.isnan(bpm) else bpm,
+            energy=None if math.isnan(energy) else energy,
+            key=None if key < 0 else key,
+        )
+
+    def _match_artists(self, key: str) -> list[tuple[float, int]]:
+        """(similarity, artist id) of the artists close enough to ``key``."""
+        artist_id = self._artist_ids.get(key)
+        if artist_id is not None:
+            return [(EXACT_SIMILARITY, artist_id)]
+
+        grams = _trigrams(key)
+        # Trigrams missing from the index (often typos) can't contribute candidates
+        lists = sorted(
+            (self._postings[g] for g in grams if g in self._postings), key=len
+        )
+        counts: Counter[int] = Counter()
+        for posting in lists[:PROBE_TRIGRAMS]:
+            counts.update(posting)
+
+        matches = []
+        for candidate, _ in counts.most_common(MAX_CANDIDATES):
+            similarity = _dice(grams, _trigrams(_padded(self._artist_names[candidate])))
+            if similarity >= self.min_similarity:
+                matches.append((similarity, candidate))
+        return sorted(matches, reverse=True)[:MAX_ARTISTS]
+
+    def search(
+        self, artist: str, title: str, limit: int = 1
+    ) -> list[tuple[float, dict]]:
+        """Best catalog matches as (similarity, track), most similar first."""
+        title_key = _padded(title)
+        title_grams: set[str] | None = None
+        scored: list[tuple[float, int]] = []
+
+        for artist_similarity, artist_id in self._match_artists(_padded(artist)):
+            rows = self._artist_rows[artist_id]
+            exact = next(
+                (row for row in rows if self._title_keys[row] == title_key), None
+            )
+            if exact is not None:
+                scored.append((artist_similarity, exact))
+                continue
+            if title_grams is None:
+                title_grams = _trigrams(title_key)
+            for row in rows:
+                candidate = self._title_keys[row]
+                similarity = _dice(title_grams, _trigrams(candidate))
+                if similarity < ONE_EDIT_SIMILARITY and _one_edit_apart(
+                    title_key, candidate
+                ):
+                    similarity = ONE_EDIT_SIMILARITY
+                scored.append((artist_similarity * similarity, row))
+
+        scored.sort(reverse=True)
+        return [(similarity, self._track(row)) for similarity, row in scored[:limit]]
+
+    def check(self, track: dict) -> tuple[str, dict | None]:
+        """Classify a proposed track as exact, repaired or rejected.
+
+        Returns the outcome and the track to use (None when rejected).
+        """
+        matches = self.search(track["artist"], track["title"])
+        if not matches or matches[0][0] < self.min_similarity:
+            return "rejected", None
+        similarity, match = matches[0]
+        outcome = "exact" if similarity == EXACT_SIMILARITY else "repaired"
+        return outcome, {
+            **track,
+            **match,
+            "spotify_uri": match["spotify_uri"] or track.get("spotify_uri"),
+        }
+
+    def validate(self, tracks: Sequence[dict]) -> list[dict]:
+        """Repair or drop unknown tracks.
+
+        If the catalog knows none of them it probably doesn't cover this kind
+        of music, so the proposal is kept as is rather than emptied.
+        """
+        checked = [self.check(track) for track in tracks]
+        kept = [result for _, result in checked if result is not None]
+        if tracks and not kept:
+            metrics.incr(
+                "catalog_validation_total", value=len(tracks), outcome="uncovered"
+            )
+            return list(tracks)
+        for outcome, _ in checked:
+            metrics.incr("catalog_validation_total", outcome=outcome)
+        return kept
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Rows of a .jsonl or .parquet track dump."""
+    if Path(path).suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "Reading a Parquet catalog requires pyarrow: pip install pyarrow"
+            ) from e
+        table = pq.read_table(path)
+        columns = [
+            c
+            for c in ("artist", "title", "spotify_uri", "bpm", "energy", "key", "mode")
+            if c in table.column_names
+        ]
+        for batch in table.select(columns).to_batches():
+            yield from batch.to_pylist()
+        return
+
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+@lru_cache(maxsize=1)
+def get_catalog() -> TrackCatalog | None:
+    """Catalog from DJ_TRACK_CATALOG, built once per process (None if unset)."""
+    path = os.getenv("DJ_TRACK_CATALOG")
+    return TrackCatalog.load(path) if path else None
+
+
+def main() -> None:
+    """Look up a track in a catalog dump from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Look up tracks in a local catalog dump"
+    )
+    parser.add_argument("catalog", help=".jsonl or .parquet dump")
+    parser.add_argument("artist")
+    parser.add_argument("title")
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    catalog = TrackCatalog.load(args.catalog)
+    print(f"{len(catalog)} tracks")
+    for similarity, track in catalog.search(args.artist, args.title, args.limit):
+        print(
+            f"{similarity:.2f}  {track['artist']} – {track['title']}  {track['spotify_uri'] or ''}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Classification cache - reuse classify_intent results for repeated conversation windows.
+
+Lookups are keyed on the normalized recent window (the last few messages),
+scoped by a hash of whatever else the classifier sees - the rolling summary and
+older turns - so conversations that only share their last messages don't share
+entries:
+
+1. Exact: SHA-256 of the window, checked in an in-memory LRU and then, when a
+   ``db_path`` is configured, in a SQLite file shared across processes.
+2. Near-duplicate (optional): MinHash signatures of character shingles with an
+   LSH band index over the in-memory entries, so "make me a workout playlist!"
+   can reuse "Make me a workout playlist". Off unless a Jaccard threshold is set.
+
+Configured from the environment by ``ClassificationCache.from_env()``:
+    DJ_CLASSIFICATION_CACHE_DB              SQLite path (unset = memory only)
+    DJ_CLASSIFICATION_CACHE_TTL             entry TTL in seconds (default 86400)
+    DJ_CLASSIFICATION_CACHE_NEAR_DUPLICATE  Jaccard threshold, e.g. 0.9 (unset = off)
+"""
+
+import hashlib
+import os
+import random
+import threading
+from collections import defaultdict
+from typing import Sequence
+
+from langchain_core.messages import AnyMessage, BaseMessage
+
+from agent.cache import MISSING, LRUCache, SQLiteStore
+from agent.fast_classifier import normalize
+from agent.metrics import metrics
+
+DEFAULT_WINDOW = 3
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+class MinHashIndex:
+    """LSH index over MinHash signatures of character shingles."""
+
+    def __init__(
+        self, num_perm: int = 64, bands: int = 16, shingle_size: int = 4, seed: int = 7
+    ) -> None:
+        """Set up ``bands`` bands of ``num_perm // bands`` rows each over character shingles."""
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+        self._lock = threading.Lock()
+        self._buckets: dict[tuple[str, int, tuple[int, ...]], set[str]] = defaultdict(
+            set
+        )
+        self._signatures: dict[str, tuple[str, tuple[int, ...]]] = {}
+
+    def signature(self, text: str) -> tuple[int, ...]:
+        """Return the MinHash signature of ``text``."""
+        k = self.shingle_size
+        shingles = {text[i : i + k] for i in range(max(len(text) - k + 1, 1))}
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big")
+            for s in shingles
+        ]
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms
+        )
+
+    def _band_keys(
+        self, namespace: str, signature: tuple[int, ...]
+    ) -> list[tuple[str, int, tuple[int, ...]]]:
+        # Entries only ever collide with entries of the same namespace
+        return [
+            (namespace, band, signature[band * self.rows : (band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+    def add(self, key: str, text: str, namespace: str = "") -> None:
+        """Index ``text`` under ``key`` within ``namespace``."""
+        signature = self.signature(text)
+        with self._lock:
+            self._signatures[key] = (namespace, signature)
+            for band_key in self._band_keys(namespace, signature):
+                self._buckets[band_key].add(key)
+
+    def remove(self, key: str) -> None:
+        """Drop ``key`` from the index."""
+        with self._lock:
+            entry = self._signatures.pop(key, None)
+            if entry is None:
+                return
+            for band_key in self._band_keys(*entry):
+                bucket = self._buckets.get(band_key)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[band_key]
+
+    def query(self, text: str, threshold: float, namespace: str = "") -> str | None:
+        """Key of the most similar entry with estimated Jaccard >= threshold."""
+        signature = self.signature(text)
+        with self._lock:
+            band_keys = self._band_keys(namespace, signature)
+            candidates = set().union(*(self._buckets.get(b, ()) for b in band_keys))
+            best, best_score = None, threshold
+            for key in candidates:
+                other = self._signatures[key][1]
+                score = sum(x == y for x, y in zip(signature, other)) / len(signature)
+                if score >= best_score:
+                    best, best_score = key, score
+        return best
+
+
+class ClassificationCache:
+    """Exact and near-duplicate cache of ChatClassification results."""
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        ttl_seconds: float | None = DEFAULT_TTL_SECONDS,
+        db_path: str | None = None,
+        near_duplicate_threshold: float | None = None,
+        window: int = DEFAULT_WINDOW,
+    ) -> None:
+        """Create the cache; ``db_path`` adds a persistent tier under the in-memory one."""
+        self.window = window
+        self.ttl_seconds = ttl_seconds
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self._index = MinHashIndex() if near_duplicate_threshold is not None else None
+        self._memory = LRUCache(
+            max_entries,
+            ttl_seconds,
+            on_evict=self._index.remove if self._index is not None else None,
+        )
+        self._disk = SQLiteStore(db_path, table="classifications") if db_path else None
+
+    @classmethod
+    def from_env(cls) -> "ClassificationCache":
+        """Build the cache from the DJ_CLASSIFICATION_CACHE_* environment variables."""
+        ttl = os.getenv("DJ_CLASSIFICATION_CACHE_TTL")
+        near_duplicate = os.getenv("DJ_CLASSIFICATION_CACHE_NEAR_DUPLICATE")
+        return cls(
+            ttl_seconds=float(ttl) if ttl else DEFAULT_TTL_SECONDS,
+            db_path=os.getenv("DJ_CLASSIFICATION_CACHE_DB") or None,
+            near_duplicate_threshold=float(near_duplicate) if near_duplicate else None,
+        )
+
+    def window_text(self, messages: Sequence[AnyMessage]) -> str:
+        """Return the normalized text of the recent conversation window."""
+        return "\n".join(
+            f"{m.type}: {normalize(m.text)}" for m in messages[-self.window :]
+        )
+
+    def _scope(self, namespace: str, history: Sequence[BaseMessage]) -> str:
+        """Namespace narrowed to the classifier's context before the window."""
+        earlier = list(history)[: -self.window]
+        if not earlier:
+            return namespace
+        text = "\n".join(f"{m.type}: {normalize(m.text)}" for m in earlier)
+        return f"{namespace}\x00{hashlib.sha256(text.encode()).hexdigest()[:16]}"
+
+    @staticmethod
+    def _key(namespace: str, text: str) -> str:
+        return hashlib.sha256(f"{namespace}\x00{text}".encode()).hexdigest()
+
+    def get(
+        self,
+        messages: Sequence[AnyMessage],
+        namespace: str = "",
+        history: Sequence[BaseMessage] = (),
+    ) -> dict | None:
+        """Return the cached classification for this window, or None on a miss.
+
+        ``history`` is the full conversation the classifier is shown (summary
+        included); everything in it before the window is part of the key.
+        """
+        namespace = self._scope(namespace, history)
+        text = self.window_text(messages)
+        key = self._key(namespace, text)
+
+        value = self._memory.get(key)
+        if value is not MISSING:
+            metrics.incr("classification_cache_total", outcome="hit_memory")
+            return value
+
+        if self._disk is not None:
+            value = self._disk.get(key)
+            if value is not MISSING:
+                self._remember(key, text, value, namespace)
+                metrics.incr("classification_cache_total", outcome="hit_disk")
+                return value
+
+        if self._index is not None and self.near_duplicate_threshold is not None:
+            similar = self._index.query(text, self.near_duplicate_threshold, namespace)
+            if (
+                similar is not None
+                and (value := self._memory.get(similar)) is not MISSING
+            ):
+                metrics.incr("classification_cache_total", outcome="hit_near_duplicate")
+                return value
+
+        metrics.incr("classification_cache_total", outcome="miss")
+        return None
+
+    def put(
+        self,
+        messages: Sequence[AnyMessage],
+        classification: dict,
+        namespace: str = "",
+        history: Sequence[BaseMessage] = (),
+    ) -> None:
+        """Cache the classification of this window."""
+        namespace = self._scope(namespace, history)
+        text = self.window_text(messages)
+        key = self._key(namespace, text)
+        self._remember(key, text, classification, namespace)
+        if self._disk is not None:
+            self._disk.set(key, classification, self.ttl_seconds)
+
+    def _remember(self, key: str, text: str, value: dict, namespace: str = "") -> None:
+        self._memory.set(key, value)
+        if self._index is not None:
+            self._index.add(key, text, namespace)
+
+    def clear(self) -> None:
+        """Drop the in-memory entries (the SQLite file is left untouched)."""
+        self._memory.clear()
+        if self._index is not None:
+            self._index = MinHashIndex()
+            self._memory.on_evict = self._index.remove
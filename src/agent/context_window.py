@@ -0,0 +1,171 @@
+"""Conversation context window - recent turns verbatim plus a rolling summary.
+
+Prompts carry the last ``max_turns`` user turns (and the replies between them)
+verbatim, trimmed to a per-node token budget. Everything older is folded into
+``DJState.summary`` by the summarize_history node, incrementally: only messages
+that have left the window since the last update are summarized, and
+``DJState.summary_cursor`` remembers the id of the last one folded in.
+
+Folding is batched: messages that left the window stay verbatim until
+``batch_turns`` user turns have piled up, then all of them are summarized in
+one call, so the summarizer sits on the critical path once per batch rather
+than on every turn. It folds early when the token budget would otherwise drop
+messages that are not in the summary yet.
+"""
+
+from typing import Sequence
+
+from langchain_core.messages import (
+    AnyMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    trim_messages,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an underground DJ assistant.
+
+Update the summary with the new messages below. Keep what matters for future music recommendations:
+the user's tastes (genres, moods, artists), what they are doing while listening, playlists that were
+proposed, accepted or rejected, and why. Drop small talk. Write at most 120 words.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW MESSAGES:
+{messages}
+
+Return only the updated summary."""
+
+
+def window_start(messages: Sequence[AnyMessage], max_turns: int) -> int:
+    """Index of the first message of the last ``max_turns`` user turns."""
+    turns = 0
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            turns += 1
+            if turns == max_turns:
+                return i
+    return 0
+
+
+def _cursor_index(messages: Sequence[AnyMessage], cursor: str | None) -> int | None:
+    """Index just past the last summarized message (None if the cursor is gone)."""
+    if cursor is None:
+        return 0
+    for i, message in enumerate(messages):
+        if message.id == cursor:
+            return i + 1
+    return None
+
+
+def _trimmed_start(
+    messages: Sequence[AnyMessage], start: int, token_budget: int | None
+) -> int:
+    """Index of the first of ``messages[start:]`` that fits in ``token_budget``."""
+    if token_budget is None or start >= len(messages):
+        return start
+    trimmed = trim_messages(
+        list(messages[start:]),
+        max_tokens=token_budget,
+        token_counter=count_tokens_approximately,
+        strategy="last",
+        start_on="human",
+    )
+    # Never drop the message being answered, even if it alone is over budget
+    return len(messages) - max(len(trimmed), 1)
+
+
+def _verbatim_start(
+    messages: Sequence[AnyMessage], cursor: str | None, max_turns: int, batch_turns: int
+) -> int:
+    """Start of the verbatim window before trimming.
+
+    That is the last ``max_turns`` user turns, plus any older ones still
+    waiting to be summarized (up to ``batch_turns - 1``).
+    """
+    start = window_start(messages, max_turns)
+    summarized = _cursor_index(messages, cursor)
+    if summarized is None or batch_turns <= 1:
+        return start
+    return max(
+        window_start(messages, max_turns + batch_turns - 1), min(summarized, start)
+    )
+
+
+def messages_to_summarize(
+    messages: Sequence[AnyMessage],
+    cursor: str | None,
+    max_turns: int,
+    token_budget: int | None = None,
+    batch_turns: int = 1,
+) -> list[AnyMessage]:
+    """Messages to fold into the summary now.
+
+    That is everything from the cursor to the start of the budget-trimmed
+    window, once ``batch_turns`` user turns of it have accumulated or the
+    budget would drop some of it. Nothing while the cursor is missing (see
+    ``resume_cursor``).
+    """
+    start = _cursor_index(messages, cursor)
+    end = _trimmed_start(messages, window_start(messages, max_turns), token_budget)
+    if start is None or start >= end:
+        return []
+    pending = messages[start:end]
+    overflow = sum(isinstance(m, HumanMessage) for m in pending)
+    shown = _trimmed_start(
+        messages,
+        _verbatim_start(messages, cursor, max_turns, batch_turns),
+        token_budget,
+    )
+    if overflow < batch_turns and shown <= start:
+        return []
+    return list(pending)
+
+
+def resume_cursor(
+    messages: Sequence[AnyMessage], cursor: str | None, max_turns: int
+) -> str | None:
+    """Cursor to continue from when ``cursor`` is no longer in ``messages``.
+
+    When the history was rewritten under the summary, the existing summary is
+    kept and folding restarts at the window boundary rather than
+    re-summarizing the whole conversation. None if the cursor is intact (or
+    there is no message before the window yet).
+    """
+    if _cursor_index(messages, cursor) is not None:
+        return None
+    start = window_start(messages, max_turns)
+    return messages[start - 1].id if start > 0 else None
+
+
+def summary_prompt(summary: str | None, pending: Sequence[BaseMessage]) -> str:
+    """Build the incremental summarization prompt."""
+    rendered = "\n".join(f"{m.type}: {m.text}" for m in pending)
+    return SUMMARY_PROMPT.format(summary=summary or "(empty)", messages=rendered)
+
+
+def build_history(
+    messages: Sequence[AnyMessage],
+    summary: str | None,
+    max_turns: int,
+    token_budget: int | None = None,
+    cursor: str | None = None,
+    batch_turns: int = 1,
+) -> list[BaseMessage]:
+    """Summary (if any) followed by the recent window, trimmed to ``token_budget``.
+
+    With ``batch_turns > 1`` the window also keeps the turns past the cursor
+    that are waiting for the next batched summary.
+    """
+    start = _verbatim_start(messages, cursor, max_turns, batch_turns)
+    window: list[BaseMessage] = list(
+        messages[_trimmed_start(messages, start, token_budget) :]
+    )
+
+    if summary:
+        return [
+            SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")
+        ] + window
+    return window
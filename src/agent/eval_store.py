@@ -0,0 +1,168 @@
+"""Eval results store - rerun only the examples a change can affect.
+
+Each evaluated example is stored in a SQLite file with its result rows and
+a fingerprint: the SHA-256 of its inputs and reference outputs, the
+fingerprints (``agent.graph.node_fingerprints``) of the nodes its runs went
+through, the judge model, each evaluator's version and the repetition
+count. On the next run an example whose fingerprint is unchanged is not
+evaluated again - its stored rows are reported with ``"cached": True`` - so
+editing the chat prompt only reruns the examples that reached the chat node.
+
+An evaluator's version is its ``version`` attribute if it has one (see
+``MultiCriteria``), else a hash of its module's source. Examples with an
+error in any repetition are not stored, so they are retried. Changes to
+graph code outside the hashed prompts are not detected; pass ``full=True``
+(``--full``) to rerun everything.
+
+Usage:
+    python -m agent.run_evaluation --local data/golden_dataset.jsonl --incremental eval-store.sqlite
+
+Metrics:
+    eval_store_total{outcome}  examples reused or rerun
+"""
+
+import hashlib
+import inspect
+import json
+from pathlib import Path
+from typing import Any, Collection, Iterator, Sequence, Union
+
+from agent.cache import MISSING, SQLiteStore
+from agent.local_evaluation import Evaluator, evaluate_file, read_examples
+from agent.metrics import metrics
+
+
+def evaluator_version(evaluator: Evaluator) -> str:
+    """Return the evaluator's ``version``, or a hash of the source of its module."""
+    version = getattr(evaluator, "version", None)
+    if version is not None:
+        return str(version)
+    source = inspect.getsource(inspect.getmodule(evaluator))
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+
+def example_fingerprint(
+    inputs: dict,
+    reference_outputs: dict,
+    nodes: Collection[str],
+    node_fingerprints: dict[str, str],
+    evaluator_versions: dict[str, str],
+    repetitions: int,
+) -> str:
+    """Hash of everything an example's stored results depend on."""
+    from agent.evaluators.judge import JUDGE_MODEL
+
+    payload = {
+        "inputs": inputs,
+        "reference_outputs": reference_outputs,
+        # A node that no longer exists hashes to None, which never matches
+        "nodes": {node: node_fingerprints.get(node) for node in sorted(nodes)},
+        "judge_model": JUDGE_MODEL,
+        "evaluators": evaluator_versions,
+        "repetitions": repetitions,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class EvalStore:
+    """Result rows of evaluated examples, keyed by example id."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """Open (or create) the store at ``path``."""
+        self._store = SQLiteStore(path, table="eval_results")
+
+    def get(self, example_id: str) -> dict | None:
+        """``{"fingerprint", "nodes", "rows"}`` of a stored example, or None."""
+        entry = self._store.get(example_id)
+        return None if entry is MISSING else entry
+
+    def put(
+        self, example_id: str, fingerprint: str, nodes: Sequence[str], rows: list[dict]
+    ) -> None:
+        """Store the result rows of an example under its fingerprint."""
+        self._store.set(
+            example_id, {"fingerprint": fingerprint, "nodes": list(nodes), "rows": rows}
+        )
+
+    def clear(self) -> None:
+        """Remove every stored example."""
+        self._store.clear()
+
+    def close(self) -> None:
+        """Close the store."""
+        self._store.close()
+
+
+def evaluate_incremental(
+    path: str,
+    evaluators: Sequence[Evaluator],
+    store: EvalStore,
+    repetitions: int = 1,
+    full: bool = False,
+    **kwargs: Any,
+) -> Iterator[dict]:
+    """Like ``evaluate_file``, but reuse the stored rows of unchanged examples.
+
+    Reused rows are yielded first, then the rows of the rerun examples as
+    they complete; rerun examples are stored once all their repetitions are
+    in. ``kwargs`` go to ``evaluate_file`` (concurrency, processes).
+    """
+    from agent.graph import node_fingerprints
+
+    fingerprints = node_fingerprints()
+    versions = {
+        getattr(e, "__name__", str(e)): evaluator_version(e) for e in evaluators
+    }
+
+    def fingerprint(
+        inputs: dict, reference_outputs: dict, nodes: Collection[str]
+    ) -> str:
+        return example_fingerprint(
+            inputs, reference_outputs, nodes, fingerprints, versions, repetitions
+        )
+
+    stale = set()
+    for example in read_examples(path):
+        entry = None if full else store.get(example.id)
+        if entry is not None and entry["fingerprint"] == fingerprint(
+            example.inputs, example.reference_outputs, entry["nodes"]
+        ):
+            metrics.incr("eval_store_total", outcome="reused")
+            for row in entry["rows"]:
+                yield {**row, "cached": True}
+        else:
+            stale.add(example.id)
+    if not stale:
+        return
+
+    pending: dict[str, list[dict]] = {}
+    for row in evaluate_file(
+        path, evaluators, repetitions=repetitions, only=stale, **kwargs
+    ):
+        yield row
+        rows = pending.setdefault(row["example_id"], [])
+        rows.append(row)
+        if len(rows) < repetitions:
+            continue
+        del pending[row["example_id"]]
+        metrics.incr("eval_store_total", outcome="rerun")
+        if any(r["error"] is not None for r in rows):
+            continue
+        # Repetitions can route differently; any of their nodes invalidates
+        nodes = sorted({node for r in rows for node in r["nodes"]})
+        rows.sort(key=lambda r: r["repetition"])
+        store.put(
+            row["example_id"],
+            fingerprint(row["inputs"], row["reference_outputs"], nodes),
+            nodes,
+            rows,
+        )
+
+
+def store_stats() -> dict[str, float]:
+    """Examples reused from the eval store and examples rerun, so far in this process."""
+    return {
+        "reused_examples": metrics.counter("eval_store_total", outcome="reused"),
+        "rerun_examples": metrics.counter("eval_store_total", outcome="rerun"),
+    }
@@ -1,10 +1,14 @@
-"""
-Evaluators module - export all evaluators for easy importing.
-"""
+"""Evaluators module - export all evaluators for easy importing."""
 
-from .playlist_quality import playlist_quality
-from .conversation_tone import conversation_tone
 from .classification_accuracy import classification_accuracy
+from .conversation_tone import conversation_tone
+from .multi_criteria import MultiCriteria, multi_criteria
+from .playlist_quality import playlist_quality
 
-__all__ = ["playlist_quality", "conversation_tone", "classification_accuracy"]
-
+__all__ = [
+    "playlist_quality",
+    "conversation_tone",
+    "classification_accuracy",
+    "multi_criteria",
+    "MultiCriteria",
+]
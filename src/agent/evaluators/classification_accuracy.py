@@ -1,11 +1,10 @@
-"""
-Classification accuracy evaluator - checks if classify_intent predicted the correct intent.
-"""
+"""Classification accuracy evaluator - checks if classify_intent predicted the correct intent."""
 
 
-def classification_accuracy(inputs: dict, outputs: dict, reference_outputs: dict = None) -> dict:
-    """
-    Evaluate if the classification intent was correct.
+def classification_accuracy(
+    inputs: dict, outputs: dict, reference_outputs: dict = None
+) -> dict:
+    """Evaluate if the classification intent was correct.
 
     Args:
         inputs: Input data
@@ -23,7 +22,7 @@ def classification_accuracy(inputs: dict, outputs: dict, reference_outputs: dict
         return {
             "key": "classification_accuracy",
             "score": 0.0,
-            "comment": "No classification found in outputs"
+            "comment": "No classification found in outputs",
         }
 
     # Check if we have reference data
@@ -34,7 +33,7 @@ def classification_accuracy(inputs: dict, outputs: dict, reference_outputs: dict
             return {
                 "key": "classification_accuracy",
                 "score": 0.5,
-                "comment": "No expected_intent in reference outputs"
+                "comment": "No expected_intent in reference outputs",
             }
 
         # Check if prediction matches expected
@@ -43,13 +42,13 @@ def classification_accuracy(inputs: dict, outputs: dict, reference_outputs: dict
         return {
             "key": "classification_accuracy",
             "score": 1.0 if is_correct else 0.0,
-            "comment": f"Predicted: {predicted_intent}, Expected: {expected_intent}" + (" ✓" if is_correct else " ✗")
+            "comment": f"Predicted: {predicted_intent}, Expected: {expected_intent}"
+            + (" ✓" if is_correct else " ✗"),
         }
     else:
         # No reference data - can't evaluate accuracy
         return {
             "key": "classification_accuracy",
             "score": 0.5,
-            "comment": f"Predicted: {predicted_intent} (no reference to compare)"
+            "comment": f"Predicted: {predicted_intent} (no reference to compare)",
         }
-
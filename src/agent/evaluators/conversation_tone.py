@@ -1,15 +1,23 @@
-"""
-Conversation tone evaluator - LLM-as-judge for DJ conversation style.
-"""
+"""Conversation tone evaluator - LLM-as-judge for DJ conversation style."""
 
-from openai import OpenAI
+from agent.evaluators.judge import run_judge
 
-client = OpenAI()
+PERSONA = """The DJ should sound like a friendly underground DJ friend:
+- Knowledgeable about music but not pretentious
+- Warm and casual, not corporate or robotic
+- Enthusiastic without being over-the-top
+- Helpful without being pushy about playlists"""
+
+SCALE = """Rate the tone from 0.0 to 1.0:
+- 1.0 = Sounds like a cool DJ friend
+- 0.5 = Generic/neutral assistant tone
+- 0.0 = Robotic, corporate, or off-putting"""
+
+CRITERION = f"{PERSONA}\n\n{SCALE}"
 
 
 def conversation_tone(inputs: dict, outputs: dict) -> dict:
-    """
-    LLM-as-judge evaluator for DJ conversation tone.
+    """LLM-as-judge evaluator for DJ conversation tone.
 
     The DJ should be: friendly, knowledgeable, casual, not pushy,
     like an underground DJ friend who knows their stuff.
@@ -21,37 +29,22 @@ def conversation_tone(inputs: dict, outputs: dict) -> dict:
 
     prompt = f"""You are evaluating a DJ assistant's conversational tone.
 
-The DJ should sound like a friendly underground DJ friend:
-- Knowledgeable about music but not pretentious
-- Warm and casual, not corporate or robotic
-- Enthusiastic without being over-the-top
-- Helpful without being pushy about playlists
+{PERSONA}
 
 DJ'S RESPONSE:
 {response}
 
-Rate the tone from 0.0 to 1.0:
-- 1.0 = Sounds like a cool DJ friend
-- 0.5 = Generic/neutral assistant tone
-- 0.0 = Robotic, corporate, or off-putting
+{SCALE}
 
 Respond with ONLY a JSON object:
 {{"score": 0.X, "reason": "brief explanation"}}"""
 
-    result = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0,
-    )
-
-    import json
+    parsed = run_judge(("conversation_tone",), prompt)
     try:
-        parsed = json.loads(result.choices[0].message.content)
         return {
             "key": "conversation_tone",
             "score": float(parsed.get("score", 0)),
-            "comment": parsed.get("reason", "")
+            "comment": parsed.get("reason", ""),
         }
-    except:
+    except (AttributeError, KeyError, TypeError, ValueError):
         return {"key": "conversation_tone", "score": 0, "comment": "Failed to parse"}
-
@@ -0,0 +1,113 @@
+"""Judge calls shared by the LLM-as-judge evaluators, with a content-addressed cache.
+
+A verdict is cached under (criteria, SHA-256 of the judge prompt, judge
+model). The prompt contains everything the judge sees, so an unchanged
+output is never re-judged across repetitions or runs, while any change to
+the output, the rubric or the model misses. Verdicts are kept in an
+in-memory LRU and, when a ``db_path`` is configured, in a SQLite file.
+
+Configured from the environment by ``JudgeCache.from_env()``:
+    DJ_JUDGE_CACHE_DB  SQLite path (unset = memory only)
+
+Metrics:
+    judge_calls_total{model}     judge requests actually sent
+    judge_cache_total{outcome}   hit or miss
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Any, Sequence
+
+from agent.cache import MISSING, LRUCache, SQLiteStore
+from agent.cassettes import chat_completion
+from agent.metrics import metrics
+
+JUDGE_MODEL = "gpt-4o-mini"
+
+
+@lru_cache(maxsize=1)
+def _client():
+    """OpenAI client, created on the first judge call rather than at import."""
+    from openai import OpenAI
+
+    return OpenAI()
+
+
+def judge_key(criteria: Sequence[str], prompt: str, model: str) -> str:
+    """Cache key of a verdict."""
+    prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()
+    return f"{model}\x00{','.join(criteria)}\x00{prompt_hash}"
+
+
+class JudgeCache:
+    """Memory + SQLite cache of parsed judge verdicts."""
+
+    def __init__(self, max_entries: int = 10_000, db_path: str | None = None) -> None:
+        """Create the cache; ``db_path`` adds a persistent tier under the in-memory one."""
+        self._memory = LRUCache(max_entries)
+        self._disk = SQLiteStore(db_path, table="judge_verdicts") if db_path else None
+
+    @classmethod
+    def from_env(cls) -> "JudgeCache":
+        """Build the cache from DJ_JUDGE_CACHE_DB."""
+        return cls(db_path=os.getenv("DJ_JUDGE_CACHE_DB") or None)
+
+    def get(self, key: str) -> Any:
+        """Return the cached verdict for ``key``, or MISSING."""
+        value = self._memory.get(key)
+        if value is MISSING and self._disk is not None:
+            value = self._disk.get(key)
+            if value is not MISSING:
+                self._memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Cache a verdict in memory and, if configured, on disk."""
+        self._memory.set(key, value)
+        if self._disk is not None:
+            self._disk.set(key, value)
+
+    def clear(self) -> None:
+        """Remove every cached verdict."""
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+
+judge_cache = JudgeCache.from_env()
+
+
+def run_judge(
+    criteria: Sequence[str],
+    prompt: str,
+    model: str = JUDGE_MODEL,
+    response_format: dict | None = None,
+) -> dict | None:
+    """Return the judge's JSON verdict on ``prompt`` (None if unparseable, which isn't cached)."""
+    key = judge_key(criteria, prompt, model)
+    verdict = judge_cache.get(key)
+    if verdict is not MISSING:
+        metrics.incr("judge_cache_total", outcome="hit")
+        return verdict
+    metrics.incr("judge_cache_total", outcome="miss")
+
+    request: dict[str, Any] = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0,
+    }
+    if response_format is not None:
+        request["response_format"] = response_format
+    response = chat_completion(_client, **request)
+    metrics.incr("judge_calls_total", model=model)
+
+    try:
+        verdict = json.loads(response.choices[0].message.content)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(verdict, dict):
+        return None
+    judge_cache.set(key, verdict)
+    return verdict
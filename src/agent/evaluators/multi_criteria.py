@@ -0,0 +1,143 @@
+"""Multi-criteria evaluator - one structured judge call scores every criterion.
+
+The per-criterion judges each send the conversation and response in their
+own request; this evaluator sends them once with all requested rubrics and
+asks for a JSON object with a score and reason per criterion (enforced by a
+strict JSON schema). Criteria that don't apply to an output (no playlist, no
+response) score 0 without being sent, exactly as their single judges do.
+Verdicts go through the judge cache like any other judge call.
+"""
+
+import hashlib
+import inspect
+from typing import Sequence
+
+from agent.evaluators.conversation_tone import CRITERION as TONE_CRITERION
+from agent.evaluators.judge import JUDGE_MODEL, run_judge
+from agent.evaluators.playlist_quality import CRITERION as PLAYLIST_CRITERION
+
+CRITERIA = {
+    "playlist_quality": PLAYLIST_CRITERION,
+    "conversation_tone": TONE_CRITERION,
+}
+
+
+def _not_applicable(criterion: str, outputs: dict) -> str | None:
+    """Why ``criterion`` can't be judged for ``outputs``, if it can't."""
+    if criterion == "playlist_quality":
+        return None if outputs.get("proposed_tracks") else "No playlist generated"
+    return None if outputs.get("response") else "No response"
+
+
+def _response_format(criteria: Sequence[str]) -> dict:
+    verdict = {
+        "type": "object",
+        "properties": {"score": {"type": "number"}, "reason": {"type": "string"}},
+        "required": ["score", "reason"],
+        "additionalProperties": False,
+    }
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "verdicts",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {criterion: verdict for criterion in criteria},
+                "required": list(criteria),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def judge_prompt(inputs: dict, outputs: dict, criteria: Sequence[str]) -> str:
+    """One prompt with the conversation, the DJ's output and every rubric."""
+    conversation = "\n".join(
+        f"{m.get('role', 'unknown')}: {m.get('content', '')}"
+        for m in inputs.get("messages", [])
+    )
+    sections = [
+        "You are evaluating a DJ assistant's reply on several criteria.",
+        f"CONVERSATION:\n{conversation}",
+        f"DJ'S RESPONSE:\n{outputs.get('response', '')}",
+    ]
+    tracks = outputs.get("proposed_tracks") or []
+    if tracks:
+        track_list = "\n".join(f"- {t['artist']} – {t['title']}" for t in tracks)
+        sections.append(f"PROPOSED PLAYLIST:\n{track_list}")
+    sections.extend(
+        f"CRITERION {criterion}:\n{CRITERIA[criterion]}" for criterion in criteria
+    )
+    sections.append(
+        "Respond with ONLY a JSON object with one entry per criterion:\n"
+        + "{"
+        + ", ".join(
+            f'"{c}": {{"score": 0.X, "reason": "brief explanation"}}' for c in criteria
+        )
+        + "}"
+    )
+    return "\n\n".join(sections)
+
+
+class MultiCriteria:
+    """Evaluator scoring ``criteria`` with a single judge call per example.
+
+    A class rather than a closure so instances pickle into evaluation
+    worker processes.
+    """
+
+    __name__ = "multi_criteria"
+
+    def __init__(self, criteria: Sequence[str] = tuple(CRITERIA)) -> None:
+        """Judge ``criteria`` (default: all of CRITERIA)."""
+        unknown = set(criteria) - set(CRITERIA)
+        if unknown:
+            raise ValueError(f"Unknown criteria: {sorted(unknown)}")
+        self.criteria = tuple(criteria)
+
+    @property
+    def version(self) -> str:
+        """Changes with the rubrics, the prompt layout or the judge model (see agent.eval_store)."""
+        parts = [
+            JUDGE_MODEL,
+            inspect.getsource(judge_prompt),
+            *(f"{c}: {CRITERIA[c]}" for c in self.criteria),
+        ]
+        return hashlib.sha256("\x00".join(parts).encode()).hexdigest()[:16]
+
+    def __call__(self, inputs: dict, outputs: dict) -> dict:
+        """Score every criterion, judging the applicable ones in a single call."""
+        results = {}
+        judged = []
+        for criterion in self.criteria:
+            reason = _not_applicable(criterion, outputs)
+            if reason is None:
+                judged.append(criterion)
+            else:
+                results[criterion] = {"key": criterion, "score": 0, "comment": reason}
+
+        if judged:
+            prompt = judge_prompt(inputs, outputs, judged)
+            verdicts = run_judge(
+                judged, prompt, response_format=_response_format(judged)
+            )
+            for criterion in judged:
+                verdict = (verdicts or {}).get(criterion)
+                try:
+                    results[criterion] = {
+                        "key": criterion,
+                        "score": float(verdict["score"]),
+                        "comment": verdict.get("reason", ""),
+                    }
+                except (TypeError, KeyError, ValueError):
+                    results[criterion] = {
+                        "key": criterion,
+                        "score": 0,
+                        "comment": "Failed to parse judge response",
+                    }
+
+        return {"results": [results[criterion] for criterion in self.criteria]}
+
+
+multi_criteria = MultiCriteria()
@@ -1,15 +1,15 @@
-"""
-Playlist quality evaluator - LLM-as-judge for playlist recommendations.
-"""
+"""Playlist quality evaluator - LLM-as-judge for playlist recommendations."""
 
-from openai import OpenAI
+from agent.evaluators.judge import run_judge
 
-client = OpenAI()
+CRITERION = """Rate the playlist quality from 0.0 to 1.0 based on:
+1. Does it match what the user asked for in the conversation?
+2. Do the tracks fit the mood/genre the user requested?
+3. Is it a coherent playlist that flows well together?"""
 
 
 def playlist_quality(inputs: dict, outputs: dict) -> dict:
-    """
-    LLM-as-judge evaluator for playlist quality.
+    """LLM-as-judge evaluator for playlist quality.
 
     Judges whether the proposed playlist matches the user's request
     based purely on the conversation and output.
@@ -17,14 +17,17 @@ def playlist_quality(inputs: dict, outputs: dict) -> dict:
     # Get conversation context
     messages = inputs.get("messages", [])
     conversation = "\n".join(
-        f"{m.get('role', 'unknown')}: {m.get('content', '')}"
-        for m in messages
+        f"{m.get('role', 'unknown')}: {m.get('content', '')}" for m in messages
     )
 
     # Get proposed tracks
     tracks = outputs.get("proposed_tracks", [])
     if not tracks:
-        return {"key": "playlist_quality", "score": 0, "comment": "No playlist generated"}
+        return {
+            "key": "playlist_quality",
+            "score": 0,
+            "comment": "No playlist generated",
+        }
 
     track_list = "\n".join(f"- {t['artist']} – {t['title']}" for t in tracks)
     vibe = outputs.get("response", "")
@@ -39,28 +42,21 @@ PROPOSED PLAYLIST:
 
 DJ's vibe description: {vibe}
 
-Rate the playlist quality from 0.0 to 1.0 based on:
-1. Does it match what the user asked for in the conversation?
-2. Do the tracks fit the mood/genre the user requested?
-3. Is it a coherent playlist that flows well together?
+{CRITERION}
 
 Respond with ONLY a JSON object:
 {{"score": 0.X, "reason": "brief explanation"}}"""
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0,
-    )
-
-    import json
+    result = run_judge(("playlist_quality",), prompt)
     try:
-        result = json.loads(response.choices[0].message.content)
         return {
             "key": "playlist_quality",
             "score": float(result.get("score", 0)),
-            "comment": result.get("reason", "")
+            "comment": result.get("reason", ""),
+        }
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return {
+            "key": "playlist_quality",
+            "score": 0,
+            "comment": "Failed to parse judge response",
         }
-    except:
-        return {"key": "playlist_quality", "score": 0, "comment": "Failed to parse judge response"}
-
@@ -0,0 +1,393 @@
+"""Fast-path intent classifier - zero-LLM pre-classification for classify_intent.
+
+Two deterministic stages look at the latest user message:
+
+1. Rules: bare greetings/thanks, and complete affirmations ("yes, do it")
+   right after the DJ offered to build a playlist.
+2. A multinomial Naive Bayes model over unigrams and bigrams, trained offline
+   on data/intent_training.jsonl and shipped as agent/data/fast_classifier.json.
+
+Bag-of-words posteriors are overconfident and blind to negation ("don't
+make a playlist" scores as a request), so the lexical model only answers
+for the intents that route to chat anyway (greeting, ask_question); intents
+that start or steer a playlist are always left to the LLM. Messages with a
+negation or a hedge ("maybe", "not sure") skip the fast path entirely.
+
+A classification is only returned when its confidence clears the threshold;
+otherwise classify_intent falls through to the LLM.
+
+Usage:
+    # Retrain the shipped lexical model
+    python -m agent.fast_classifier train data/intent_training.jsonl
+
+    # Hit rate and accuracy against a labelled dataset
+    python -m agent.fast_classifier evaluate data/golden_dataset.jsonl
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterable, Sequence
+
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    HumanMessage,
+    convert_to_messages,
+)
+
+from agent.metrics import metrics
+
+MODEL_PATH = Path(__file__).parent / "data" / "fast_classifier.json"
+
+# Minimum confidence for the fast path to answer instead of the LLM
+DEFAULT_THRESHOLD = 0.95
+
+RULE_CONFIDENCE = 0.98
+
+GREETING_RE = re.compile(
+    r"(?:hi|hey|hello|hiya|howdy|yo|sup|greetings|what'?s (?:up|good)"
+    r"|(?:good )?(?:morning|afternoon|evening))"
+    r"(?: (?:there|dj|all|everyone|friend|again))?"
+    r"(?: (?:how are you(?: doing)?(?: today)?|how'?s it going))?"
+)
+THANKS_RE = re.compile(
+    r"(?:thanks|thank you|thx|ty|cheers|appreciate it)(?: (?:so much|a lot|man|dj))?"
+)
+# Complete affirmations only: "yes", "sure, go ahead", "yes please make it"
+_AFFIRM = r"(?:yes|yeah|yep|yup|sure|ok(?:ay)?|absolutely|definitely|perfect|sounds good|please)"
+_ACTION = r"(?:(?:let'?s )?do it|make it|go for it|go ahead|let'?s go|let'?s hear it)"
+AFFIRMATION_RE = re.compile(
+    rf"(?:{_AFFIRM}(?: {_AFFIRM})*(?: {_ACTION})?(?: please)?|{_ACTION}(?: please)?)"
+)
+# Any of these sends the message to the LLM, whatever the rules or model say
+NEGATIONS = frozenset(
+    {
+        "no",
+        "not",
+        "nah",
+        "nope",
+        "never",
+        "don't",
+        "dont",
+        "won't",
+        "wont",
+        "can't",
+        "cant",
+        "isn't",
+        "without",
+        "stop",
+        "cancel",
+        "later",
+    }
+)
+HEDGES_RE = re.compile(
+    r"\b(?:maybe|perhaps|might|unsure|dunno|idk|not sure|i guess|i think"
+    r"|what do you think|or something)\b"
+)
+# Lexical-model intents that may skip the LLM: both route to chat, so a
+# wrong call between them is cheap. Playlist and explore calls are not.
+LEXICAL_INTENTS = frozenset({"greeting", "ask_question"})
+# The DJ offering to build a playlist in its previous message
+OFFER_RE = re.compile(
+    r"(?:want|shall|should|would you like|ready for) (?:me|i)\b[^?]*\b(?:playlist|mix|set)\b"
+)
+MAX_AFFIRMATION_WORDS = 6
+
+SIGNAL_LEXICON = {
+    "genre": [
+        "ambient",
+        "blues",
+        "classical",
+        "country",
+        "disco",
+        "drum and bass",
+        "dub",
+        "electronic",
+        "folk",
+        "funk",
+        "garage",
+        "hip-hop",
+        "house",
+        "indie",
+        "jazz",
+        "lo-fi",
+        "metal",
+        "nu-disco",
+        "pop",
+        "post-rock",
+        "punk",
+        "r&b",
+        "reggae",
+        "rock",
+        "soul",
+        "techno",
+        "trance",
+    ],
+    "mood": [
+        "building",
+        "chill",
+        "dark",
+        "dreamy",
+        "energetic",
+        "euphoric",
+        "happy",
+        "laid-back",
+        "mellow",
+        "minimal",
+        "moody",
+        "romantic",
+        "sad",
+        "sophisticated",
+        "upbeat",
+    ],
+    "activity": [
+        "commute",
+        "cooking",
+        "dinner",
+        "drive",
+        "focus",
+        "gym",
+        "party",
+        "reading",
+        "road trip",
+        "run",
+        "sleep",
+        "study",
+        "studying",
+        "work",
+        "workout",
+        "yoga",
+    ],
+}
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation (keeping apostrophes/hyphens) and collapse spaces."""
+    text = text.lower().replace("hip hop", "hip-hop").replace("&", " and ")
+    return " ".join(re.sub(r"[^\w'\- ]+", " ", text).split())
+
+
+def features(text: str) -> list[str]:
+    """Unigram and bigram features of a message."""
+    tokens = normalize(text).split()
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def extract_signals(texts: Iterable[str]) -> dict:
+    """Collect genre/mood/activity keywords mentioned by the user."""
+    haystack = f" {' '.join(normalize(t) for t in texts)} "
+    signals = {}
+    for kind, words in SIGNAL_LEXICON.items():
+        found = [w for w in words if f" {normalize(w)} " in haystack]
+        if found:
+            signals[kind] = found
+    return signals
+
+
+# =============================================================================
+# Lexical model
+# =============================================================================
+
+
+def train(examples: Iterable[dict], alpha: float = 1.0) -> dict:
+    """Fit a multinomial Naive Bayes model on {"text", "intent"} examples."""
+    class_counts: Counter[str] = Counter()
+    feature_counts: dict[str, Counter[str]] = {}
+    for example in examples:
+        intent = example["intent"]
+        class_counts[intent] += 1
+        feature_counts.setdefault(intent, Counter()).update(features(example["text"]))
+
+    classes = sorted(class_counts)
+    vocabulary = sorted({f for counts in feature_counts.values() for f in counts})
+    total = sum(class_counts.values())
+    log_prior = [math.log(class_counts[c] / total) for c in classes]
+
+    log_likelihood: dict[str, list[float]] = {f: [] for f in vocabulary}
+    for c in classes:
+        counts = feature_counts[c]
+        denominator = sum(counts.values()) + alpha * len(vocabulary)
+        for f in vocabulary:
+            log_likelihood[f].append(
+                round(math.log((counts[f] + alpha) / denominator), 4)
+            )
+
+    return {
+        "classes": classes,
+        "log_prior": [round(p, 4) for p in log_prior],
+        "log_likelihood": log_likelihood,
+    }
+
+
+@lru_cache(maxsize=1)
+def load_model(path: Path = MODEL_PATH) -> dict:
+    """Load the shipped lexical model (cached)."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def fingerprint(path: Path = MODEL_PATH) -> str:
+    """Hash of the fast path's rules, thresholds and code, and of the shipped model."""
+    digest = hashlib.sha256(Path(__file__).read_bytes())
+    digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def predict_proba(text: str, model: dict | None = None) -> dict[str, float] | None:
+    """Posterior over intents, or None when no feature is in the vocabulary."""
+    model = model or load_model()
+    table = model["log_likelihood"]
+    known = [table[f] for f in features(text) if f in table]
+    if not known:
+        return None
+
+    scores = list(model["log_prior"])
+    for row in known:
+        scores = [s + p for s, p in zip(scores, row)]
+
+    top = max(scores)
+    weights = [math.exp(s - top) for s in scores]
+    total = sum(weights)
+    return {c: w / total for c, w in zip(model["classes"], weights)}
+
+
+# =============================================================================
+# Fast path
+# =============================================================================
+
+
+def _is_guarded(latest: str) -> bool:
+    """Whether a message negates or hedges, which bag-of-words matching can't read."""
+    return (
+        bool(NEGATIONS.intersection(latest.split()))
+        or HEDGES_RE.search(latest) is not None
+    )
+
+
+def _match_rules(latest: str, previous_ai: str | None) -> str | None:
+    """Return an intent when a high-precision rule fires."""
+    if GREETING_RE.fullmatch(latest) or THANKS_RE.fullmatch(latest):
+        return "greeting"
+    if (
+        previous_ai is not None
+        and OFFER_RE.search(previous_ai.lower())
+        and len(latest.split()) <= MAX_AFFIRMATION_WORDS
+        and AFFIRMATION_RE.fullmatch(latest)
+    ):
+        return "request_playlist"
+    return None
+
+
+def fast_classify(
+    messages: Sequence[AnyMessage], threshold: float = DEFAULT_THRESHOLD
+) -> dict | None:
+    """Classify the latest user message without an LLM call.
+
+    Returns a ChatClassification dict when confident, otherwise None so the
+    caller falls back to the LLM classifier.
+    """
+    human = [m for m in messages if isinstance(m, HumanMessage)]
+    if not human:
+        return None
+
+    latest = normalize(human[-1].text)
+    previous_ai = None
+    for message in reversed(messages):
+        if isinstance(message, AIMessage):
+            previous_ai = message.text
+            break
+        if message is not human[-1]:
+            break
+
+    intent = None
+    if not _is_guarded(latest):
+        intent = _match_rules(latest, previous_ai)
+        confidence = RULE_CONFIDENCE
+        if intent is None:
+            proba = predict_proba(latest)
+            if proba is not None:
+                intent, confidence = max(proba.items(), key=lambda item: item[1])
+                if intent not in LEXICAL_INTENTS:
+                    intent = None
+
+    if intent is None or confidence < threshold:
+        metrics.incr("fast_path_total", outcome="miss")
+        return None
+
+    metrics.incr("fast_path_total", outcome="hit", intent=intent)
+    return {
+        "intent": intent,
+        "confidence": round(confidence, 4),
+        "signals": extract_signals(m.text for m in human),
+    }
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+
+def _read_jsonl(path: str) -> list[dict[str, Any]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(path: str, threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """Hit rate and accuracy of the fast path on a dataset with expected_intent."""
+    hits = correct = total = 0
+    for example in _read_jsonl(path):
+        expected = example.get("outputs", {}).get("expected_intent")
+        if expected is None:
+            continue
+        total += 1
+        result = fast_classify(
+            convert_to_messages(example["inputs"]["messages"]), threshold
+        )
+        if result is not None:
+            hits += 1
+            correct += result["intent"] == expected
+    return {
+        "examples": total,
+        "hits": hits,
+        "hit_rate": hits / total if total else 0.0,
+        "accuracy": correct / hits if hits else 0.0,
+    }
+
+
+def main() -> None:
+    """Train or evaluate the fast-path classifier from the command line."""
+    parser = argparse.ArgumentParser(description="Fast-path intent classifier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="Train the lexical model")
+    train_parser.add_argument("data", help="JSONL file of {text, intent} examples")
+    train_parser.add_argument("--output", default=str(MODEL_PATH), help="Model path")
+
+    eval_parser = subparsers.add_parser("evaluate", help="Report hit rate and accuracy")
+    eval_parser.add_argument("data", help="JSONL dataset with outputs.expected_intent")
+    eval_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args()
+
+    if args.command == "train":
+        model = train(_read_jsonl(args.data))
+        with open(args.output, "w") as f:
+            json.dump(model, f, separators=(",", ":"))
+        print(f"Wrote {len(model['log_likelihood'])} features to {args.output}")
+    else:
+        report = evaluate(args.data, args.threshold)
+        print(f"Examples:  {report['examples']}")
+        print(
+            f"Hit rate:  {report['hit_rate']:.0%} ({report['hits']} answered without LLM)"
+        )
+        print(f"Accuracy:  {report['accuracy']:.0%} of fast-path answers")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,65 @@
+"""DJ agent graph - classify each turn, then chat, clarify or propose a playlist.
+
+Playlists are confirmed by the user (an interrupt) before they are created
+on Spotify. The compiled graph is exported as ``graph``; per-assistant
+settings come from ``Context``.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from functools import cache
+from typing import Annotated, Any, List, Literal, Sequence, TypedDict
+
 from dotenv import load_dotenv
-from typing import Literal, TypedDict, Optional, List, Annotated
-from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage, AIMessage, AnyMessage
-from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
-from langgraph.types import interrupt
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableConfig, RunnableLambda, RunnableSequence
+from langgraph.config import get_stream_writer
+from langgraph.constants import TAG_NOSTREAM
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.message import add_messages
+from langgraph.runtime import get_runtime
+from langgraph.types import interrupt
+
+from agent.cassettes import get_cassette
+from agent.catalog import TrackCatalog, get_catalog
+from agent.classification_cache import ClassificationCache
+from agent.context_window import (
+    SUMMARY_PROMPT,
+    build_history,
+    messages_to_summarize,
+    resume_cursor,
+    summary_prompt,
+)
+from agent.fast_classifier import fast_classify
+from agent.fast_classifier import fingerprint as fast_path_fingerprint
+from agent.instrumentation import InstrumentationHandler, instrumentation_enabled
+from agent.json_stream import ArrayItemScanner
+from agent.metrics import metrics
+from agent.retrieval import get_embedding_index
+from agent.sequencing import detect_arc, sequence
+from agent.speculation import proposal_speculator
+from agent.spotify import (
+    TrackStream,
+    apublish_playlist,
+    aresolve_tracks,
+    idempotency_key,
+    publish_playlist,
+    resolve_tracks,
+    track_prefetcher,
+)
 
 load_dotenv()
 
@@ -15,33 +69,146 @@ load_dotenv()
 # =============================================================================
 
 MODEL_NAME = "gpt-4o"
-
-llm = ChatOpenAI(model=MODEL_NAME, temperature=0.7)
+MODEL_TEMPERATURE = 0.7
 
 # LangSmith metadata config - reused across all LLM calls
 LLM_CONFIG = {"metadata": {"model": MODEL_NAME}}
 
 
+@cache
+def _openai_model(model_name: str, temperature: float = 0) -> BaseChatModel:
+    # langchain_openai (and the openai SDK under it) is most of the import
+    # time of this module, so it is only imported once a model is needed
+    from langchain_openai import ChatOpenAI
+
+    cassette = get_cassette()
+    if cassette is not None:
+        # stream() bypasses the cache, so cassette runs get whole replies
+        return ChatOpenAI(
+            model=model_name,
+            temperature=temperature,
+            cache=cassette,
+            disable_streaming=True,
+        )
+    return ChatOpenAI(model=model_name, temperature=temperature)
+
+
+def get_chat_model(model_name: str) -> BaseChatModel:
+    """Return the chat model for a tier; MODEL_NAME resolves to the module-level llm."""
+    if model_name == MODEL_NAME:
+        # An assigned ``llm`` (e.g. a test double) wins over the lazy default
+        return globals().get("llm") or _openai_model(MODEL_NAME, MODEL_TEMPERATURE)
+    return _openai_model(model_name)
+
+
+def __getattr__(name: str) -> Any:
+    # ``llm`` is built on first access rather than at import
+    if name == "llm":
+        return get_chat_model(MODEL_NAME)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# =============================================================================
+# Runtime Context
+# =============================================================================
+
+
+@dataclass
+class Context:
+    """Per-assistant configuration, passed as the graph's runtime context."""
+
+    # Cheap model tried first by classify_intent, e.g. "gpt-4o-mini". Opt-in:
+    # it changes routing and latency, so None (always MODEL_NAME) by default
+    classifier_model: str | None = None
+    # Cheap-tier confidences in [low, high) sit too close to decide_action's
+    # 0.7 threshold to trust, so they are re-classified by MODEL_NAME
+    escalation_band_low: float = 0.55
+    escalation_band_high: float = 0.85
+    # Reuse LLM classifications of identical conversations. Opt-in: repeated
+    # runs (e.g. evaluation repetitions) would all replay the first answer
+    classification_cache: bool = False
+    # Async runs only: generate the chat reply concurrently with LLM
+    # classification, keeping it if the turn routes to chat
+    speculative_chat: bool = False
+    # Generate a playlist proposal in the background during clarify turns
+    # (classification confidence at least the minimum), reused if the next
+    # turn asks for a playlist without adding new signals. Needs a thread_id.
+    speculative_playlist: bool = False
+    speculative_playlist_min_confidence: float = 0.5
+
+    # Tracks per playlist proposal
+    playlist_length: int = 3
+    # Stream the proposal: each track is emitted as a custom stream event and
+    # its Spotify search starts as soon as it is parsed
+    stream_playlist: bool = False
+    # Check proposed tracks against the local catalog (DJ_TRACK_CATALOG),
+    # repairing near misses and dropping tracks it doesn't know
+    validate_tracks: bool = True
+    # Catalog tracks matching the classification signals listed in the
+    # playlist prompt (DJ_TRACK_EMBEDDINGS index, 0 = no retrieval)
+    retrieval_candidates: int = 20
+    # Reorder proposals to follow an energy arc asked for in the conversation
+    # ("starts mellow and builds up"), using catalog bpm/energy/key features
+    sequence_tracks: bool = True
+
+    # User turns kept verbatim in prompts; older ones are folded into DJState.summary
+    history_turns: int = 6
+    summary_model: str = "gpt-4o-mini"
+    # Turns that left the window stay verbatim until this many have piled up,
+    # then are summarized together - one summary call per batch, not per turn
+    summary_batch_turns: int = 4
+    # Approximate token budget for the verbatim history, per node (missing =
+    # unbounded). Equal budgets keep the history identical across nodes, so the
+    # prompt prefix cache is shared between them within a turn.
+    history_token_budgets: dict[str, int] = field(
+        default_factory=lambda: {
+            "classify_intent": 4000,
+            "chat": 4000,
+            "clarify": 4000,
+            "generate_playlist": 4000,
+        }
+    )
+
+
+def get_context() -> Context:
+    """Runtime context of the current graph run, or the defaults if none was given."""
+    return get_runtime(Context).context or Context()
+
+
 # =============================================================================
 # State Schemas
 # =============================================================================
 
+
 class ChatClassification(TypedDict):
-    intent: Literal["ask_question", "request_playlist", "unknown", "greeting", "explore"]
+    """Intent of the latest user message, with its confidence and the music signals mentioned."""
+
+    intent: Literal[
+        "ask_question", "request_playlist", "unknown", "greeting", "explore"
+    ]
     confidence: float
     signals: dict
 
 
 class Track(TypedDict):
+    """A track, with its Spotify URI once resolved."""
+
     artist: str
     title: str
-    spotify_uri: Optional[str]
+    spotify_uri: str | None
 
 
 class DJState(TypedDict, total=False):
+    """Graph state, checkpointed per conversation thread."""
+
     # Conversation history (user messages arrive via add_messages reducer)
     messages: Annotated[list[AnyMessage], add_messages]
 
+    # Rolling summary of turns that left the context window, and the id of the
+    # last message folded into it
+    summary: str
+    summary_cursor: str | None
+
     # Classification
     classification: ChatClassification
 
@@ -51,52 +218,360 @@ class DJState(TypedDict, total=False):
 
     # Playlist
     proposed_tracks: List[Track]
-    user_confirmed: Optional[bool]
-    spotify_playlist_url: Optional[str]
+    user_confirmed: bool | None
+    spotify_playlist_url: str | None
 
     # Response
     response_type: Literal["chat", "clarify", "playlist_proposal", "playlist_created"]
     response: str
     expects_followup: bool
 
+    # Chat reply generated during classification (Context.speculative_chat)
+    speculative_reply: str | None
+
 
 # =============================================================================
-# Node: Classify Intent
+# Prompt Assembly
 # =============================================================================
-
-def classify_intent(state: DJState) -> dict:
-    """Use LLM to classify user's intent based on conversation history"""
-
-    structured_llm = llm.with_structured_output(ChatClassification)
-
-    system_msg = SystemMessage(content="""You are classifying chat messages for a DJ assistant.
-Consider the full conversation context when classifying the user's latest message.
-
-Classify the user's intent into one of these categories:
+#
+# Every LLM node sends the same layout so provider-side prompt prefix caching
+# can reuse work across nodes and turns:
+#
+#   [DJ_SYSTEM_MSG]          static, identical for every call
+#   [summary + recent turns] grows append-only within a conversation
+#   [task message]           per-call instructions and dynamic data (signals)
+#
+# Anything that varies per call must go in the task message at the tail.
+
+DJ_SYSTEM_MSG = SystemMessage(
+    content="""You are an underground DJ assistant with deep knowledge of music.
+You help people discover music and build playlists. You perform one of several tasks
+on the conversation below; the final instruction after the conversation says which.
+
+## Task: classify
+Classify the user's intent based on their latest message, considering the full conversation context:
 - greeting: User is saying hello or opening the conversation
 - ask_question: User is asking a general question about music
 - explore: User wants to explore music but hasn't decided what
 - request_playlist: User is clearly asking for a playlist (including follow-ups like "yes make it" after discussing music)
 - unknown: Intent is unclear
 
-Return intent, confidence (0.0–1.0), and any relevant signals (mood, genre, etc.).""")
+Return intent, confidence (0.0–1.0), and any relevant signals (mood, genre, etc.).
 
-    # Include conversation history for context-aware classification
-    messages = [system_msg] + list(state.get("messages", []))
+## Task: chat
+Be a friendly underground DJ. Keep responses short and warm. If appropriate, invite the
+user to talk about music. Don't be pushy about playlists - just be a good conversationalist about music.
+
+## Task: clarify
+The user seems interested in music but hasn't given enough detail.
+Ask ONE clear, simple question to narrow things down.
+Examples of good questions:
+- "What's the vibe - something to dance to or something to chill with?"
+- "Any artists you've been into lately?"
+- "What are you doing while listening - working, driving, party?"
+
+Keep it casual and short. Don't list too many options.
+
+## Task: playlist
+Based on the conversation so far, create a playlist that matches what the user is looking for.
+
+Rules:
+- Use exactly the number of tracks given in the task instruction
+- Prefer deep cuts over radio hits
+- Include a mix that flows well together
+- Each track needs: artist, title (no spotify_uri yet)
+- If the task instruction lists catalog candidates, build the playlist from them where they fit
+
+Also provide a short "vibe_description" (one sentence) capturing the mood."""
+)
+
+CLASSIFY_TASK_MSG = SystemMessage(
+    content="Task: classify. Classify the user's latest message."
+)
+
+CHAT_TASK_MSG = SystemMessage(content="Task: chat. Reply to the user's latest message.")
+
+
+def _clarify_task_msg(state: DJState) -> SystemMessage:
+    """Clarify instruction carrying the signals picked up during classification."""
+    signals = state["classification"].get("signals", {})
+    return SystemMessage(content=f"Task: clarify. Known signals: {signals}")
+
+
+def _playlist_task_msg(
+    track_count: int, candidates: Sequence[Track] = ()
+) -> SystemMessage:
+    content = f"Task: playlist. Number of tracks: {track_count} exactly."
+    if candidates:
+        listing = "\n".join(f"- {t['artist']} – {t['title']}" for t in candidates)
+        content += f"\nCatalog candidates:\n{listing}"
+    return SystemMessage(content=content)
+
+
+def _history(state: DJState, node: str) -> list[BaseMessage]:
+    """Conversation history for a node's prompt: rolling summary + recent window."""
+    context = get_context()
+    return build_history(
+        state.get("messages", []),
+        state.get("summary"),
+        context.history_turns,
+        context.history_token_budgets.get(node),
+        state.get("summary_cursor"),
+        context.summary_batch_turns,
+    )
+
+
+def _prompt(state: DJState, node: str, task_msg: SystemMessage) -> list[BaseMessage]:
+    """Stable prefix (static instructions, then history) with the task at the tail."""
+    return [DJ_SYSTEM_MSG] + _history(state, node) + [task_msg]
 
-    classification = structured_llm.invoke(messages, config=LLM_CONFIG)
 
+# =============================================================================
+# Node: Summarize History
+# =============================================================================
+
+
+def _pending_summary(state: DJState, context: Context) -> tuple[list[AnyMessage], dict]:
+    """Messages to fold into the summary now, or the state update to make instead."""
+    messages = state.get("messages", [])
+    cursor = state.get("summary_cursor")
+
+    # The history was rewritten under the cursor: keep the summary, restart at the window
+    if (resumed := resume_cursor(messages, cursor, context.history_turns)) is not None:
+        return [], {"summary_cursor": resumed}
+
+    # The smallest budget, so no node's prompt loses messages the summary lacks
+    budget = min(context.history_token_budgets.values(), default=None)
+    pending = messages_to_summarize(
+        messages, cursor, context.history_turns, budget, context.summary_batch_turns
+    )
+    return pending, {}
+
+
+def summarize_history(state: DJState) -> dict:
+    """Fold turns that left the context window into the rolling summary, in batches."""
+    context = get_context()
+    pending, update = _pending_summary(state, context)
+
+    # Nothing to fold yet - keep the current summary as is
+    if not pending:
+        return update
+
+    prompt = summary_prompt(state.get("summary"), pending)
+    response = get_chat_model(context.summary_model).invoke(
+        prompt, config={"metadata": {"model": context.summary_model}}
+    )
+
+    return {"summary": response.text, "summary_cursor": pending[-1].id}
+
+
+async def asummarize_history(state: DJState) -> dict:
+    """Async variant of summarize_history."""
+    context = get_context()
+    pending, update = _pending_summary(state, context)
+
+    if not pending:
+        return update
+
+    prompt = summary_prompt(state.get("summary"), pending)
+    response = await get_chat_model(context.summary_model).ainvoke(
+        prompt, config={"metadata": {"model": context.summary_model}}
+    )
+
+    return {"summary": response.text, "summary_cursor": pending[-1].id}
+
+
+# =============================================================================
+# Node: Classify Intent
+# =============================================================================
+
+
+def _classifier_tiers(context: Context) -> list[str]:
+    """Models to try in order, cheapest first."""
+    if context.classifier_model and context.classifier_model != MODEL_NAME:
+        return [context.classifier_model, MODEL_NAME]
+    return [MODEL_NAME]
+
+
+def _should_escalate(classification: ChatClassification, context: Context) -> bool:
+    """Whether a cheap-tier result falls in the ambiguous confidence band."""
+    return (
+        context.escalation_band_low
+        <= classification["confidence"]
+        < context.escalation_band_high
+    )
+
+
+def _record_tier(model_name: str, started: float) -> None:
+    metrics.incr("classify_calls_total", tier=model_name)
+    metrics.observe(
+        "classify_latency_seconds", time.perf_counter() - started, tier=model_name
+    )
+
+
+# Shared by all graph runs in the process; see agent/classification_cache.py
+# for the DJ_CLASSIFICATION_CACHE_* settings
+classification_cache = ClassificationCache.from_env()
+
+
+def _cache_namespace(context: Context) -> str:
+    """Cache namespace - changes whenever the prompt or the cascade setup does."""
+    parts = [
+        DJ_SYSTEM_MSG.text,
+        CLASSIFY_TASK_MSG.text,
+        *_classifier_tiers(context),
+        str(context.escalation_band_low),
+        str(context.escalation_band_high),
+    ]
+    return hashlib.sha256("\x00".join(parts).encode()).hexdigest()[:16]
+
+
+def _classify_without_llm(
+    state: DJState, context: Context
+) -> ChatClassification | None:
+    """Fast path first, then the classification cache."""
+    messages = state.get("messages", [])
+
+    # Greetings, thanks and "yes make it" don't need a model call
+    if (classification := fast_classify(messages)) is not None:
+        return classification
+
+    if context.classification_cache:
+        return classification_cache.get(
+            messages, _cache_namespace(context), _history(state, "classify_intent")
+        )
+    return None
+
+
+def _remember_classification(
+    state: DJState, context: Context, classification: ChatClassification
+) -> None:
+    if context.classification_cache:
+        classification_cache.put(
+            state.get("messages", []),
+            classification,
+            _cache_namespace(context),
+            _history(state, "classify_intent"),
+        )
+
+
+def classify_intent(state: DJState) -> dict:
+    """Use LLM to classify user's intent based on conversation history."""
+    context = get_context()
+    if (classification := _classify_without_llm(state, context)) is not None:
+        return {"classification": classification}
+
+    tiers = _classifier_tiers(context)
+
+    # Include conversation history for context-aware classification
+    messages = _prompt(state, "classify_intent", CLASSIFY_TASK_MSG)
+
+    # Cascade: escalate to the next tier only when the answer is ambiguous
+    for i, model_name in enumerate(tiers):
+        structured_llm = get_chat_model(model_name).with_structured_output(
+            ChatClassification
+        )
+        started = time.perf_counter()
+        classification = structured_llm.invoke(
+            messages, config={"metadata": {"model": model_name}}
+        )
+        _record_tier(model_name, started)
+        if i == len(tiers) - 1 or not _should_escalate(classification, context):
+            break
+        metrics.incr("classify_escalations_total", tier=model_name)
+
+    _remember_classification(state, context, classification)
     return {"classification": classification}
 
 
+# Speculative replies must not reach stream_mode="messages" before they are committed
+SPECULATIVE_CONFIG = {
+    "metadata": {"model": MODEL_NAME, "speculative": True},
+    "tags": [TAG_NOSTREAM],
+}
+
+
+async def _settle_speculation(
+    task: "asyncio.Task[AIMessage]",
+    prompt: list[BaseMessage],
+    classification: ChatClassification,
+) -> dict:
+    """Commit the speculative chat reply if the turn routes to chat, else cancel it."""
+    if _decide(classification)["action"] == "chat":
+        try:
+            reply = await task
+        except Exception:
+            # handle_chat will generate the reply the normal way
+            metrics.incr("speculative_chat_total", outcome="failed")
+            return {}
+        metrics.incr("speculative_chat_total", outcome="committed")
+        return {"speculative_reply": reply.text}
+
+    if task.done() and not task.cancelled() and task.exception() is None:
+        # Finished before routing was known - the whole call was wasted
+        wasted = (task.result().usage_metadata or {}).get("total_tokens", 0)
+    else:
+        task.cancel()
+        wasted = count_tokens_approximately(prompt)
+    metrics.incr("speculative_chat_total", outcome="cancelled")
+    metrics.incr("speculative_chat_wasted_tokens_total", wasted)
+    return {}
+
+
+async def aclassify_intent(state: DJState) -> dict:
+    """Async variant of classify_intent, used under graph.ainvoke/astream."""
+    context = get_context()
+    if (classification := _classify_without_llm(state, context)) is not None:
+        return {"classification": classification}
+
+    tiers = _classifier_tiers(context)
+
+    messages = _prompt(state, "classify_intent", CLASSIFY_TASK_MSG)
+
+    # Most LLM-classified turns end in chat - start that reply right away
+    speculation = None
+    if context.speculative_chat:
+        chat_prompt = _prompt(state, "chat", CHAT_TASK_MSG)
+        chat_llm = get_chat_model(MODEL_NAME)
+        speculation = asyncio.create_task(
+            chat_llm.ainvoke(chat_prompt, config=SPECULATIVE_CONFIG)
+        )
+
+    try:
+        for i, model_name in enumerate(tiers):
+            structured_llm = get_chat_model(model_name).with_structured_output(
+                ChatClassification
+            )
+            started = time.perf_counter()
+            classification = await structured_llm.ainvoke(
+                messages, config={"metadata": {"model": model_name}}
+            )
+            _record_tier(model_name, started)
+            if i == len(tiers) - 1 or not _should_escalate(classification, context):
+                break
+            metrics.incr("classify_escalations_total", tier=model_name)
+    except BaseException:
+        if speculation is not None:
+            speculation.cancel()
+        raise
+
+    _remember_classification(state, context, classification)
+
+    update: dict = {"classification": classification}
+    if speculation is not None:
+        update.update(
+            await _settle_speculation(speculation, chat_prompt, classification)
+        )
+    return update
+
+
 # =============================================================================
 # Node: Decide Action
 # =============================================================================
 
-def decide_action(state: DJState) -> dict:
-    """Route based on classification to chat, clarify, or generate playlist"""
 
-    classification = state["classification"]
+def _decide(classification: ChatClassification) -> dict:
+    """Routing decision for a classification."""
     intent = classification["intent"]
     confidence = classification["confidence"]
 
@@ -121,12 +596,23 @@ def decide_action(state: DJState) -> dict:
     }
 
 
+def decide_action(state: DJState, config: RunnableConfig) -> dict:
+    """Route based on classification to chat, clarify, or generate playlist."""
+    decision = _decide(state["classification"])
+    # A speculative proposal only answers the turn right after its clarify;
+    # clarify starts a fresh one when the new turn still warrants it
+    if decision["action"] != "generate_playlist":
+        proposal_speculator.discard(_thread_id(config))
+    return decision
+
+
 # =============================================================================
 # Routing Function for Conditional Edges
 # =============================================================================
 
+
 def route_by_action(state: DJState) -> str:
-    """Route to the appropriate node based on action"""
+    """Route to the appropriate node based on action."""
     return state["action"]
 
 
@@ -134,94 +620,128 @@ def route_by_action(state: DJState) -> str:
 # Node: Chat Response
 # =============================================================================
 
-def handle_chat(state: DJState) -> dict:
-    """Handle general chat/greeting/questions"""
-
-    system_msg = SystemMessage(content="""You are a friendly underground DJ with deep knowledge of music.
-Keep responses short and warm. If appropriate, invite the user to talk about music.
-Don't be pushy about playlists - just be a good conversationalist about music.""")
-
-    # Include full conversation history
-    messages = [system_msg] + list(state.get("messages", []))
-
-    response = llm.invoke(messages, config=LLM_CONFIG)
 
+def _text_response(response_type: str, content: str) -> dict:
+    """State update shared by the nodes that reply with plain text."""
     return {
-        "response_type": "chat",
-        "response": response.content,
+        "response_type": response_type,
+        "response": content,
         "expects_followup": True,
-        "messages": [AIMessage(content=response.content)],
+        "messages": [AIMessage(content=content)],
     }
 
 
-# =============================================================================
-# Node: Clarify Preferences
-# =============================================================================
+def _stream_reply(node: str, messages: list[BaseMessage]) -> str:
+    """Stream a text reply, forwarding each token as a custom stream event.
+
+    Clients using stream_mode="custom" receive {"node", "token"} events carrying
+    only user-facing text, without the structured-output JSON that
+    stream_mode="messages" also surfaces from classify_intent and
+    generate_playlist. The full reply is returned for the state update.
+    """
+    writer = get_stream_writer()
+    reply = ""
+    for chunk in get_chat_model(MODEL_NAME).stream(messages, config=LLM_CONFIG):
+        if chunk.text:
+            writer({"node": node, "token": chunk.text})
+            reply += chunk.text
+    return reply
+
+
+async def _astream_reply(node: str, messages: list[BaseMessage]) -> str:
+    """Async variant of _stream_reply."""
+    writer = get_stream_writer()
+    reply = ""
+    async for chunk in get_chat_model(MODEL_NAME).astream(messages, config=LLM_CONFIG):
+        if chunk.text:
+            writer({"node": node, "token": chunk.text})
+            reply += chunk.text
+    return reply
+
+
+def _speculative_response(state: DJState) -> dict | None:
+    """Use the reply generated during classification, if there is one."""
+    reply = state.get("speculative_reply")
+    if not reply:
+        return None
+    # Already complete - hand it to streaming clients in one piece
+    get_stream_writer()({"node": "chat", "token": reply})
+    return {**_text_response("chat", reply), "speculative_reply": None}
 
-def handle_clarify(state: DJState) -> dict:
-    """Ask clarifying questions to understand user's music taste"""
 
-    signals = state["classification"].get("signals", {})
+def handle_chat(state: DJState) -> dict:
+    """Handle general chat/greeting/questions."""
+    if (update := _speculative_response(state)) is not None:
+        return update
 
-    system_msg = SystemMessage(content=f"""You are an underground DJ helping someone discover what they want.
-The user seems interested in music but hasn't given enough detail.
-Known signals: {signals}
+    # Include rolling summary + recent conversation window
+    messages = _prompt(state, "chat", CHAT_TASK_MSG)
 
-Ask ONE clear, simple question to narrow things down.
-Examples of good questions:
-- "What's the vibe - something to dance to or something to chill with?"
-- "Any artists you've been into lately?"
-- "What are you doing while listening - working, driving, party?"
+    reply = _stream_reply("chat", messages)
 
-Keep it casual and short. Don't list too many options.""")
+    return _text_response("chat", reply)
 
-    # Include full conversation history
-    messages = [system_msg] + list(state.get("messages", []))
 
-    response = llm.invoke(messages, config=LLM_CONFIG)
+async def ahandle_chat(state: DJState) -> dict:
+    """Async variant of handle_chat."""
+    if (update := _speculative_response(state)) is not None:
+        return update
 
-    return {
-        "response_type": "clarify",
-        "response": response.content,
-        "expects_followup": True,
-        "messages": [AIMessage(content=response.content)],
-    }
+    messages = _prompt(state, "chat", CHAT_TASK_MSG)
+
+    reply = await _astream_reply("chat", messages)
+
+    return _text_response("chat", reply)
 
 
 # =============================================================================
-# Node: Generate Playlist Proposal
+# Node: Clarify Preferences
 # =============================================================================
 
-class PlaylistProposal(TypedDict):
-    tracks: List[Track]
-    vibe_description: str
 
+def handle_clarify(state: DJState, config: RunnableConfig) -> dict:
+    """Ask clarifying questions to understand user's music taste."""
+    context = get_context()
+    if _should_speculate(state, context):
+        _start_speculation(state, _thread_id(config), context)
 
-def handle_generate_playlist(state: DJState) -> dict:
-    """Generate a playlist proposal based on user input"""
+    # Include rolling summary + recent conversation window
+    messages = _prompt(state, "clarify", _clarify_task_msg(state))
 
-    structured_llm = llm.with_structured_output(PlaylistProposal)
+    reply = _stream_reply("clarify", messages)
 
-    system_msg = SystemMessage(content="""You are an underground DJ creating a playlist.
+    return _text_response("clarify", reply)
 
-Based on the conversation so far, create a playlist that matches what the user is looking for.
 
-Rules:
-- 3 tracks exactly
-- Prefer deep cuts over radio hits
-- Include a mix that flows well together
-- Each track needs: artist, title (no spotify_uri yet)
+async def ahandle_clarify(state: DJState, config: RunnableConfig) -> dict:
+    """Async variant of handle_clarify."""
+    context = get_context()
+    if _should_speculate(state, context):
+        _start_speculation(state, _thread_id(config), context)
 
-Also provide a short "vibe_description" (one sentence) capturing the mood.""")
+    messages = _prompt(state, "clarify", _clarify_task_msg(state))
 
-    # Include full conversation history for context
-    messages = [system_msg] + list(state.get("messages", []))
+    reply = await _astream_reply("clarify", messages)
 
-    proposal = structured_llm.invoke(messages, config=LLM_CONFIG)
+    return _text_response("clarify", reply)
+
+
+# =============================================================================
+# Node: Generate Playlist Proposal
+# =============================================================================
+
+
+class PlaylistProposal(TypedDict):
+    """Proposed playlist: the tracks and a one-sentence vibe description."""
+
+    tracks: List[Track]
+    vibe_description: str
 
-    # Format the response for display
+
+def _proposal_response(proposal: PlaylistProposal) -> dict:
+    """Format a playlist proposal for display."""
     track_list = "\n".join(
-        f"  {i+1}. {t['artist']} – {t['title']}"
+        f"  {i + 1}. {t['artist']} – {t['title']}"
         for i, t in enumerate(proposal["tracks"])
     )
     response_text = f"""Here's what I've got for you:
@@ -241,13 +761,303 @@ Want me to create this playlist on Spotify?"""
     }
 
 
+def _thread_id(config: RunnableConfig | None) -> str | None:
+    """Checkpointer thread of this run, if any."""
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+def _raw_proposal_model():
+    """Return the proposal's structured-output model without its JSON parser."""
+    structured_llm = get_chat_model(MODEL_NAME).with_structured_output(PlaylistProposal)
+    if not isinstance(structured_llm, RunnableSequence):
+        raise TypeError("stream_playlist requires a JSON-mode structured output model")
+    return structured_llm.first
+
+
+def _candidates(state: DJState, context: Context) -> list[Track]:
+    """Catalog tracks matching the classification signals, if retrieval is configured."""
+    index = get_embedding_index() if context.retrieval_candidates > 0 else None
+    if index is None:
+        return []
+    signals = (state.get("classification") or {}).get("signals") or {}
+    return index.candidates(signals, context.retrieval_candidates)
+
+
+def _proposal_prompt(state: DJState, context: Context) -> list[BaseMessage]:
+    """Playlist prompt, grounded in retrieved catalog candidates."""
+    candidates = _candidates(state, context)
+    return _prompt(
+        state,
+        "generate_playlist",
+        _playlist_task_msg(context.playlist_length, candidates),
+    )
+
+
+async def _aproposal_prompt(state: DJState, context: Context) -> list[BaseMessage]:
+    """Async variant of _proposal_prompt."""
+    # Scanning a large index is blocking I/O and numpy work
+    candidates = await asyncio.to_thread(_candidates, state, context)
+    return _prompt(
+        state,
+        "generate_playlist",
+        _playlist_task_msg(context.playlist_length, candidates),
+    )
+
+
+def _should_speculate(state: DJState, context: Context) -> bool:
+    """Whether this clarify turn is a near-miss playlist request worth a speculative proposal."""
+    classification = state.get("classification") or {}
+    return (
+        context.speculative_playlist
+        and classification.get("confidence", 0.0)
+        >= context.speculative_playlist_min_confidence
+    )
+
+
+async def _speculative_proposal(messages: list[BaseMessage]) -> PlaylistProposal:
+    structured_llm = get_chat_model(MODEL_NAME).with_structured_output(PlaylistProposal)
+    return await structured_llm.ainvoke(messages, config=SPECULATIVE_CONFIG)
+
+
+async def _speculative_prompt(
+    state: DJState, history: list[BaseMessage], context: Context
+) -> list[BaseMessage]:
+    """Playlist prompt for a speculation; the retrieval runs off the clarify turn."""
+    candidates = await asyncio.to_thread(_candidates, state, context)
+    return [
+        DJ_SYSTEM_MSG,
+        *history,
+        _playlist_task_msg(context.playlist_length, candidates),
+    ]
+
+
+def _start_speculation(state: DJState, thread_id: str | None, context: Context) -> None:
+    """Generate the proposal generate_playlist would make now, on the background loop."""
+    signals = state["classification"].get("signals", {})
+    # The history needs the graph runtime, which the background loop lacks
+    history = _history(state, "generate_playlist")
+    proposal_speculator.start(
+        thread_id,
+        signals,
+        _speculative_prompt(state, history, context),
+        _speculative_proposal,
+    )
+
+
+def _track_catalog(context: Context) -> TrackCatalog | None:
+    """Local catalog to validate proposals against, if enabled and configured."""
+    return get_catalog() if context.validate_tracks else None
+
+
+def _validated(
+    proposal: PlaylistProposal, catalog: TrackCatalog | None
+) -> PlaylistProposal:
+    """Repair or drop proposed tracks the catalog doesn't know."""
+    if catalog is None:
+        return proposal
+    return {**proposal, "tracks": catalog.validate(proposal["tracks"])}
+
+
+def _requested_arc(state: DJState) -> str | None:
+    """Energy arc from the most recent user message that describes one."""
+    for message in reversed(state.get("messages", [])):
+        if isinstance(message, HumanMessage) and (arc := detect_arc(message.text)):
+            return arc
+    return None
+
+
+def _sequence_order(
+    tracks: list[Track], state: DJState, context: Context
+) -> list[int] | None:
+    """Order of ``tracks`` following the requested energy arc, if there is one to follow."""
+    catalog = get_catalog() if context.sequence_tracks else None
+    if catalog is None or len(tracks) < 2:
+        return None
+    arc = _requested_arc(state)
+    if arc is None:
+        return None
+    features = [catalog.features(t) for t in tracks]
+    if sum(f is not None and f.energy is not None for f in features) < 2:
+        metrics.incr("sequencing_total", arc=arc, outcome="no_features")
+        return None
+    metrics.incr("sequencing_total", arc=arc, outcome="sequenced")
+    return sequence(features, arc)
+
+
+def _sequenced(
+    proposal: PlaylistProposal, state: DJState, context: Context
+) -> PlaylistProposal:
+    """Proposal reordered to follow the requested energy arc."""
+    order = _sequence_order(proposal["tracks"], state, context)
+    if order is None:
+        return proposal
+    return {**proposal, "tracks": [proposal["tracks"][i] for i in order]}
+
+
+@dataclass
+class _ProposalStream:
+    """A streamed proposal: each parsed track is validated, emitted and resolved."""
+
+    thread_id: str | None
+    catalog: TrackCatalog | None
+    state: DJState
+    context: Context
+    writer: Any = field(default_factory=get_stream_writer)
+    scanner: ArrayItemScanner = field(
+        default_factory=lambda: ArrayItemScanner("tracks")
+    )
+    resolver: TrackStream | None = None
+    kept: list[Track] = field(default_factory=list)
+    # Catalog outcomes, recorded once finish() knows whether the catalog applies
+    outcomes: list[str] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if self.thread_id is not None:
+            self.resolver = TrackStream()
+
+    def feed(self, text: str) -> None:
+        for track in self.scanner.feed(text):
+            if self.catalog is not None:
+                outcome, track = self.catalog.check(track)
+                self.outcomes.append(outcome)
+                if track is None:
+                    continue
+            self._emit(track)
+
+    def _emit(self, track: Track) -> None:
+        self.writer(
+            {"node": "generate_playlist", "track": track, "index": len(self.kept)}
+        )
+        if self.resolver is not None:
+            self.resolver.add(track)
+        self.kept.append(track)
+
+    def finish(self) -> PlaylistProposal:
+        """Parse the complete proposal and hand the running searches to the prefetcher."""
+        proposal = json.loads(self.scanner.text)
+        if not self.kept and proposal["tracks"]:
+            # The catalog knew none of the tracks, so it doesn't cover this
+            # request; counted as in TrackCatalog.validate
+            if self.catalog is not None:
+                metrics.incr(
+                    "catalog_validation_total",
+                    value=len(proposal["tracks"]),
+                    outcome="uncovered",
+                )
+            for track in proposal["tracks"]:
+                self._emit(track)
+        else:
+            for outcome in self.outcomes:
+                metrics.incr("catalog_validation_total", outcome=outcome)
+        # Tracks were emitted as generated; tell the client their final order
+        order = _sequence_order(self.kept, self.state, self.context)
+        if order is not None:
+            self.writer({"node": "generate_playlist", "order": order})
+        proposal["tracks"] = (
+            [self.kept[i] for i in order] if order is not None else self.kept
+        )
+        if self.resolver is not None:
+            track_prefetcher.start(
+                self.thread_id, proposal["tracks"], self.resolver.result(order)
+            )
+        return proposal
+
+
+def _stream_proposal(
+    state: DJState, messages: list[BaseMessage], thread_id: str | None, context: Context
+) -> PlaylistProposal:
+    """Stream the structured proposal, resolving each track as soon as it is parsed."""
+    stream = _ProposalStream(thread_id, _track_catalog(context), state, context)
+    for chunk in _raw_proposal_model().stream(messages, config=LLM_CONFIG):
+        stream.feed(chunk.text)
+    return stream.finish()
+
+
+async def _astream_proposal(
+    state: DJState, messages: list[BaseMessage], thread_id: str | None, context: Context
+) -> PlaylistProposal:
+    """Async variant of _stream_proposal."""
+    stream = _ProposalStream(thread_id, _track_catalog(context), state, context)
+    async for chunk in _raw_proposal_model().astream(messages, config=LLM_CONFIG):
+        stream.feed(chunk.text)
+    return stream.finish()
+
+
+def _speculated(
+    state: DJState, proposal: PlaylistProposal, thread_id: str | None, context: Context
+) -> PlaylistProposal:
+    """Put a ready-made proposal through the same validation, events and prefetch as a streamed one."""
+    stream = _ProposalStream(thread_id, _track_catalog(context), state, context)
+    stream.feed(json.dumps(proposal))
+    return stream.finish()
+
+
+def handle_generate_playlist(state: DJState, config: RunnableConfig) -> dict:
+    """Generate a playlist proposal based on user input."""
+    context = get_context()
+    thread_id = _thread_id(config)
+
+    # Proposal generated in the background during the clarify turn, if the
+    # user's answer didn't add anything it was missing
+    signals = state["classification"].get("signals", {})
+    if (speculated := proposal_speculator.take(thread_id, signals)) is not None:
+        return _proposal_response(_speculated(state, speculated, thread_id, context))
+
+    # Ground the proposal in real tracks, then include rolling summary +
+    # recent conversation window for context
+    messages = _proposal_prompt(state, context)
+
+    if context.stream_playlist:
+        return _proposal_response(_stream_proposal(state, messages, thread_id, context))
+
+    structured_llm = get_chat_model(MODEL_NAME).with_structured_output(PlaylistProposal)
+    proposal = structured_llm.invoke(messages, config=LLM_CONFIG)
+
+    # Drop or repair hallucinated tracks before any Spotify call, then order
+    # them along the requested energy arc
+    proposal = _validated(proposal, _track_catalog(context))
+    proposal = _sequenced(proposal, state, context)
+
+    # Resolve tracks while the user reads the proposal at the interrupt
+    track_prefetcher.start(thread_id, proposal["tracks"])
+
+    return _proposal_response(proposal)
+
+
+async def ahandle_generate_playlist(state: DJState, config: RunnableConfig) -> dict:
+    """Async variant of handle_generate_playlist."""
+    context = get_context()
+    thread_id = _thread_id(config)
+
+    signals = state["classification"].get("signals", {})
+    if (speculated := await proposal_speculator.atake(thread_id, signals)) is not None:
+        return _proposal_response(_speculated(state, speculated, thread_id, context))
+
+    messages = await _aproposal_prompt(state, context)
+
+    if context.stream_playlist:
+        return _proposal_response(
+            await _astream_proposal(state, messages, thread_id, context)
+        )
+
+    structured_llm = get_chat_model(MODEL_NAME).with_structured_output(PlaylistProposal)
+    proposal = await structured_llm.ainvoke(messages, config=LLM_CONFIG)
+
+    proposal = _validated(proposal, _track_catalog(context))
+    proposal = _sequenced(proposal, state, context)
+
+    track_prefetcher.start(thread_id, proposal["tracks"])
+
+    return _proposal_response(proposal)
+
+
 # =============================================================================
 # Node: Confirm Playlist (Human-in-the-loop)
 # =============================================================================
 
-def confirm_playlist(state: DJState) -> dict:
-    """Interrupt to get user confirmation before creating Spotify playlist"""
 
+def confirm_playlist(state: DJState) -> dict:
+    """Interrupt to get user confirmation before creating Spotify playlist."""
     tracks = state.get("proposed_tracks", [])
     track_list = "\n".join(f"  - {t['artist']} – {t['title']}" for t in tracks)
 
@@ -257,7 +1067,14 @@ def confirm_playlist(state: DJState) -> dict:
     )
 
     # User's response comes back here after they resume
-    confirmed = user_response.lower() in ("yes", "y", "yeah", "sure", "do it", "create it")
+    confirmed = user_response.lower() in (
+        "yes",
+        "y",
+        "yeah",
+        "sure",
+        "do it",
+        "create it",
+    )
 
     return {
         "user_confirmed": confirmed,
@@ -269,8 +1086,9 @@ def confirm_playlist(state: DJState) -> dict:
 # Routing: After Confirmation
 # =============================================================================
 
+
 def route_after_confirmation(state: DJState) -> str:
-    """Route based on user confirmation"""
+    """Route based on user confirmation."""
     if state.get("user_confirmed"):
         return "search_spotify"
     return "playlist_declined"
@@ -280,19 +1098,28 @@ def route_after_confirmation(state: DJState) -> str:
 # Node: Search Spotify
 # =============================================================================
 
-def search_spotify(state: DJState) -> dict:
-    """Search Spotify for the proposed tracks and get URIs"""
 
+def search_spotify(state: DJState, config: RunnableConfig) -> dict:
+    """Search Spotify for the proposed tracks and get URIs."""
+    tracks = state.get("proposed_tracks", [])
+
+    # Usually already resolved in the background while waiting at confirm_playlist
+    found_tracks = track_prefetcher.take(_thread_id(config), tracks)
+    if found_tracks is None:
+        found_tracks = resolve_tracks(tracks)
+
+    return {
+        "proposed_tracks": found_tracks,
+    }
+
+
+async def asearch_spotify(state: DJState, config: RunnableConfig) -> dict:
+    """Async variant of search_spotify."""
     tracks = state.get("proposed_tracks", [])
 
-    # TODO: Implement actual Spotify API search
-    # For now, simulate finding tracks
-    found_tracks = []
-    for track in tracks:
-        found_tracks.append({
-            **track,
-            "spotify_uri": f"spotify:track:{track['artist'][:3]}{track['title'][:3]}".lower().replace(" ", ""),
-        })
+    found_tracks = await track_prefetcher.atake(_thread_id(config), tracks)
+    if found_tracks is None:
+        found_tracks = await aresolve_tracks(tracks)
 
     return {
         "proposed_tracks": found_tracks,
@@ -303,21 +1130,25 @@ def search_spotify(state: DJState) -> dict:
 # Node: Create Spotify Playlist
 # =============================================================================
 
-def create_spotify_playlist(state: DJState) -> dict:
-    """Create the playlist on Spotify"""
+PLAYLIST_NAME = "Underground DJ Mix"
 
-    tracks = state.get("proposed_tracks", [])
 
-    # TODO: Implement actual Spotify API playlist creation
-    # For now, simulate creating the playlist
-    playlist_url = "https://open.spotify.com/playlist/simulated123"
+def _playlist_created_response(playlist_url: str, tracks: list[Track]) -> dict:
+    """Format the playlist-created reply."""
+    track_list = "\n".join(
+        f"  - {t['artist']} – {t['title']}" for t in tracks if t.get("spotify_uri")
+    )
+    missing = [t for t in tracks if not t.get("spotify_uri")]
+    not_found = ""
+    if missing:
+        names = ", ".join(f"{t['artist']} – {t['title']}" for t in missing)
+        not_found = f"\n\nCouldn't find on Spotify: {names}"
 
-    track_list = "\n".join(f"  - {t['artist']} – {t['title']}" for t in tracks)
     response_text = f"""Done! Your playlist is ready:
 {playlist_url}
 
 Tracks:
-{track_list}
+{track_list}{not_found}
 
 Enjoy the tunes! Let me know if you want another one."""
 
@@ -330,12 +1161,37 @@ Enjoy the tunes! Let me know if you want another one."""
     }
 
 
+def create_spotify_playlist(state: DJState, config: RunnableConfig) -> dict:
+    """Create the playlist on Spotify."""
+    tracks = state.get("proposed_tracks", [])
+    uris = [t["spotify_uri"] for t in tracks if t.get("spotify_uri")]
+
+    # Keyed so a retried resume of this thread never creates a second playlist
+    key = idempotency_key(_thread_id(config), tracks)
+    playlist_url = publish_playlist(PLAYLIST_NAME, uris, key)
+
+    return _playlist_created_response(playlist_url, tracks)
+
+
+async def acreate_spotify_playlist(state: DJState, config: RunnableConfig) -> dict:
+    """Async variant of create_spotify_playlist."""
+    tracks = state.get("proposed_tracks", [])
+    uris = [t["spotify_uri"] for t in tracks if t.get("spotify_uri")]
+
+    key = idempotency_key(_thread_id(config), tracks)
+    playlist_url = await apublish_playlist(PLAYLIST_NAME, uris, key)
+
+    return _playlist_created_response(playlist_url, tracks)
+
+
 # =============================================================================
 # Node: Playlist Declined
 # =============================================================================
 
-def handle_playlist_declined(state: DJState) -> dict:
-    """Handle when user declines the playlist"""
+
+def handle_playlist_declined(state: DJState, config: RunnableConfig) -> dict:
+    """Handle when user declines the playlist."""
+    track_prefetcher.discard(_thread_id(config))
 
     response_text = "No worries! Want me to try something different, or should we explore other vibes?"
 
@@ -347,25 +1203,125 @@ def handle_playlist_declined(state: DJState) -> dict:
     }
 
 
+# =============================================================================
+# Node Fingerprints
+# =============================================================================
+
+
+def _task_section(task: str) -> str:
+    """DJ_SYSTEM_MSG's shared header plus its "## Task: <task>" section."""
+    header, *sections = re.split(r"(?m)^## Task: ", DJ_SYSTEM_MSG.text)
+    return header + next(
+        (s for s in sections if s.split("\n", 1)[0].strip() == task), ""
+    )
+
+
+def node_fingerprints(context: Context | None = None) -> dict[str, str]:
+    """Hash of everything that shapes each node's LLM output, by node name.
+
+    Covers a node's part of the system message, its task message (or the
+    source of its template), its output schema, the models it calls and the
+    runtime context; for classify_intent also the fast path (code and shipped
+    model) and the classification-cache namespace. Nodes that make no LLM call hash to "". Incremental
+    evaluation (agent/eval_store.py) reruns an example only when a node it
+    traversed changed; edits to node code outside these prompts are not seen.
+    """
+    context = context or Context()
+    shared = [
+        MODEL_NAME,
+        str(MODEL_TEMPERATURE),
+        json.dumps(asdict(context), sort_keys=True),
+    ]
+    parts = {
+        "summarize_history": [
+            SUMMARY_PROMPT,
+            context.summary_model,
+            str(context.history_turns),
+            str(context.summary_batch_turns),
+            json.dumps(context.history_token_budgets, sort_keys=True),
+        ],
+        # The fast path and the classification cache answer before the LLM does
+        "classify_intent": [
+            _task_section("classify"),
+            CLASSIFY_TASK_MSG.text,
+            str(ChatClassification.__annotations__),
+            fast_path_fingerprint(),
+            _cache_namespace(context),
+            str(classification_cache.window),
+            str(classification_cache.near_duplicate_threshold),
+            *shared,
+        ],
+        "chat": [_task_section("chat"), CHAT_TASK_MSG.text, *shared],
+        "clarify": [
+            _task_section("clarify"),
+            inspect.getsource(_clarify_task_msg),
+            *shared,
+        ],
+        "generate_playlist": [
+            _task_section("playlist"),
+            inspect.getsource(_playlist_task_msg),
+            str(PlaylistProposal.__annotations__),
+            *shared,
+        ],
+    }
+    return {
+        node: hashlib.sha256("\x00".join(parts[node]).encode()).hexdigest()[:16]
+        if node in parts
+        else ""
+        for node in builder.nodes
+    }
+
+
 # =============================================================================
 # Build the Graph
 # =============================================================================
 
-builder = StateGraph(DJState)
+
+def _async_node(name: str, func, afunc) -> RunnableLambda:
+    """Pair a sync node with its native async variant.
+
+    LangGraph runs plain sync nodes on executor threads under ainvoke/astream,
+    which caps concurrent conversations at the thread pool size. The I/O-bound
+    nodes (LLM and Spotify calls) register both implementations so ainvoke
+    awaits them directly while graph.invoke keeps working unchanged.
+    """
+    return RunnableLambda(func, afunc=afunc, name=name)
+
+
+builder = StateGraph(DJState, context_schema=Context)
 
 # Add Nodes
-builder.add_node("classify_intent", classify_intent)
+builder.add_node(
+    "summarize_history",
+    _async_node("summarize_history", summarize_history, asummarize_history),
+)
+builder.add_node(
+    "classify_intent", _async_node("classify_intent", classify_intent, aclassify_intent)
+)
 builder.add_node("decide_action", decide_action)
-builder.add_node("chat", handle_chat)
-builder.add_node("clarify", handle_clarify)
-builder.add_node("generate_playlist", handle_generate_playlist)
+builder.add_node("chat", _async_node("chat", handle_chat, ahandle_chat))
+builder.add_node("clarify", _async_node("clarify", handle_clarify, ahandle_clarify))
+builder.add_node(
+    "generate_playlist",
+    _async_node(
+        "generate_playlist", handle_generate_playlist, ahandle_generate_playlist
+    ),
+)
 builder.add_node("confirm_playlist", confirm_playlist)
-builder.add_node("search_spotify", search_spotify)
-builder.add_node("create_spotify_playlist", create_spotify_playlist)
+builder.add_node(
+    "search_spotify", _async_node("search_spotify", search_spotify, asearch_spotify)
+)
+builder.add_node(
+    "create_spotify_playlist",
+    _async_node(
+        "create_spotify_playlist", create_spotify_playlist, acreate_spotify_playlist
+    ),
+)
 builder.add_node("playlist_declined", handle_playlist_declined)
 
 # Add Edges
-builder.add_edge(START, "classify_intent")
+builder.add_edge(START, "summarize_history")
+builder.add_edge("summarize_history", "classify_intent")
 builder.add_edge("classify_intent", "decide_action")
 
 # Conditional routing based on action
@@ -376,7 +1332,7 @@ builder.add_conditional_edges(
         "chat": "chat",
         "clarify": "clarify",
         "generate_playlist": "generate_playlist",
-    }
+    },
 )
 
 # Chat and clarify go to END (await next user input)
@@ -393,7 +1349,7 @@ builder.add_conditional_edges(
     {
         "search_spotify": "search_spotify",
         "playlist_declined": "playlist_declined",
-    }
+    },
 )
 
 builder.add_edge("search_spotify", "create_spotify_playlist")
@@ -403,8 +1359,15 @@ builder.add_edge("playlist_declined", END)
 # Compile the graph
 # Note: LangGraph Platform handles checkpointing automatically
 # Add metadata to all nodes - metadata is inherited by all child runnables
+# Node wall time, LLM latency, tokens (incl. cached prompt tokens) and cost are
+# recorded per node in agent.metrics unless DJ_INSTRUMENTATION=0
 graph = builder.compile().with_config(
     RunnableConfig(
-        metadata={"model": MODEL_NAME, "ls_model_name": MODEL_NAME, "ls_provider": "openai"}
+        metadata={
+            "model": MODEL_NAME,
+            "ls_model_name": MODEL_NAME,
+            "ls_provider": "openai",
+        },
+        callbacks=[InstrumentationHandler()] if instrumentation_enabled() else [],
     )
 )
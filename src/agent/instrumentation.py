@@ -0,0 +1,261 @@
+"""Graph instrumentation - per-node wall time, LLM latency, tokens and cost.
+
+``InstrumentationHandler`` is attached to the compiled graph as a callback
+handler and records into ``agent.metrics``:
+
+    node_latency_seconds{node}                     wall time of each node run
+    llm_latency_seconds{node, model}               chat model call duration
+    llm_first_token_seconds{node, model}           time to first streamed token
+    llm_calls_total{node, model}
+    llm_prompt_tokens_total{node, model}           (usage_metadata, falling back
+    llm_cached_prompt_tokens_total{node, model}     to OpenAI's token_usage)
+    llm_completion_tokens_total{node, model}
+    llm_cost_usd_total{node, model}                estimated from MODEL_PRICES
+
+``usage_report()`` and ``latency_report()`` summarize them per node; the
+registry can be exported with ``agent.metrics.prometheus_text()`` or
+``write_jsonl()``.
+
+Set ``DJ_INSTRUMENTATION=0`` to compile the graph without the handler, so
+disabled instrumentation costs nothing per call.
+"""
+
+import os
+import threading
+import time
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from agent.metrics import Metrics, metrics
+
+# USD per million tokens: (prompt, cached prompt, completion). Versioned model
+# names ("gpt-4o-2024-08-06") use the longest matching prefix.
+MODEL_PRICES: dict[str, tuple[float, float, float]] = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+
+NODE_STEP_TAG = "graph:step:"
+
+
+def instrumentation_enabled() -> bool:
+    """Return False when DJ_INSTRUMENTATION is set to 0/false/off."""
+    return os.getenv("DJ_INSTRUMENTATION", "1").strip().lower() not in (
+        "0",
+        "false",
+        "off",
+        "no",
+    )
+
+
+def _usage(response: LLMResult) -> dict[str, int] | None:
+    """Extract prompt/cached/completion token counts from a model response."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(
+                getattr(generation, "message", None), "usage_metadata", None
+            )
+            if usage:
+                details = usage.get("input_token_details") or {}
+                return {
+                    "prompt": usage.get("input_tokens", 0),
+                    "cached": details.get("cache_read", 0) or 0,
+                    "completion": usage.get("output_tokens", 0),
+                }
+
+    token_usage = (response.llm_output or {}).get("token_usage")
+    if token_usage:
+        details = token_usage.get("prompt_tokens_details") or {}
+        return {
+            "prompt": token_usage.get("prompt_tokens", 0),
+            "cached": details.get("cached_tokens", 0) or 0,
+            "completion": token_usage.get("completion_tokens", 0),
+        }
+    return None
+
+
+def estimate_cost(model: str, usage: dict[str, int]) -> float | None:
+    """Estimated USD cost of a call's token usage (None for unpriced models)."""
+    matches = [
+        name for name in MODEL_PRICES if model == name or model.startswith(f"{name}-")
+    ]
+    if not matches:
+        return None
+    prompt, cached, completion = MODEL_PRICES[max(matches, key=len)]
+    uncached = usage["prompt"] - usage["cached"]
+    return (
+        uncached * prompt + usage["cached"] * cached + usage["completion"] * completion
+    ) / 1e6
+
+
+class InstrumentationHandler(BaseCallbackHandler):
+    """Record node timings and the latency, tokens and cost of every chat model call."""
+
+    # Bookkeeping only - no need to hop to an executor thread under ainvoke
+    run_inline = True
+
+    def __init__(self, registry: Metrics = metrics) -> None:
+        """Record into ``registry`` (the process-wide metrics by default)."""
+        self.registry = registry
+        self._lock = threading.Lock()
+        # run_id -> (node, model, started, first token seen)
+        self._llm_runs: dict[UUID, list[Any]] = {}
+        # run_id -> (node, started)
+        self._node_runs: dict[UUID, tuple[str, float]] = {}
+
+    def on_chain_start(
+        self,
+        serialized: dict[str, Any] | None,
+        inputs: Any,
+        *,
+        run_id: UUID,
+        tags: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Start timing a graph node."""
+        # Node runs are the chains LangGraph tags with their superstep
+        node = (metadata or {}).get("langgraph_node")
+        if (
+            node is None
+            or kwargs.get("name") != node
+            or not any(t.startswith(NODE_STEP_TAG) for t in tags or ())
+        ):
+            return
+        with self._lock:
+            self._node_runs[run_id] = (node, time.perf_counter())
+
+    def _end_node(self, run_id: UUID) -> None:
+        with self._lock:
+            entry = self._node_runs.pop(run_id, None)
+        if entry is not None:
+            self.registry.observe(
+                "node_latency_seconds", time.perf_counter() - entry[1], node=entry[0]
+            )
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Stop timing a graph node."""
+        self._end_node(run_id)
+
+    def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Stop timing a graph node that raised."""
+        # Includes interrupts (confirm_playlist), which end the node run too
+        self._end_node(run_id)
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[Any]],
+        *,
+        run_id: UUID,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Start timing an LLM call, attributed to the node that made it."""
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node", "unknown")
+        model = metadata.get("ls_model_name") or metadata.get("model", "unknown")
+        with self._lock:
+            self._llm_runs[run_id] = [node, model, time.perf_counter(), False]
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record the time to first token of an LLM call."""
+        with self._lock:
+            entry = self._llm_runs.get(run_id)
+            if entry is None or entry[3]:
+                return
+            entry[3] = True
+        node, model, started, _ = entry
+        self.registry.observe(
+            "llm_first_token_seconds",
+            time.perf_counter() - started,
+            node=node,
+            model=model,
+        )
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record the latency and token usage of an LLM call."""
+        with self._lock:
+            entry = self._llm_runs.pop(run_id, None)
+        if entry is None:
+            return
+        node, model, started, _ = entry
+        self.registry.observe(
+            "llm_latency_seconds", time.perf_counter() - started, node=node, model=model
+        )
+        usage = _usage(response)
+        if usage is None:
+            return
+        self.registry.incr("llm_calls_total", node=node, model=model)
+        self.registry.incr(
+            "llm_prompt_tokens_total", usage["prompt"], node=node, model=model
+        )
+        self.registry.incr(
+            "llm_cached_prompt_tokens_total", usage["cached"], node=node, model=model
+        )
+        self.registry.incr(
+            "llm_completion_tokens_total", usage["completion"], node=node, model=model
+        )
+        cost = estimate_cost(model, usage)
+        if cost is not None:
+            self.registry.incr("llm_cost_usd_total", cost, node=node, model=model)
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Forget an LLM call that failed."""
+        with self._lock:
+            self._llm_runs.pop(run_id, None)
+
+
+def usage_report(registry: Metrics = metrics) -> dict[str, dict[str, float]]:
+    """Per-node token totals, estimated cost and the fraction of prompt tokens read from cache."""
+    report: dict[str, dict[str, float]] = {}
+    names = {
+        "llm_calls_total": "calls",
+        "llm_prompt_tokens_total": "prompt_tokens",
+        "llm_cached_prompt_tokens_total": "cached_prompt_tokens",
+        "llm_completion_tokens_total": "completion_tokens",
+        "llm_cost_usd_total": "cost_usd",
+    }
+    for counter in registry.snapshot()["counters"]:
+        field = names.get(counter["name"])
+        if field is None:
+            continue
+        row = report.setdefault(
+            counter["labels"]["node"], dict.fromkeys(names.values(), 0.0)
+        )
+        row[field] += counter["value"]
+
+    for row in report.values():
+        row["cached_ratio"] = (
+            row["cached_prompt_tokens"] / row["prompt_tokens"]
+            if row["prompt_tokens"]
+            else 0.0
+        )
+    return report
+
+
+def latency_report(registry: Metrics = metrics) -> dict[str, dict[str, float]]:
+    """Per-node run count, mean/p50/p95 wall time and total LLM time, in seconds."""
+    report: dict[str, dict[str, float]] = {}
+    for summary in registry.snapshot()["summaries"]:
+        node = summary["labels"].get("node")
+        if summary["name"] == "node_latency_seconds":
+            row = report.setdefault(node, {"llm_seconds": 0.0})
+            row.update(
+                runs=summary["count"],
+                mean=summary["sum"] / summary["count"],
+                p50=registry.quantile("node_latency_seconds", 0.5, node=node),
+                p95=registry.quantile("node_latency_seconds", 0.95, node=node),
+            )
+        elif summary["name"] == "llm_latency_seconds":
+            report.setdefault(node, {"llm_seconds": 0.0})["llm_seconds"] += summary[
+                "sum"
+            ]
+    return report
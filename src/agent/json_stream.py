@@ -0,0 +1,59 @@
+"""Incremental JSON scanning - pull finished array items out of a streamed document.
+
+``JsonOutputParser`` re-parses the whole accumulated text on every streamed
+token, which is quadratic in the document size (~0.9 s of CPU for a 100-track
+proposal). ``ArrayItemScanner`` decodes each item of one top-level array once,
+when its closing brace arrives, so the cost stays linear.
+"""
+
+import json
+import re
+from typing import Any
+
+_SEPARATORS = " \t\r\n,"
+
+
+class ArrayItemScanner:
+    """Yield the items of ``document[key]`` as soon as each one is complete."""
+
+    def __init__(self, key: str) -> None:
+        """Scan for the items of the array under ``key``."""
+        self._start_re = re.compile(rf'"{re.escape(key)}"\s*:\s*\[')
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos: int = -1
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._buffer
+
+    def feed(self, chunk: str) -> list[Any]:
+        """Add streamed text, returning the items it completed."""
+        self._buffer += chunk
+        if self._pos < 0:
+            match = self._start_re.search(self._buffer)
+            if match is None:
+                return []
+            self._pos = match.end()
+
+        items = []
+        buffer = self._buffer
+        while not self.done:
+            i = self._pos
+            while i < len(buffer) and buffer[i] in _SEPARATORS:
+                i += 1
+            self._pos = i
+            if i == len(buffer):
+                break
+            if buffer[i] == "]":
+                self.done = True
+                break
+            try:
+                item, self._pos = self._decoder.raw_decode(buffer, i)
+            except json.JSONDecodeError:
+                # The item is still arriving
+                break
+            items.append(item)
+        return items
@@ -0,0 +1,466 @@
+"""Local evaluation runner - evaluate the graph on a JSONL dataset without LangSmith.
+
+Examples are LangSmith-style JSONL rows ({"inputs", "outputs", "metadata"},
+e.g. ``data/golden_dataset.jsonl``), streamed from disk in chunks. Each chunk
+runs through the graph with at most ``concurrency`` turns in flight, each
+timed on its own; the evaluators score it on worker threads while the next
+chunk runs. Each run has its own thread id; the track prefetch and playlist
+speculation it may leave behind are discarded when it finishes.
+``processes > 1`` shards the dataset across worker processes, each running
+its own abatch loop, for CPU-bound evaluators or graphs.
+
+Every (example, repetition) becomes one result row - the graph's outputs,
+the nodes it ran, any error, latency, and each evaluator's score and comment - written to a
+.jsonl file (streamed) or a .parquet file (with pyarrow). ``summarize()``
+aggregates the rows into per-evaluator mean/min/max scores.
+
+Usage:
+    python -m agent.run_evaluation --local data/golden_dataset.jsonl --output results.jsonl
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import inspect
+import json
+import multiprocessing
+import time
+from dataclasses import asdict, dataclass, is_dataclass
+from itertools import islice
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Collection,
+    Iterable,
+    Iterator,
+    Sequence,
+)
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+
+from agent.instrumentation import NODE_STEP_TAG
+from agent.metrics import metrics
+from agent.speculation import proposal_speculator
+from agent.spotify import track_prefetcher
+
+Evaluator = Callable[..., dict]
+
+DEFAULT_CONCURRENCY = 8
+# Examples per abatch call, as a multiple of the concurrency limit
+CHUNK_FACTOR = 4
+
+
+@dataclass
+class Example:
+    """One dataset row."""
+
+    id: str
+    inputs: dict
+    reference_outputs: dict
+    metadata: dict
+
+
+def example_id(row: dict) -> str:
+    """Return the row's "id", or a stable hash of its inputs."""
+    if row.get("id") is not None:
+        return str(row["id"])
+    encoded = json.dumps(row.get("inputs", {}), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+def read_examples(
+    path: str, shard: int = 0, shards: int = 1, only: Collection[str] | None = None
+) -> Iterator[Example]:
+    """Stream the examples of a JSONL dataset (every ``shards``-th row from ``shard``).
+
+    ``only`` restricts them to the given example ids.
+    """
+    with open(path) as f:
+        rows = (line for line in f if line.strip())
+        for line in islice(rows, shard, None, shards):
+            row = json.loads(line)
+            if only is not None and example_id(row) not in only:
+                continue
+            yield Example(
+                id=example_id(row),
+                inputs=row.get("inputs", {}),
+                reference_outputs=row.get("outputs") or {},
+                metadata=row.get("metadata") or {},
+            )
+
+
+def _jsonable(value: Any) -> Any:
+    """Graph outputs as plain JSON values (messages become role/content dicts)."""
+    if isinstance(value, BaseMessage):
+        return {"role": value.type, "content": value.content}
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if is_dataclass(value) and not isinstance(value, type):
+        return _jsonable(asdict(value))
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def run_evaluator(evaluator: Evaluator, example: Example, outputs: dict) -> list[dict]:
+    """Call an evaluator the way langsmith.evaluate would, never raising.
+
+    Returns one result per key: evaluators may return a single result or
+    ``{"results": [...]}`` with several.
+    """
+    name = getattr(evaluator, "__name__", str(evaluator))
+    kwargs = {"inputs": example.inputs, "outputs": outputs}
+    if "reference_outputs" in inspect.signature(evaluator).parameters:
+        kwargs["reference_outputs"] = example.reference_outputs
+    try:
+        result = evaluator(**kwargs)
+    except Exception as e:
+        return [{"key": name, "score": None, "comment": f"{type(e).__name__}: {e}"}]
+    return [
+        {
+            "key": r.get("key", name),
+            "score": r.get("score"),
+            "comment": r.get("comment"),
+        }
+        for r in result.get("results", [result])
+    ]
+
+
+class _NodeRecorder(BaseCallbackHandler):
+    """Record the graph nodes one run goes through, in order."""
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        self.nodes: list[str] = []
+
+    def on_chain_start(
+        self,
+        serialized: dict[str, Any] | None,
+        inputs: Any,
+        *,
+        run_id: UUID,
+        tags: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        # Same test as InstrumentationHandler: node runs carry their superstep tag
+        node = (metadata or {}).get("langgraph_node")
+        if (
+            node is not None
+            and kwargs.get("name") == node
+            and any(t.startswith(NODE_STEP_TAG) for t in tags or ())
+        ):
+            self.nodes.append(node)
+
+
+async def _score(
+    evaluators: Sequence[Evaluator],
+    example: Example,
+    repetition: int,
+    outputs: Any,
+    nodes: list[str],
+    latency: float,
+    limit: asyncio.Semaphore,
+) -> dict:
+    row: dict[str, Any] = {
+        "example_id": example.id,
+        "repetition": repetition,
+        "inputs": example.inputs,
+        "reference_outputs": example.reference_outputs,
+        "metadata": example.metadata,
+        "nodes": nodes,
+        "latency_s": latency,
+        "error": None,
+        "outputs": None,
+        "scores": {},
+        "comments": {},
+    }
+    if isinstance(outputs, Exception):
+        row["error"] = f"{type(outputs).__name__}: {outputs}"
+        return row
+    row["outputs"] = outputs = _jsonable(outputs)
+    for evaluator in evaluators:
+        # Evaluators are sync (judges block on HTTP) - keep them off the loop
+        async with limit:
+            results = await asyncio.to_thread(
+                run_evaluator, evaluator, example, outputs
+            )
+        for result in results:
+            row["scores"][result["key"]] = result["score"]
+            row["comments"][result["key"]] = result["comment"]
+    return row
+
+
+async def _run_one(
+    graph: Runnable, example: Example, repetition: int, limit: asyncio.Semaphore
+) -> tuple[Any, list[str], float]:
+    """Run one (example, repetition) turn: its output (or exception), nodes and latency."""
+    recorder = _NodeRecorder()
+    thread_id = f"eval-{example.id}-{repetition}"
+    config = {
+        "run_name": "local_evaluation",
+        "metadata": {"example_id": example.id, "repetition": repetition},
+        "configurable": {"thread_id": thread_id},
+        "callbacks": [recorder],
+    }
+    async with limit:
+        start = time.perf_counter()
+        try:
+            output = await graph.ainvoke(example.inputs, config)
+        except Exception as e:
+            output = e
+        finally:
+            # No later turn will resume this thread to use them
+            track_prefetcher.discard(thread_id)
+            proposal_speculator.discard(thread_id)
+        return output, recorder.nodes, time.perf_counter() - start
+
+
+async def _run_chunk(
+    graph: Runnable, chunk: list[tuple[Example, int]], concurrency: int
+) -> list[tuple[Any, list[str], float]]:
+    limit = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(
+        *(_run_one(graph, example, rep, limit) for example, rep in chunk)
+    )
+
+
+async def aevaluate(
+    examples: Iterable[Example],
+    evaluators: Sequence[Evaluator],
+    graph: Runnable | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    repetitions: int = 1,
+) -> AsyncIterator[dict]:
+    """Yield one result row per (example, repetition), chunk by chunk."""
+    runs = ((example, rep) for example in examples for rep in range(repetitions))
+    async for row in aevaluate_runs(runs, evaluators, graph, concurrency):
+        yield row
+
+
+async def aevaluate_runs(
+    runs: Iterable[tuple[Example, int]],
+    evaluators: Sequence[Evaluator],
+    graph: Runnable | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> AsyncIterator[dict]:
+    """Yield the result row of each given (example, repetition) run, chunk by chunk."""
+    if graph is None:
+        from agent.graph import graph
+    runs = iter(runs)
+    limit = asyncio.Semaphore(concurrency)
+
+    chunk = list(islice(runs, concurrency * CHUNK_FACTOR))
+    pending = (
+        asyncio.create_task(_run_chunk(graph, chunk, concurrency)) if chunk else None
+    )
+    while pending is not None:
+        results = await pending
+        current, chunk = chunk, list(islice(runs, concurrency * CHUNK_FACTOR))
+        # Start the next chunk's turns before scoring this one
+        pending = (
+            asyncio.create_task(_run_chunk(graph, chunk, concurrency))
+            if chunk
+            else None
+        )
+        rows = await asyncio.gather(
+            *(
+                _score(evaluators, example, rep, output, nodes, latency, limit)
+                for (example, rep), (output, nodes, latency) in zip(current, results)
+            )
+        )
+        for row in rows:
+            yield row
+
+
+async def _collect(
+    path: str,
+    shard: int,
+    shards: int,
+    only: Collection[str] | None,
+    evaluators: Sequence[Evaluator],
+    **kwargs: Any,
+) -> list[dict]:
+    return [
+        row
+        async for row in aevaluate(
+            read_examples(path, shard, shards, only), evaluators, **kwargs
+        )
+    ]
+
+
+def _evaluate_shard(
+    path: str,
+    shard: int,
+    shards: int,
+    only: Collection[str] | None,
+    evaluators: Sequence[Evaluator],
+    kwargs: dict,
+) -> tuple[list[dict], list[dict]]:
+    rows = asyncio.run(_collect(path, shard, shards, only, evaluators, **kwargs))
+    # The worker's judge counters, to be added to the parent's registry
+    counters = [
+        c for c in metrics.snapshot()["counters"] if c["name"].startswith("judge_")
+    ]
+    return rows, counters
+
+
+def iterate(rows: AsyncIterator[dict]) -> Iterator[dict]:
+    """Drive an async row iterator from sync code on a private event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(anext(rows))
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(rows.aclose())
+        loop.close()
+
+
+def evaluate_file(
+    path: str,
+    evaluators: Sequence[Evaluator],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    repetitions: int = 1,
+    processes: int = 1,
+    only: Collection[str] | None = None,
+) -> Iterator[dict]:
+    """Evaluate a JSONL dataset, yielding result rows as they complete.
+
+    With ``processes > 1`` each worker process evaluates one shard of the
+    dataset; its rows are yielded when the shard finishes. ``only`` limits
+    the run to the given example ids.
+    """
+    kwargs = {"concurrency": concurrency, "repetitions": repetitions}
+    if processes <= 1:
+        yield from iterate(
+            aevaluate(read_examples(path, only=only), evaluators, **kwargs)
+        )
+        return
+
+    # spawn, not fork: the parent may already run background-loop threads
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(processes, mp_context=context) as pool:
+        futures = [
+            pool.submit(
+                _evaluate_shard, path, shard, processes, only, list(evaluators), kwargs
+            )
+            for shard in range(processes)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            rows, counters = future.result()
+            for counter in counters:
+                metrics.incr(counter["name"], counter["value"], **counter["labels"])
+            yield from rows
+
+
+def judge_stats() -> dict[str, float]:
+    """Judge requests sent and saved by the judge cache so far in this process."""
+    calls = sum(
+        c["value"]
+        for c in metrics.snapshot()["counters"]
+        if c["name"] == "judge_calls_total"
+    )
+    return {
+        "judge_calls": calls,
+        "judge_cache_hits": metrics.counter("judge_cache_total", outcome="hit"),
+    }
+
+
+def summarize(rows: Iterable[dict]) -> dict[str, Any]:
+    """Run totals plus count/mean/min/max of each evaluator's scores."""
+    summary: dict[str, Any] = {"runs": 0, "examples": 0, "errors": 0, "scores": {}}
+    examples = set()
+    scores: dict[str, list[float]] = {}
+    for row in rows:
+        summary["runs"] += 1
+        examples.add(row["example_id"])
+        summary["errors"] += row["error"] is not None
+        for key, score in row["scores"].items():
+            if score is not None:
+                scores.setdefault(key, []).append(float(score))
+    summary["examples"] = len(examples)
+    for key, values in sorted(scores.items()):
+        summary["scores"][key] = {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "min": min(values),
+            "max": max(values),
+        }
+    return summary
+
+
+class ResultWriter:
+    """Write result rows to .jsonl (one line per row, as they arrive) or .parquet."""
+
+    def __init__(self, path: str) -> None:
+        """Open ``path``; a .parquet suffix needs pyarrow."""
+        self.path = path
+        self.parquet = Path(path).suffix == ".parquet"
+        if self.parquet:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError as e:
+                raise ImportError(
+                    "Writing Parquet results requires pyarrow: pip install pyarrow"
+                ) from e
+            self._rows: list[dict] = []
+        else:
+            self._file = open(path, "w")
+
+    def write(self, row: dict) -> None:
+        """Write a result row (buffered for Parquet until close)."""
+        if self.parquet:
+            self._rows.append(row)
+        else:
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        """Close the file, writing the Parquet table first."""
+        if not self.parquet:
+            self._file.close()
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Flat columns: nested values as JSON, one score_<key> column per evaluator
+        keys = sorted({key for row in self._rows for key in row["scores"]})
+        columns: dict[str, list] = {
+            "example_id": [row["example_id"] for row in self._rows],
+            "repetition": [row["repetition"] for row in self._rows],
+            "latency_s": [row["latency_s"] for row in self._rows],
+            "error": [row["error"] for row in self._rows],
+        }
+        for field in (
+            "inputs",
+            "reference_outputs",
+            "metadata",
+            "nodes",
+            "outputs",
+            "comments",
+        ):
+            columns[field] = [
+                json.dumps(row[field], ensure_ascii=False) for row in self._rows
+            ]
+        for key in keys:
+            columns[f"score_{key}"] = [row["scores"].get(key) for row in self._rows]
+        pq.write_table(pa.table(columns), self.path)
+
+    def __enter__(self) -> "ResultWriter":
+        """Return the writer."""
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        """Close the writer."""
+        self.close()
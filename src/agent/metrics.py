@@ -0,0 +1,212 @@
+"""In-process metrics - counters and latency histograms shared by the graph's stages.
+
+Metrics are keyed by name plus optional labels, e.g.
+``metrics.incr("fast_path_total", outcome="hit")``. Everything is kept in
+memory for the lifetime of the process; call ``snapshot()`` to read it, or
+export it with ``prometheus_text()`` (Prometheus text exposition format) or
+``write_jsonl()`` (one JSON object per metric and label set).
+"""
+
+import json
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Iterator
+
+LabelKey = tuple[str, tuple[tuple[str, str], ...]]
+
+# Histogram bucket upper bounds for observed values (seconds)
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def _key(name: str, labels: dict[str, Any]) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Metrics:
+    """Thread-safe registry of counters and observed values."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """Create an empty registry with the given histogram bucket bounds."""
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: dict[LabelKey, float] = defaultdict(float)
+        # [count, sum, min, max, per-bucket counts (last = above every bound)]
+        self._summaries: dict[LabelKey, list[Any]] = {}
+
+    def incr(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Increment a counter."""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record one observation (e.g. a latency in seconds)."""
+        key = _key(name, labels)
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                counts = [0] * (len(self.buckets) + 1)
+                counts[bucket] = 1
+                self._summaries[key] = [1, value, value, value, counts]
+            else:
+                summary[0] += 1
+                summary[1] += value
+                summary[2] = min(summary[2], value)
+                summary[3] = max(summary[3], value)
+                summary[4][bucket] += 1
+
+    def counter(self, name: str, **labels: Any) -> float:
+        """Return the current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0.0)
+
+    def quantile(self, name: str, q: float, **labels: Any) -> float | None:
+        """Estimate a quantile of observed values, interpolating within a bucket."""
+        with self._lock:
+            summary = self._summaries.get(_key(name, labels))
+            if summary is None:
+                return None
+            count, _, low, high, counts = *summary[:4], list(summary[4])
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = max(low, self.buckets[i - 1]) if i > 0 else low
+                upper = min(high, self.buckets[i]) if i < len(self.buckets) else high
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return high
+
+    def snapshot(self) -> dict[str, list[dict[str, Any]]]:
+        """Return all counters and summaries as plain dicts.
+
+        Summaries include cumulative ``buckets`` as [upper bound, count] pairs.
+        """
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self._counters.items()
+            ]
+            summaries = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": int(count),
+                    "sum": total,
+                    "min": low,
+                    "max": high,
+                    "buckets": _cumulative(self.buckets, counts),
+                }
+                for (name, labels), (
+                    count,
+                    total,
+                    low,
+                    high,
+                    counts,
+                ) in self._summaries.items()
+            ]
+        return {"counters": counters, "summaries": summaries}
+
+    def reset(self) -> None:
+        """Drop all recorded metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+
+def _cumulative(bounds: tuple[float, ...], counts: list[int]) -> list[list[float]]:
+    total = 0
+    buckets = []
+    for bound, n in zip((*bounds, math.inf), counts):
+        total += n
+        buckets.append([bound, total])
+    return buckets
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict[str, str], **extra: str) -> str:
+    pairs = {**labels, **extra}
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(pairs.items())) + "}"
+
+
+def _bound(value: float) -> str:
+    return "+Inf" if value == math.inf else repr(value)
+
+
+def prometheus_text(registry: Metrics | None = None) -> str:
+    """Every metric in the Prometheus text exposition format.
+
+    Counters are exported as counters, observed values as histograms.
+    """
+    snapshot = (registry or metrics).snapshot()
+    lines: list[str] = []
+
+    by_name: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for counter in snapshot["counters"]:
+        by_name[counter["name"]].append(counter)
+    for name in sorted(by_name):
+        lines.append(f"# TYPE {name} counter")
+        lines.extend(
+            f"{name}{_labels(c['labels'])} {c['value']:g}" for c in by_name[name]
+        )
+
+    by_name = defaultdict(list)
+    for summary in snapshot["summaries"]:
+        by_name[summary["name"]].append(summary)
+    for name in sorted(by_name):
+        lines.append(f"# TYPE {name} histogram")
+        for s in by_name[name]:
+            for bound, count in s["buckets"]:
+                lines.append(
+                    f"{name}_bucket{_labels(s['labels'], le=_bound(bound))} {count}"
+                )
+            lines.append(f"{name}_sum{_labels(s['labels'])} {s['sum']:g}")
+            lines.append(f"{name}_count{_labels(s['labels'])} {s['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def jsonl_records(registry: Metrics | None = None) -> Iterator[dict[str, Any]]:
+    """One timestamped record per counter and histogram."""
+    snapshot = (registry or metrics).snapshot()
+    now = time.time()
+    for counter in snapshot["counters"]:
+        yield {"ts": now, "type": "counter", **counter}
+    for summary in snapshot["summaries"]:
+        buckets = [[_bound(b), n] for b, n in summary["buckets"]]
+        yield {"ts": now, "type": "histogram", **summary, "buckets": buckets}
+
+
+def write_jsonl(path: str, registry: Metrics | None = None) -> int:
+    """Append the current metrics to a JSON lines file, returning the lines written."""
+    written = 0
+    with open(path, "a") as f:
+        for record in jsonl_records(registry):
+            f.write(json.dumps(record) + "\n")
+            written += 1
+    return written
+
+
+metrics = Metrics()
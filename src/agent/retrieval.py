@@ -0,0 +1,337 @@
+"""Embedding retrieval - ground playlist generation in tracks from a local catalog.
+
+Before generate_playlist calls the LLM, the classification signals (mood,
+genre, activity...) are embedded and scored against every track of an
+on-disk index by cosine similarity; the top candidates are listed in the
+playlist task message so the model picks real tracks instead of recalling
+(and sometimes inventing) them.
+
+The default embedding is a local feature-hashing model over words and
+character trigrams, so retrieval works offline; any function mapping a list
+of texts to an (n, dim) float array can be used instead, as long as the index
+was built with the same one; ``EmbeddingIndex`` refuses an index whose
+recorded embedding name or dimension differs.
+
+An index is a directory written by ``build_index``:
+    meta.json       {"rows", "dim", "embedding"}
+    embeddings.f32  (rows, dim) float32 matrix of L2-normalized vectors
+    tracks.jsonl    one {"artist", "title", "spotify_uri"} row per vector
+    offsets.u64     byte offset of each row in tracks.jsonl
+
+Both binary files are memory-mapped: a search scans the matrix in fixed-size
+chunks, keeping a running top-k, and only reads the k winning track rows, so
+neither the vectors nor the tracks are ever loaded into RAM as a whole.
+
+Requires numpy (``pip install numpy``). Configured from the environment by
+``get_embedding_index()``:
+    DJ_TRACK_EMBEDDINGS  index directory (unset = no retrieval)
+
+Usage:
+    # Build an index from a catalog dump (.jsonl or .parquet; genre, mood
+    # and tags columns are embedded along with artist and title)
+    python -m agent.retrieval build data/catalog.jsonl .cache/embeddings
+
+    # Try a query
+    python -m agent.retrieval search .cache/embeddings "dark driving techno"
+"""
+
+import argparse
+import json
+import os
+import zlib
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Iterable, Sequence
+
+from agent.catalog import read_records
+from agent.metrics import metrics
+from agent.track_cache import normalize_name
+
+# Imported by _require_numpy() on first use - importing numpy costs ~75 ms
+# of cold start for processes that never retrieve
+np: Any = None
+
+DEFAULT_DIM = 256
+# Rows scored per matrix chunk (64 MB of float32 at 256 dimensions)
+CHUNK_ROWS = 65_536
+BUILD_BATCH_ROWS = 8_192
+# Catalog columns describing a track, embedded along with artist and title
+TEXT_FIELDS = ("genre", "genres", "mood", "moods", "tags")
+
+WORD_WEIGHT = 1.0
+TRIGRAM_WEIGHT = 0.5
+
+META_FILE = "meta.json"
+EMBEDDINGS_FILE = "embeddings.f32"
+TRACKS_FILE = "tracks.jsonl"
+OFFSETS_FILE = "offsets.u64"
+
+Embedder = Callable[[Sequence[str]], Any]
+
+
+def _require_numpy() -> None:
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - optional dependency
+            raise ImportError(
+                "Embedding retrieval requires numpy: pip install numpy"
+            ) from None
+        np = numpy
+
+
+def _flatten(value: Any) -> list[str]:
+    """Strings in a signal or catalog value (str, list or dict of those)."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple, set)):
+        return [text for item in value for text in _flatten(item)]
+    return []
+
+
+def track_text(record: dict) -> str:
+    """Text embedded for a catalog track."""
+    parts = [record.get("artist", ""), record.get("title", "")]
+    for name in TEXT_FIELDS:
+        parts.extend(_flatten(record.get(name)))
+    return " ".join(p for p in parts if p)
+
+
+def signals_text(signals: dict) -> str:
+    """Query text for a classification's signals ("" when there are none)."""
+    return " ".join(_flatten(signals))
+
+
+@lru_cache(maxsize=1 << 16)
+def _word_features(word: str, dim: int) -> tuple[tuple[int, ...], tuple[float, ...]]:
+    """Hashed columns and signed weights of a word and its character trigrams.
+
+    crc32 (unlike ``hash``) is stable across processes, so an index built
+    once can be queried by any worker.
+    """
+    padded = f"<{word}>"
+    features = [(word, WORD_WEIGHT)] + [
+        (padded[i : i + 3], TRIGRAM_WEIGHT) for i in range(len(padded) - 2)
+    ]
+    columns, weights = [], []
+    for feature, weight in features:
+        h = zlib.crc32(feature.encode())
+        columns.append(h % dim)
+        weights.append(weight if h & 0x80000000 else -weight)
+    return tuple(columns), tuple(weights)
+
+
+def hash_embed(texts: Sequence[str], dim: int = DEFAULT_DIM) -> "np.ndarray":
+    """L2-normalized signed feature-hashing embeddings of ``texts``."""
+    _require_numpy()
+    cells: list[int] = []
+    weights: list[float] = []
+    for row, text in enumerate(texts):
+        base = row * dim
+        for word in normalize_name(text).split():
+            word_columns, word_weights = _word_features(word, dim)
+            cells.extend(base + c for c in word_columns)
+            weights.extend(word_weights)
+
+    vectors = (
+        np.bincount(cells, weights, minlength=len(texts) * dim)
+        .astype(np.float32)
+        .reshape(len(texts), dim)
+    )
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _embedding_dim(embed: Embedder) -> int:
+    """Dimension of the vectors ``embed`` makes."""
+    return np.asarray(embed(["music"])).shape[-1]
+
+
+def build_index(
+    records: Iterable[dict],
+    directory: str,
+    embed: Embedder = hash_embed,
+    embedding: str = "hash",
+    batch_rows: int = BUILD_BATCH_ROWS,
+) -> int:
+    """Write an index of ``records`` to ``directory``, a batch at a time.
+
+    Returns the number of rows written.
+    """
+    _require_numpy()
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+
+    records = iter(records)
+    rows, dim, offset = 0, None, 0
+    with (
+        open(path / EMBEDDINGS_FILE, "wb") as vectors,
+        open(path / TRACKS_FILE, "wb") as tracks,
+        open(path / OFFSETS_FILE, "wb") as offsets,
+    ):
+        while batch := list(islice(records, batch_rows)):
+            matrix = np.asarray(embed([track_text(r) for r in batch]), dtype=np.float32)
+            dim = matrix.shape[1]
+            vectors.write(matrix.tobytes())
+
+            positions = np.empty(len(batch), dtype=np.uint64)
+            for i, record in enumerate(batch):
+                line = (
+                    json.dumps(
+                        {
+                            "artist": record["artist"],
+                            "title": record["title"],
+                            "spotify_uri": record.get("spotify_uri"),
+                        }
+                    ).encode()
+                    + b"\n"
+                )
+                positions[i] = offset
+                tracks.write(line)
+                offset += len(line)
+            offsets.write(positions.tobytes())
+            rows += len(batch)
+
+    if dim is None:
+        dim = _embedding_dim(embed)
+    # Written last: a directory without meta.json is an incomplete build
+    (path / META_FILE).write_text(
+        json.dumps({"rows": rows, "dim": dim, "embedding": embedding})
+    )
+    return rows
+
+
+class EmbeddingIndex:
+    """Memory-mapped index searched by chunked cosine top-k."""
+
+    def __init__(
+        self, directory: str, embed: Embedder = hash_embed, embedding: str = "hash"
+    ) -> None:
+        """Memory-map the index in ``directory``.
+
+        ``embed`` and its name ``embedding`` must be the ones the index was
+        built with; a mismatch in name or dimension raises ValueError.
+        """
+        _require_numpy()
+        path = Path(directory)
+        meta = json.loads((path / META_FILE).read_text())
+        if meta.get("embedding") != embedding:
+            raise ValueError(
+                f"Index {directory} was built with the {meta.get('embedding')!r} "
+                f"embedding, not {embedding!r}"
+            )
+        dim = _embedding_dim(embed)
+        if meta["dim"] != dim:
+            raise ValueError(
+                f"Index {directory} has {meta['dim']}-dimensional vectors, "
+                f"but the {embedding!r} embedding makes {dim}-dimensional ones"
+            )
+        self.rows: int = meta["rows"]
+        self.dim: int = meta["dim"]
+        self._embed = embed
+        self._tracks_path = path / TRACKS_FILE
+        if self.rows:
+            self._matrix = np.memmap(
+                path / EMBEDDINGS_FILE,
+                dtype=np.float32,
+                mode="r",
+                shape=(self.rows, self.dim),
+            )
+            self._offsets = np.memmap(
+                path / OFFSETS_FILE, dtype=np.uint64, mode="r", shape=(self.rows,)
+            )
+        else:
+            self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+            self._offsets = np.zeros(0, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        """Return the number of indexed tracks."""
+        return self.rows
+
+    def top_k(
+        self, vector: "np.ndarray", k: int, chunk_rows: int = CHUNK_ROWS
+    ) -> list[tuple[float, int]]:
+        """(cosine similarity, row) of the ``k`` rows closest to ``vector``, best first."""
+        vector = np.asarray(vector, dtype=np.float32)
+        best_scores = np.empty(0, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        for start in range(0, self.rows, chunk_rows):
+            scores = self._matrix[start : start + chunk_rows] @ vector
+            top = (
+                np.argpartition(scores, -k)[-k:]
+                if len(scores) > k
+                else np.arange(len(scores))
+            )
+            best_scores = np.concatenate([best_scores, scores[top]])
+            best_rows = np.concatenate([best_rows, top + start])
+            if len(best_scores) > k:
+                keep = np.argpartition(best_scores, -k)[-k:]
+                best_scores, best_rows = best_scores[keep], best_rows[keep]
+        order = np.argsort(-best_scores, kind="stable")
+        return [(float(best_scores[i]), int(best_rows[i])) for i in order]
+
+    def tracks(self, rows: Sequence[int]) -> list[dict]:
+        """Track rows, read from disk by offset."""
+        with open(self._tracks_path, "rb") as f:
+            found = []
+            for row in rows:
+                f.seek(int(self._offsets[row]))
+                found.append(json.loads(f.readline()))
+            return found
+
+    def search(self, text: str, k: int) -> list[tuple[float, dict]]:
+        """Tracks most similar to ``text`` as (similarity, track), best first."""
+        vector = np.asarray(self._embed([text]), dtype=np.float32)[0]
+        if k <= 0 or not vector.any():
+            return []
+        ranked = self.top_k(vector, k)
+        return list(
+            zip([score for score, _ in ranked], self.tracks([row for _, row in ranked]))
+        )
+
+    def candidates(self, signals: dict, k: int) -> list[dict]:
+        """Up to ``k`` tracks matching a classification's signals."""
+        query = signals_text(signals)
+        found = [track for _, track in self.search(query, k)] if query else []
+        metrics.incr("retrieval_total", outcome="hit" if found else "empty")
+        return found
+
+
+@lru_cache(maxsize=1)
+def get_embedding_index() -> EmbeddingIndex | None:
+    """Index from DJ_TRACK_EMBEDDINGS, opened once per process (None if unset)."""
+    path = os.getenv("DJ_TRACK_EMBEDDINGS")
+    return EmbeddingIndex(path) if path else None
+
+
+def main() -> None:
+    """Build or query a track embedding index from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Build or query a track embedding index"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Index a .jsonl or .parquet catalog dump")
+    build.add_argument("catalog")
+    build.add_argument("index")
+    search = commands.add_parser("search", help="Show the tracks closest to a query")
+    search.add_argument("index")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        rows = build_index(read_records(args.catalog), args.index)
+        print(f"Indexed {rows} tracks into {args.index}")
+        return
+
+    index = EmbeddingIndex(args.index)
+    for similarity, track in index.search(args.query, args.k):
+        print(f"{similarity:.3f}  {track['artist']} – {track['title']}")
+
+
+if __name__ == "__main__":
+    main()
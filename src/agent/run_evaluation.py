@@ -1,5 +1,4 @@
-"""
-Main evaluation runner - compose and run evaluation suites.
+"""Main evaluation runner - compose and run evaluation suites.
 
 Usage:
     # Run all evaluators
@@ -10,12 +9,42 @@ Usage:
 
     # Run with custom dataset
     python -m agent.run_evaluation --dataset my-dataset
+
+    # Run offline on a local JSONL dataset, writing per-example results
+    python -m agent.run_evaluation --local data/golden_dataset.jsonl --output results.jsonl
+
+    # Rerun only the examples affected by changes since the last run
+    python -m agent.run_evaluation --local data/golden_dataset.jsonl --incremental eval-store.sqlite
+
+    # Repeat each example (up to 10 times) only until its score intervals are tight
+    python -m agent.run_evaluation --local data/golden_dataset.jsonl --repetitions 10 --adaptive --budget 60
 """
 
 import argparse
-from langsmith import evaluate
+import json
+import time
+from pathlib import Path
+
+from agent.adaptive_evaluation import (
+    DEFAULT_MIN_REPETITIONS,
+    DEFAULT_TARGET,
+    AdaptiveRepetitions,
+)
+from agent.evaluators import (
+    MultiCriteria,
+    classification_accuracy,
+    conversation_tone,
+    playlist_quality,
+)
+from agent.evaluators.multi_criteria import CRITERIA
 from agent.graph import graph
-from agent.evaluators import playlist_quality, conversation_tone
+from agent.local_evaluation import (
+    DEFAULT_CONCURRENCY,
+    ResultWriter,
+    evaluate_file,
+    judge_stats,
+    summarize,
+)
 
 
 def target(inputs: dict) -> dict:
@@ -31,8 +60,111 @@ EVALUATION_SUITES = {
     "combined": [playlist_quality, conversation_tone],  # alias for "all"
 }
 
+EVALUATORS = {
+    "playlist_quality": playlist_quality,
+    "conversation_tone": conversation_tone,
+    "classification_accuracy": classification_accuracy,
+}
+
+
+def _width(value) -> str:
+    return "n/a" if value is None else f"{value:.3f}"
+
+
+def run_local(args, evaluators) -> None:
+    """Evaluate a local JSONL dataset and write results plus a summary."""
+    output = args.output or f"{Path(args.local).stem}-results.jsonl"
+    summary_path = Path(output).with_suffix(".summary.json")
+
+    kwargs = {
+        "concurrency": args.concurrency,
+        "repetitions": args.repetitions,
+        "processes": args.processes,
+    }
+    store = scheduler = None
+    if args.adaptive:
+        scheduler = AdaptiveRepetitions(
+            evaluators,
+            target=args.target_ci,
+            min_repetitions=args.min_repetitions,
+            max_repetitions=args.repetitions,
+            budget=args.budget,
+            concurrency=args.concurrency,
+        )
+        results = scheduler.evaluate_file(args.local)
+    elif args.incremental:
+        from agent.eval_store import EvalStore, evaluate_incremental
+
+        store = EvalStore(args.incremental)
+        results = evaluate_incremental(
+            args.local, evaluators, store, full=args.full, **kwargs
+        )
+    else:
+        results = evaluate_file(args.local, evaluators, **kwargs)
+
+    start = time.perf_counter()
+    rows = []
+    try:
+        with ResultWriter(output) as writer:
+            for row in results:
+                writer.write(row)
+                # Only what the summary needs - outputs can be large
+                rows.append({k: row[k] for k in ("example_id", "error", "scores")})
+                status = (
+                    "error"
+                    if row["error"]
+                    else " ".join(f"{k}={v}" for k, v in row["scores"].items())
+                )
+                cached = " (cached)" if row.get("cached") else ""
+                print(f"  {row['example_id']} #{row['repetition']}: {status}{cached}")
+    finally:
+        if store is not None:
+            store.close()
+
+    summary = {
+        **summarize(rows),
+        **judge_stats(),
+        "elapsed_s": time.perf_counter() - start,
+    }
+    if store is not None:
+        from agent.eval_store import store_stats
+
+        summary.update(store_stats())
+    if scheduler is not None:
+        summary["adaptive"] = scheduler.report()
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(
+        f"\nEvaluated {summary['runs']} runs of {summary['examples']} examples "
+        f"in {summary['elapsed_s']:.1f}s ({summary['errors']} errors)"
+    )
+    print(
+        f"  Judge calls: {summary['judge_calls']:.0f} ({summary['judge_cache_hits']:.0f} answered from cache)"
+    )
+    if store is not None:
+        print(
+            f"  Examples rerun: {summary['rerun_examples']:.0f} "
+            f"({summary['reused_examples']:.0f} reused from {args.incremental})"
+        )
+    if scheduler is not None:
+        adaptive = summary["adaptive"]
+        print(
+            f"  Adaptive: {adaptive['runs']} runs instead of {adaptive['fixed_runs']} "
+            f"({adaptive['saved_runs']} saved), {adaptive['converged']}/{summary['examples']} examples "
+            f"within ±{adaptive['target_half_width']}"
+        )
+        for key, widths in adaptive["half_widths"].items():
+            print(
+                f"  {key}: 95% CI half-width mean {_width(widths['mean'])}, max {_width(widths['max'])}"
+            )
+    for key, stats in summary["scores"].items():
+        print(f"  {key}: mean {stats['mean']:.3f} over {stats['count']}")
+    print(f"Results: {output}\nSummary: {summary_path}")
+
 
 def main():
+    """Run the evaluation from the command line."""
     parser = argparse.ArgumentParser(description="Run DJ Agent evaluation")
     parser.add_argument(
         "--dataset",
@@ -51,7 +183,7 @@ def main():
         "--evaluators",
         type=str,
         nargs="+",
-        choices=["playlist_quality", "conversation_tone"],
+        choices=list(EVALUATORS),
         help="Specific evaluators to run (overrides --suite)",
     )
     parser.add_argument(
@@ -72,21 +204,102 @@ def main():
         default=2,
         help="Maximum concurrent evaluations",
     )
+    parser.add_argument(
+        "--multi-criteria",
+        action="store_true",
+        help="Score all judged criteria in a single judge call per example",
+    )
+    parser.add_argument(
+        "--local",
+        type=str,
+        default=None,
+        help="Evaluate a local JSONL dataset offline instead of a LangSmith dataset",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Local mode: per-example results file, .jsonl or .parquet (default: <dataset>-results.jsonl)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Local mode: maximum concurrent graph turns per process",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Local mode: worker processes to shard the dataset across",
+    )
+    parser.add_argument(
+        "--incremental",
+        type=str,
+        default=None,
+        metavar="STORE",
+        help="Local mode: SQLite results store; only examples whose prompts, inputs or evaluators changed are rerun",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="With --incremental: rerun every example and refresh the store",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Local mode: repeat each example only until its score intervals are tight, "
+        "up to --repetitions times",
+    )
+    parser.add_argument(
+        "--target-ci",
+        type=float,
+        default=DEFAULT_TARGET,
+        help="With --adaptive: 95%% confidence interval half-width to stop at",
+    )
+    parser.add_argument(
+        "--min-repetitions",
+        type=int,
+        default=DEFAULT_MIN_REPETITIONS,
+        help="With --adaptive: repetitions every example gets before its variance is judged",
+    )
+    parser.add_argument(
+        "--budget",
+        type=int,
+        default=None,
+        help="With --adaptive: maximum graph runs for the whole evaluation",
+    )
 
     args = parser.parse_args()
+    if args.adaptive:
+        if not args.local:
+            parser.error("--adaptive requires --local")
+        if args.incremental:
+            parser.error("--adaptive can't be combined with --incremental")
+        if args.processes > 1:
+            parser.error("--adaptive runs in a single process")
+        if args.repetitions < args.min_repetitions:
+            parser.error(
+                "--adaptive takes --repetitions as the per-example cap; "
+                "it must be at least --min-repetitions"
+            )
 
     # Determine which evaluators to use
     if args.evaluators:
-        evaluator_map = {
-            "playlist_quality": playlist_quality,
-            "conversation_tone": conversation_tone,
-        }
-        evaluators = [evaluator_map[e] for e in args.evaluators]
+        evaluators = [EVALUATORS[e] for e in args.evaluators]
         suite_name = "-".join(args.evaluators)
     else:
         evaluators = EVALUATION_SUITES[args.suite]
         suite_name = args.suite
 
+    # Fold the LLM judges into one multi-criteria judge call per example
+    if args.multi_criteria:
+        criteria = [e.__name__ for e in evaluators if e.__name__ in CRITERIA]
+        if criteria:
+            evaluators = [e for e in evaluators if e.__name__ not in CRITERIA] + [
+                MultiCriteria(criteria)
+            ]
+
     # Generate experiment prefix if not provided
     if args.prefix is None:
         prefix = f"dj-{suite_name}"
@@ -95,14 +308,20 @@ def main():
     else:
         prefix = args.prefix
 
-    print(f"Running evaluation:")
-    print(f"  Dataset: {args.dataset}")
+    print("Running evaluation:")
+    print(f"  Dataset: {args.local or args.dataset}")
     print(f"  Evaluators: {[e.__name__ for e in evaluators]}")
     print(f"  Repetitions: {args.repetitions}")
     print(f"  Experiment prefix: {prefix}")
     print()
 
+    if args.local:
+        run_local(args, evaluators)
+        return
+
     # Run evaluation
+    from langsmith import evaluate
+
     results = evaluate(
         target,
         data=args.dataset,
@@ -118,4 +337,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
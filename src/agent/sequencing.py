@@ -0,0 +1,264 @@
+"""Track sequencing - order a proposal to follow an energy arc.
+
+Requests like "starts mellow and builds up" describe an arc rather than a set
+of tracks. The arc is detected from the request text, turned into a target
+energy per position, and the proposed tracks are ordered to minimize:
+
+- arc cost: squared distance between a track's energy and its position's target
+- transition cost: tempo jumps (half/double time counts as a match), key
+  clashes on the Camelot wheel and energy jumps between neighbours
+
+Up to ``EXACT_MAX_TRACKS`` tracks are ordered exactly by dynamic programming
+over subsets (Held-Karp, with the position given by the subset size). Longer
+playlists start from the rearrangement-optimal assignment for the arc alone
+(sorted energies to sorted targets) and are improved by swaps within a window
+until no swap helps (~10 ms for 100 tracks, ~35 ms for 300).
+
+Tracks without features (not in the catalog) cost nothing wherever they go,
+so they keep wherever the initial order puts them.
+"""
+
+import math
+import re
+from typing import NamedTuple, Sequence
+
+# Target energies (0-1) at the start and end of each arc; "peak" also
+# reaches PEAK_ENERGY at PEAK_POSITION (0-1 through the playlist)
+ARC_ENDPOINTS = {"build": (0.2, 0.9), "wind_down": (0.85, 0.2), "peak": (0.3, 0.4)}
+PEAK_ENERGY = 0.9
+PEAK_POSITION = 0.7
+
+ARC_PATTERNS = {
+    "peak": re.compile(
+        r"\b(?:peaks? (?:and (?:then )?|then )(?:comes?|winds?|cools?) down|rises? and falls?|up and (?:back )?down"
+        r"|builds? (?:up )?(?:to a peak )?(?:and (?:then )?|then )(?:comes?|winds?|cools?) down"
+        r"|warm(?:s|ing)?[ -]up\b.*\bcool(?:s|ing)?[ -]down)\b"
+    ),
+    "wind_down": re.compile(
+        r"\b(?:winds? down|winding down|cool(?:s|ing)? down|comes? down|come-down|comedown|wind-down"
+        r"|ends? (?:mellow|chill|calm|slow|soft)|(?:gets?|getting) (?:calmer|mellower|slower|softer))\b"
+    ),
+    "build": re.compile(
+        r"\b(?:builds? up|building up|build-up|builds|ramps? up|ramping up|warm(?:s|ing)? up|crescendo"
+        r"|starts? (?:mellow|chill|calm|slow|soft|easy)|(?:gets?|getting) (?:harder|faster|more intense)"
+        r"|(?:into|to) (?:the )?(?:night|peak time|dancefloor))\b"
+    ),
+}
+
+EXACT_MAX_TRACKS = 8
+SWAP_WINDOW = 4
+MAX_PASSES = 8
+
+ARC_WEIGHT = 4.0
+TEMPO_WEIGHT = 1.0
+KEY_WEIGHT = 0.5
+STEP_WEIGHT = 0.5
+# Tempo difference (in octaves, ~7%) at which the tempo cost saturates
+TEMPO_TOLERANCE = 0.1
+
+CAMELOT_RE = re.compile(r"^\s*(1[0-2]|[1-9])\s*([ABab])\s*$")
+
+
+class TrackFeatures(NamedTuple):
+    """Features of a catalog track; any of them may be unknown."""
+
+    bpm: float | None = None
+    energy: float | None = None
+    # Camelot wheel position: (number - 1) * 2 + (0 for A/minor, 1 for B/major)
+    key: int | None = None
+
+
+def camelot_key(record: dict) -> int | None:
+    """Camelot position of a catalog record's key, if it has one.
+
+    Accepts Camelot notation (``"key": "8A"``) or Spotify audio features
+    (``"key"`` pitch class 0-11 plus ``"mode"``, 1 = major).
+    """
+    key = record.get("key")
+    if isinstance(key, str):
+        match = CAMELOT_RE.match(key)
+        if match is None:
+            return None
+        return (int(match.group(1)) - 1) * 2 + (match.group(2).upper() == "B")
+    if isinstance(key, int) and 0 <= key <= 11 and record.get("mode") in (0, 1):
+        major = record["mode"] == 1
+        # C major is 8B, each fifth up is one step clockwise; minor keys sit
+        # next to their relative major (a minor third up)
+        number = (7 * (key if major else key + 3) + 7) % 12 + 1
+        return (number - 1) * 2 + major
+    return None
+
+
+def detect_arc(text: str) -> str | None:
+    """Energy arc asked for in a request ("build", "wind_down", "peak"), if any."""
+    text = text.lower()
+    for arc, pattern in ARC_PATTERNS.items():
+        if pattern.search(text):
+            return arc
+    return None
+
+
+def arc_targets(arc: str, length: int) -> list[float]:
+    """Target energy of each position of a ``length``-track playlist."""
+    positions = [i / (length - 1) if length > 1 else 1.0 for i in range(length)]
+    start, end = ARC_ENDPOINTS[arc]
+    if arc == "peak":
+        return [
+            start + (PEAK_ENERGY - start) * x / PEAK_POSITION
+            if x <= PEAK_POSITION
+            else PEAK_ENERGY
+            + (end - PEAK_ENERGY) * (x - PEAK_POSITION) / (1 - PEAK_POSITION)
+            for x in positions
+        ]
+    return [start + (end - start) * x for x in positions]
+
+
+def _tempo_cost(a: float | None, b: float | None) -> float:
+    if not a or not b:
+        return 0.0
+    octaves = abs(math.log2(a / b)) % 1.0
+    return min(1.0, min(octaves, 1.0 - octaves) / TEMPO_TOLERANCE)
+
+
+def _key_cost(a: int | None, b: int | None) -> float:
+    if a is None or b is None:
+        return 0.0
+    steps = abs(a // 2 - b // 2)
+    steps = min(steps, 12 - steps)
+    same_letter = a % 2 == b % 2
+    if steps == 0 and same_letter:
+        return 0.0
+    # One step around the wheel, or the relative major/minor
+    if (steps == 1 and same_letter) or steps == 0:
+        return 0.3
+    return 1.0
+
+
+def transition_cost(a: TrackFeatures, b: TrackFeatures) -> float:
+    """Cost of playing ``b`` right after ``a``."""
+    step = (
+        abs(a.energy - b.energy)
+        if a.energy is not None and b.energy is not None
+        else 0.0
+    )
+    return (
+        TEMPO_WEIGHT * _tempo_cost(a.bpm, b.bpm)
+        + KEY_WEIGHT * _key_cost(a.key, b.key)
+        + STEP_WEIGHT * step
+    )
+
+
+class _Costs:
+    def __init__(
+        self, features: Sequence[TrackFeatures], targets: Sequence[float]
+    ) -> None:
+        self.features = features
+        self.targets = targets
+        self._transitions: dict[tuple[int, int], float] = {}
+
+    def position(self, track: int, position: int) -> float:
+        energy = self.features[track].energy
+        return (
+            0.0
+            if energy is None
+            else ARC_WEIGHT * (energy - self.targets[position]) ** 2
+        )
+
+    def transition(self, a: int, b: int) -> float:
+        cost = self._transitions.get((a, b))
+        if cost is None:
+            cost = self._transitions[a, b] = transition_cost(
+                self.features[a], self.features[b]
+            )
+        return cost
+
+    def total(self, order: Sequence[int]) -> float:
+        return sum(self.position(t, i) for i, t in enumerate(order)) + sum(
+            self.transition(a, b) for a, b in zip(order, order[1:])
+        )
+
+
+def _exact(costs: _Costs, n: int) -> list[int]:
+    """Held-Karp over (placed subset, last track); position = subset size - 1."""
+    best: dict[tuple[int, int], tuple[float, int]] = {
+        (1 << t, t): (costs.position(t, 0), -1) for t in range(n)
+    }
+    for mask in range(1, 1 << n):
+        position = bin(mask).count("1")
+        if position == n:
+            continue
+        for last in range(n):
+            entry = best.get((mask, last))
+            if entry is None:
+                continue
+            for nxt in range(n):
+                if mask & (1 << nxt):
+                    continue
+                cost = (
+                    entry[0]
+                    + costs.transition(last, nxt)
+                    + costs.position(nxt, position)
+                )
+                key = (mask | (1 << nxt), nxt)
+                if key not in best or cost < best[key][0]:
+                    best[key] = (cost, last)
+
+    full = (1 << n) - 1
+    last = min(range(n), key=lambda t: best[full, t][0])
+    order, mask = [], full
+    while last != -1:
+        order.append(last)
+        last, mask = best[mask, last][1], mask & ~(1 << last)
+    return order[::-1]
+
+
+def _heuristic(costs: _Costs, n: int) -> list[int]:
+    # Energies sorted onto targets sorted (optimal for the arc cost alone);
+    # tracks without an energy take the positions left over, in their order
+    features = costs.features
+    known = sorted(
+        (t for t in range(n) if features[t].energy is not None),
+        key=lambda t: features[t].energy,
+    )
+    slots = sorted(range(n), key=lambda p: costs.targets[p])
+    order: list[int] = [-1] * n
+    for slot, track in zip(slots, known):
+        order[slot] = track
+    unknown = iter(t for t in range(n) if features[t].energy is None)
+    order = [t if t != -1 else next(unknown) for t in order]
+
+    position, transition = costs.position, costs.transition
+
+    def edges(i: int, j: int) -> float:
+        # Transitions touching positions i < j
+        cost = transition(order[i - 1], order[i]) if i > 0 else 0.0
+        cost += transition(order[i], order[i + 1])
+        if j > i + 1:
+            cost += transition(order[j - 1], order[j])
+        if j < n - 1:
+            cost += transition(order[j], order[j + 1])
+        return cost
+
+    for _ in range(MAX_PASSES):
+        improved = False
+        for i in range(n - 1):
+            for j in range(i + 1, min(n, i + SWAP_WINDOW + 1)):
+                a, b = order[i], order[j]
+                before = position(a, i) + position(b, j) + edges(i, j)
+                order[i], order[j] = b, a
+                if position(b, i) + position(a, j) + edges(i, j) < before - 1e-9:
+                    improved = True
+                else:
+                    order[i], order[j] = a, b
+        if not improved:
+            break
+    return order
+
+
+def sequence(features: Sequence[TrackFeatures | None], arc: str) -> list[int]:
+    """Order (indices into ``features``) that best follows ``arc``."""
+    n = len(features)
+    if n < 2:
+        return list(range(n))
+    costs = _Costs([f or TrackFeatures() for f in features], arc_targets(arc, n))
+    return _exact(costs, n) if n <= EXACT_MAX_TRACKS else _heuristic(costs, n)
@@ -0,0 +1,181 @@
+"""Speculative playlist proposals - generate during clarify, reuse on confirmation.
+
+A clarify turn for a near-miss playlist request is usually answered with a
+confirmation, after which generate_playlist pays the full proposal latency.
+``ProposalSpeculator`` holds one proposal per conversation thread, generated
+on the background loop while the clarifying question is shown. The next
+generate_playlist takes it if the new classification's signals add nothing
+the speculation didn't already know; otherwise it is discarded. A turn that
+routes anywhere but generate_playlist discards it too (graph.decide_action),
+so a later playlist request never gets a proposal from an older exchange.
+
+Metrics:
+    speculative_playlist_total{outcome}       started, hit, miss, failed, replaced, expired, discarded
+    speculative_playlist_wasted_tokens_total  approximate tokens of discarded proposals
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Coroutine
+
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from agent.background import background
+from agent.metrics import metrics
+
+SPECULATION_TTL_SECONDS = 15 * 60
+
+
+def signal_values(signals: Any, prefix: str = "") -> set[str]:
+    """Flatten classification signals into a set of "key:value" strings."""
+    if isinstance(signals, dict):
+        return {
+            v
+            for key, value in signals.items()
+            for v in signal_values(value, f"{prefix}{key}:".lower())
+        }
+    if isinstance(signals, (list, tuple, set)):
+        return {v for value in signals for v in signal_values(value, prefix)}
+    if signals is None or signals == "":
+        return set()
+    return {f"{prefix}{str(signals).strip().lower()}"}
+
+
+def signals_match(speculated: dict, current: dict) -> bool:
+    """Return True if ``current`` adds no signal that ``speculated`` was generated without."""
+    return signal_values(current) <= signal_values(speculated)
+
+
+@dataclass
+class _Speculation:
+    signals: dict
+    started: float
+    # Set on the background loop once the prompt is built
+    prompt_tokens: int = 0
+    future: concurrent.futures.Future = field(init=False)
+
+
+class ProposalSpeculator:
+    """At most one speculative proposal per conversation thread."""
+
+    def __init__(self, ttl_seconds: float = SPECULATION_TTL_SECONDS) -> None:
+        """Create a speculator; unclaimed proposals are dropped after ``ttl_seconds``."""
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._pending: dict[str, _Speculation] = {}
+
+    def start(
+        self,
+        thread_id: str | None,
+        signals: dict,
+        prompt: Coroutine[Any, Any, list[BaseMessage]],
+        generate: Callable[[list[BaseMessage]], Awaitable[dict]],
+    ) -> None:
+        """Build ``prompt`` and run ``generate`` on it on the background loop.
+
+        Both run off the caller's turn, so prompt work such as retrieval adds
+        nothing to it.
+        """
+        if thread_id is None:
+            prompt.close()
+            return
+        now = time.monotonic()
+        speculation = _Speculation(signals, now)
+        speculation.future = background.submit(
+            self._generate(speculation, prompt, generate)
+        )
+        with self._lock:
+            expired = self._expire(now)
+            replaced = self._pending.pop(thread_id, None)
+            self._pending[thread_id] = speculation
+        for entry in expired:
+            self._discard(entry, "expired")
+        if replaced is not None:
+            self._discard(replaced, "replaced")
+        metrics.incr("speculative_playlist_total", outcome="started")
+
+    @staticmethod
+    async def _generate(
+        speculation: _Speculation,
+        prompt: Coroutine[Any, Any, list[BaseMessage]],
+        generate: Callable[[list[BaseMessage]], Awaitable[dict]],
+    ) -> dict:
+        messages = await prompt
+        speculation.prompt_tokens = count_tokens_approximately(messages)
+        return await generate(messages)
+
+    def _pop(self, thread_id: str | None, signals: dict) -> _Speculation | None:
+        if thread_id is None:
+            return None
+        with self._lock:
+            entry = self._pending.pop(thread_id, None)
+        if entry is None:
+            return None
+        if not signals_match(entry.signals, signals):
+            self._discard(entry, "miss")
+            return None
+        return entry
+
+    def take(self, thread_id: str | None, signals: dict) -> dict | None:
+        """Return the thread's speculative proposal if it fits ``signals``, waiting if still running."""
+        entry = self._pop(thread_id, signals)
+        if entry is None:
+            return None
+        try:
+            proposal = entry.future.result()
+        except (Exception, concurrent.futures.CancelledError):
+            metrics.incr("speculative_playlist_total", outcome="failed")
+            return None
+        metrics.incr("speculative_playlist_total", outcome="hit")
+        return proposal
+
+    async def atake(self, thread_id: str | None, signals: dict) -> dict | None:
+        """Async variant of ``take``."""
+        entry = self._pop(thread_id, signals)
+        if entry is None:
+            return None
+        try:
+            proposal = await asyncio.wrap_future(entry.future)
+        except (Exception, asyncio.CancelledError):
+            metrics.incr("speculative_playlist_total", outcome="failed")
+            return None
+        metrics.incr("speculative_playlist_total", outcome="hit")
+        return proposal
+
+    def discard(self, thread_id: str | None) -> None:
+        """Drop (and cancel) the thread's speculation, e.g. once its conversation is over."""
+        if thread_id is None:
+            return
+        with self._lock:
+            entry = self._pending.pop(thread_id, None)
+        if entry is not None:
+            self._discard(entry, "discarded")
+
+    def _discard(self, entry: _Speculation, outcome: str) -> None:
+        future = entry.future
+        if future.done() and not future.cancelled() and future.exception() is None:
+            # Finished unused - prompt and output were both paid for
+            output = AIMessage(content=json.dumps(future.result()))
+            wasted = entry.prompt_tokens + count_tokens_approximately([output])
+        else:
+            future.cancel()
+            wasted = entry.prompt_tokens
+        metrics.incr("speculative_playlist_total", outcome=outcome)
+        metrics.incr("speculative_playlist_wasted_tokens_total", wasted)
+
+    def _expire(self, now: float) -> list[_Speculation]:
+        # Threads that never came back; caller holds the lock
+        expired = [
+            t
+            for t, entry in self._pending.items()
+            if now - entry.started > self.ttl_seconds
+        ]
+        return [self._pending.pop(t) for t in expired]
+
+
+proposal_speculator = ProposalSpeculator()
@@ -0,0 +1,586 @@
+"""Spotify integration - resolve proposed tracks and create playlists.
+
+``SpotifyClient`` resolves tracks concurrently over a pooled async HTTP client
+(httpx), bounded by a semaphore and a token bucket shared by every graph run
+in the process. A 429 pauses every request until its ``Retry-After`` has
+passed, then retries. The client is configured from the environment by
+``SpotifyClient.from_env()``:
+    SPOTIFY_CLIENT_ID / SPOTIFY_CLIENT_SECRET   client-credentials auth
+    SPOTIFY_REFRESH_TOKEN                       user auth, needed to create playlists
+    SPOTIFY_API_URL / SPOTIFY_TOKEN_URL         override endpoints (e.g. a fake server)
+    SPOTIFY_MAX_CONCURRENCY                     concurrent requests (default 8)
+    SPOTIFY_RATE_LIMIT                          requests per second (default 10)
+Without credentials, URIs and playlists are simulated so the graph still runs
+offline.
+Resolved URIs are cached by ``agent.track_cache`` (see DJ_TRACK_CACHE_*), so
+only tracks never seen before reach the API.
+``agent.benchmarks.fake_spotify`` provides a local server for tests.
+
+``TrackPrefetcher`` starts searching as soon as a playlist is proposed, while
+the graph waits for the user at the confirm_playlist interrupt, so resuming
+after "yes" finds the URIs ready. Prefetches are kept per thread in this
+process; a resume handled by another worker simply searches again. For
+streamed proposals, ``TrackStream`` starts each track's search as soon as the
+track is parsed, so generation and search overlap.
+
+``create_playlist`` adds tracks in chunks of 100 (the API maximum), each sent
+as soon as the previous one is acknowledged so the playlist keeps its order.
+The created playlist is recorded in a ``PlaylistLedger`` under an idempotency
+key, so a retried resume continues the same playlist (from the tracks Spotify
+already has) instead of creating a duplicate. DJ_PLAYLIST_LEDGER_DB shares
+the ledger across worker processes.
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Any, Optional, Sequence
+
+import httpx
+
+from agent.background import background
+from agent.cache import MISSING, LRUCache, SQLiteStore
+from agent.metrics import metrics
+from agent.track_cache import TrackCache
+
+SPOTIFY_API_URL = "https://api.spotify.com/v1"
+SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_RATE_LIMIT = 10.0
+PLAYLIST_CHUNK_SIZE = 100
+PLAYLIST_LEDGER_TTL_SECONDS = 7 * 24 * 60 * 60
+PREFETCH_TTL_SECONDS = 15 * 60
+SIMULATED_PLAYLIST_URL = "https://open.spotify.com/playlist/simulated123"
+
+
+class SpotifyError(Exception):
+    """A Spotify request failed after retries."""
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` requests per second with bursts up to ``capacity``."""
+
+    def __init__(
+        self, rate: float, capacity: float | None = None, clock=time.monotonic
+    ) -> None:
+        """Start full, refilling ``rate`` tokens per second up to ``capacity``."""
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        while True:
+            now = self.clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class SpotifyClient:
+    """Async Spotify Web API client with a shared connection pool.
+
+    Must be used from a single event loop (in the graph: the background loop).
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        api_url: str = SPOTIFY_API_URL,
+        token_url: str = SPOTIFY_TOKEN_URL,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        rate_limit: float | None = DEFAULT_RATE_LIMIT,
+        refresh_token: str | None = None,
+        max_retries: int = 4,
+        max_retry_after: float = 30.0,
+        timeout: float = 10.0,
+    ) -> None:
+        """Create a client; requests share one connection pool and rate limiter."""
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_url = api_url.rstrip("/")
+        self.token_url = token_url
+        self.max_concurrency = max_concurrency
+        self.refresh_token = refresh_token
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self._http = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_limit) if rate_limit else None
+        self._user_id: str | None = None
+        self._token: str | None = None
+        self._token_expires = 0.0
+        self._token_lock = asyncio.Lock()
+        self._blocked_until = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["SpotifyClient"]:
+        """Client from SPOTIFY_* variables, or None without credentials."""
+        client_id = os.getenv("SPOTIFY_CLIENT_ID")
+        client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
+        if not client_id or not client_secret:
+            return None
+        return cls(
+            client_id,
+            client_secret,
+            api_url=os.getenv("SPOTIFY_API_URL") or SPOTIFY_API_URL,
+            token_url=os.getenv("SPOTIFY_TOKEN_URL") or SPOTIFY_TOKEN_URL,
+            max_concurrency=int(
+                os.getenv("SPOTIFY_MAX_CONCURRENCY") or DEFAULT_MAX_CONCURRENCY
+            ),
+            rate_limit=float(os.getenv("SPOTIFY_RATE_LIMIT") or DEFAULT_RATE_LIMIT),
+            refresh_token=os.getenv("SPOTIFY_REFRESH_TOKEN") or None,
+        )
+
+    async def _access_token(self, refresh: bool = False) -> str:
+        async with self._token_lock:
+            if (
+                refresh
+                or self._token is None
+                or time.monotonic() >= self._token_expires
+            ):
+                if self.refresh_token:
+                    data = {
+                        "grant_type": "refresh_token",
+                        "refresh_token": self.refresh_token,
+                    }
+                else:
+                    data = {"grant_type": "client_credentials"}
+                response = await self._send(
+                    "POST",
+                    self.token_url,
+                    data=data,
+                    auth=(self.client_id, self.client_secret),
+                )
+                body = response.json()
+                self._token = body["access_token"]
+                # Refresh a minute early so in-flight requests never carry a stale token
+                self._token_expires = (
+                    time.monotonic() + body.get("expires_in", 3600) - 60
+                )
+            return self._token
+
+    async def _send(
+        self, method: str, url: str, idempotent: bool = True, **kwargs: Any
+    ) -> httpx.Response:
+        """Send with retries on 429 (honoring Retry-After) and, if ``idempotent``, errors.
+
+        A 429 means the request was rejected, so it is always safe to retry;
+        a timeout or 5xx on a playlist mutation may have been applied.
+        """
+        for attempt in range(self.max_retries + 1):
+            wait = self._blocked_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if self._bucket is not None:
+                await self._bucket.acquire()
+            try:
+                response = await self._http.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if not idempotent or attempt == self.max_retries:
+                    raise SpotifyError(f"{method} {url} failed: {e}") from e
+                await asyncio.sleep(0.5 * 2**attempt)
+                continue
+
+            if response.status_code == 429:
+                metrics.incr("spotify_rate_limited_total")
+                retry_after = min(
+                    float(response.headers.get("Retry-After") or 1),
+                    self.max_retry_after,
+                )
+                # Pause every request on this client, not just this one
+                self._blocked_until = max(
+                    self._blocked_until, time.monotonic() + retry_after
+                )
+            elif response.status_code >= 500 and idempotent:
+                await asyncio.sleep(0.5 * 2**attempt)
+            else:
+                return response
+
+        raise SpotifyError(
+            f"{method} {url} failed after {self.max_retries} retries: {response.status_code}"
+        )
+
+    async def request(
+        self, method: str, path: str, idempotent: bool = True, **kwargs: Any
+    ) -> httpx.Response:
+        """Make an authenticated API request, refreshing the token once on a 401."""
+        url = f"{self.api_url}/{path.lstrip('/')}"
+        async with self._semaphore:
+            for refresh in (False, True):
+                headers = {
+                    "Authorization": f"Bearer {await self._access_token(refresh)}"
+                }
+                response = await self._send(
+                    method, url, idempotent, headers=headers, **kwargs
+                )
+                if response.status_code != 401:
+                    break
+        if response.is_error:
+            raise SpotifyError(f"{method} {path} returned {response.status_code}")
+        return response
+
+    async def search_track(self, track: dict) -> str | None:
+        """URI of the best match for an artist/title pair, or None."""
+        query = f'track:"{track["title"]}" artist:"{track["artist"]}"'
+        response = await self.request(
+            "GET", "search", params={"q": query, "type": "track", "limit": 1}
+        )
+        items = response.json().get("tracks", {}).get("items", [])
+        metrics.incr("spotify_search_total", outcome="found" if items else "not_found")
+        return items[0]["uri"] if items else None
+
+    async def search_tracks(self, tracks: Sequence[dict]) -> list[dict]:
+        """Resolve all tracks concurrently, preserving order."""
+        uris = await asyncio.gather(*(self.search_track(t) for t in tracks))
+        return [{**track, "spotify_uri": uri} for track, uri in zip(tracks, uris)]
+
+    async def create_playlist(
+        self, name: str, description: str = "", public: bool = False
+    ) -> dict:
+        """Create an empty playlist for the authorized user, returning {id, url}."""
+        if self._user_id is None:
+            self._user_id = (await self.request("GET", "me")).json()["id"]
+        response = await self.request(
+            "POST",
+            f"users/{self._user_id}/playlists",
+            idempotent=False,
+            json={"name": name, "description": description, "public": public},
+        )
+        body = response.json()
+        return {"id": body["id"], "url": body["external_urls"]["spotify"]}
+
+    async def add_tracks(self, playlist_id: str, uris: Sequence[str]) -> None:
+        """Append up to PLAYLIST_CHUNK_SIZE tracks to a playlist."""
+        if len(uris) > PLAYLIST_CHUNK_SIZE:
+            raise ValueError(f"At most {PLAYLIST_CHUNK_SIZE} tracks per request")
+        await self.request(
+            "POST",
+            f"playlists/{playlist_id}/tracks",
+            idempotent=False,
+            json={"uris": list(uris)},
+        )
+
+    async def playlist_length(self, playlist_id: str) -> int:
+        """Return the number of tracks currently in a playlist."""
+        response = await self.request(
+            "GET",
+            f"playlists/{playlist_id}/tracks",
+            params={"fields": "total", "limit": 1},
+        )
+        return response.json()["total"]
+
+    async def aclose(self) -> None:
+        """Close the HTTP connection pool."""
+        await self._http.aclose()
+
+
+track_cache = TrackCache.from_env()
+
+_client: SpotifyClient | None = None
+_configured = False
+
+
+def configure(client: SpotifyClient | None) -> None:
+    """Use ``client`` for Spotify calls (None = simulated URIs and playlists)."""
+    global _client, _configured
+    _client, _configured = client, True
+
+
+def get_client() -> SpotifyClient | None:
+    """Return the configured client, created from the environment on first use."""
+    if not _configured:
+        configure(SpotifyClient.from_env())
+    return _client
+
+
+class PlaylistLedger:
+    """Progress of playlist creations, keyed by idempotency key.
+
+    Entries are {"id", "url"}. A per-key lock serializes concurrent resumes
+    within the process.
+    """
+
+    def __init__(
+        self,
+        db_path: str | None = None,
+        ttl_seconds: float = PLAYLIST_LEDGER_TTL_SECONDS,
+    ) -> None:
+        """Create the ledger; ``db_path`` makes it persistent."""
+        self.ttl_seconds = ttl_seconds
+        self._store: Any = (
+            SQLiteStore(db_path, table="playlists")
+            if db_path
+            else LRUCache(10_000, ttl_seconds)
+        )
+        self._locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+
+    @classmethod
+    def from_env(cls) -> "PlaylistLedger":
+        """Build the ledger from DJ_PLAYLIST_LEDGER_DB."""
+        return cls(db_path=os.getenv("DJ_PLAYLIST_LEDGER_DB") or None)
+
+    def lock(self, key: str | None) -> asyncio.Lock:
+        """Return the lock serializing playlist creation for ``key``."""
+        if key is None:
+            return asyncio.Lock()
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    def get(self, key: str | None) -> dict | None:
+        """Return the recorded playlist for ``key``, or None."""
+        if key is None:
+            return None
+        entry = self._store.get(key)
+        return None if entry is MISSING else entry
+
+    def put(self, key: str | None, entry: dict) -> None:
+        """Record the playlist created for ``key``."""
+        if key is not None:
+            self._store.set(key, entry, self.ttl_seconds)
+
+
+playlist_ledger = PlaylistLedger.from_env()
+
+
+def _simulated_uri(track: dict) -> str:
+    return f"spotify:track:{track['artist'][:3]}{track['title'][:3]}".lower().replace(
+        " ", ""
+    )
+
+
+async def search_tracks(tracks: Sequence[dict]) -> list[dict]:
+    """Resolve Spotify URIs for ``tracks`` (runs on the background loop)."""
+    client = get_client()
+    if client is None:
+        return [
+            {**track, "spotify_uri": track.get("spotify_uri") or _simulated_uri(track)}
+            for track in tracks
+        ]
+
+    # Tracks repaired from the local catalog may already carry their URI
+    uris = [
+        t.get("spotify_uri") or track_cache.get(t["artist"], t["title"]) for t in tracks
+    ]
+    missing = [t for t, uri in zip(tracks, uris) if uri is MISSING]
+    if missing:
+        found = iter(await client.search_tracks(missing))
+        for i, uri in enumerate(uris):
+            if uri is MISSING:
+                uris[i] = next(found)["spotify_uri"]
+                track_cache.put(tracks[i]["artist"], tracks[i]["title"], uris[i])
+    return [{**track, "spotify_uri": uri} for track, uri in zip(tracks, uris)]
+
+
+def resolve_tracks(tracks: Sequence[dict]) -> list[dict]:
+    """Blocking track resolution, for sync graph nodes."""
+    return background.run(search_tracks(tracks))
+
+
+async def aresolve_tracks(tracks: Sequence[dict]) -> list[dict]:
+    """Async track resolution, for async graph nodes."""
+    return await background.arun(search_tracks(tracks))
+
+
+def fingerprint(tracks: Sequence[dict]) -> str:
+    """Identify a proposal by its artist/title list."""
+    keys = [[t["artist"], t["title"]] for t in tracks]
+    return hashlib.sha256(json.dumps(keys).encode()).hexdigest()
+
+
+def idempotency_key(thread_id: str | None, tracks: Sequence[dict]) -> str | None:
+    """Key for creating this proposal's playlist in this conversation, if resumable."""
+    if thread_id is None:
+        return None
+    return hashlib.sha256(f"{thread_id}\x00{fingerprint(tracks)}".encode()).hexdigest()
+
+
+async def create_playlist(
+    name: str, uris: Sequence[str], key: str | None = None, description: str = ""
+) -> str:
+    """Create a playlist holding ``uris`` and return its URL (runs on the background loop).
+
+    With a ``key``, a retry finds the playlist in the ledger and only adds the
+    tracks it doesn't have yet.
+    """
+    client = get_client()
+    if client is None:
+        return SIMULATED_PLAYLIST_URL
+
+    async with playlist_ledger.lock(key):
+        entry = playlist_ledger.get(key)
+        if entry is None:
+            entry = await client.create_playlist(name, description)
+            playlist_ledger.put(key, entry)
+            metrics.incr("spotify_playlists_total", outcome="created")
+            added = 0
+        else:
+            # A chunk may have been applied even though its response was lost
+            added = await client.playlist_length(entry["id"])
+            metrics.incr("spotify_playlists_total", outcome="resumed")
+
+        for start in range(added, len(uris), PLAYLIST_CHUNK_SIZE):
+            await client.add_tracks(
+                entry["id"], uris[start : start + PLAYLIST_CHUNK_SIZE]
+            )
+        return entry["url"]
+
+
+def publish_playlist(
+    name: str, uris: Sequence[str], key: str | None = None, description: str = ""
+) -> str:
+    """Blocking playlist creation, for sync graph nodes."""
+    return background.run(create_playlist(name, uris, key, description))
+
+
+async def apublish_playlist(
+    name: str, uris: Sequence[str], key: str | None = None, description: str = ""
+) -> str:
+    """Async playlist creation, for async graph nodes."""
+    return await background.arun(create_playlist(name, uris, key, description))
+
+
+class TrackPrefetcher:
+    """One in-flight search per conversation thread, started ahead of confirmation."""
+
+    def __init__(self, ttl_seconds: float = PREFETCH_TTL_SECONDS) -> None:
+        """Create a prefetcher; unclaimed prefetches are dropped after ``ttl_seconds``."""
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._pending: dict[str, tuple[str, concurrent.futures.Future, float]] = {}
+
+    def start(
+        self,
+        thread_id: str | None,
+        tracks: Sequence[dict],
+        search: concurrent.futures.Future | None = None,
+    ) -> None:
+        """Begin resolving ``tracks`` in the background for ``thread_id``.
+
+        ``search`` is an already running resolution of exactly these tracks
+        (e.g. ``TrackStream.result()``) to use instead of starting one.
+        """
+        if thread_id is None or not tracks:
+            return
+        key = fingerprint(tracks)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            current = self._pending.get(thread_id)
+            if current is not None and current[0] == key and search is None:
+                return
+            if current is not None:
+                current[1].cancel()
+            if search is None:
+                search = background.submit(search_tracks(tracks))
+            self._pending[thread_id] = (key, search, now)
+        metrics.incr("track_prefetch_total", outcome="started")
+
+    def _pop(
+        self, thread_id: str | None, tracks: Sequence[dict]
+    ) -> concurrent.futures.Future | None:
+        if thread_id is None:
+            return None
+        with self._lock:
+            entry = self._pending.pop(thread_id, None)
+        if entry is None or entry[0] != fingerprint(tracks):
+            if entry is not None:
+                entry[1].cancel()
+            metrics.incr("track_prefetch_total", outcome="miss")
+            return None
+        return entry[1]
+
+    def take(self, thread_id: str | None, tracks: Sequence[dict]) -> list[dict] | None:
+        """Prefetched results for exactly these tracks, waiting if still running."""
+        future = self._pop(thread_id, tracks)
+        if future is None:
+            return None
+        try:
+            result = future.result()
+        except (Exception, concurrent.futures.CancelledError):
+            metrics.incr("track_prefetch_total", outcome="failed")
+            return None
+        metrics.incr("track_prefetch_total", outcome="hit")
+        return result
+
+    async def atake(
+        self, thread_id: str | None, tracks: Sequence[dict]
+    ) -> list[dict] | None:
+        """Async variant of ``take``."""
+        future = self._pop(thread_id, tracks)
+        if future is None:
+            return None
+        try:
+            result = await asyncio.wrap_future(future)
+        except (Exception, asyncio.CancelledError):
+            metrics.incr("track_prefetch_total", outcome="failed")
+            return None
+        metrics.incr("track_prefetch_total", outcome="hit")
+        return result
+
+    def discard(self, thread_id: str | None) -> None:
+        """Drop (and cancel) the prefetch for a declined proposal."""
+        if thread_id is None:
+            return
+        with self._lock:
+            entry = self._pending.pop(thread_id, None)
+        if entry is not None:
+            entry[1].cancel()
+            metrics.incr("track_prefetch_total", outcome="discarded")
+
+    def _expire(self, now: float) -> None:
+        # Threads that never resumed; caller holds the lock
+        for thread_id, (_, future, started) in list(self._pending.items()):
+            if now - started > self.ttl_seconds:
+                future.cancel()
+                del self._pending[thread_id]
+
+
+track_prefetcher = TrackPrefetcher()
+
+
+class TrackStream:
+    """Resolve tracks one at a time as a streamed proposal produces them."""
+
+    def __init__(self) -> None:
+        """Start with no tracks."""
+        self._searches: list[concurrent.futures.Future] = []
+
+    def add(self, track: dict) -> None:
+        """Start resolving ``track`` in the background."""
+        self._searches.append(background.submit(search_tracks([track])))
+
+    def result(self, order: Sequence[int] | None = None) -> concurrent.futures.Future:
+        """Future of every added track resolved, in the order added (or by index in ``order``)."""
+        searches = list(self._searches)
+        if order is not None:
+            searches = [searches[i] for i in order]
+
+        async def gather() -> list[dict]:
+            found = await asyncio.gather(*(asyncio.wrap_future(s) for s in searches))
+            return [track for batch in found for track in batch]
+
+        return background.submit(gather())
@@ -1,20 +1,23 @@
 #!/usr/bin/env python3
-"""
-Simple script to test the DJ Agent graph.
+"""Simple script to test the DJ Agent graph.
+
 Usage:
     python test_graph.py "Your message here"
     python test_graph.py  # Interactive mode
 """
 
-import sys
 import json
-from agent.graph import graph
+import sys
+import time
+
+from agent.graph import Context, graph
+from agent.instrumentation import latency_report, usage_report
 
 
 def format_output(result: dict) -> str:
     """Format the graph output for display."""
     output_lines = []
-    
+
     # Show response
     if "response" in result:
         output_lines.append("=" * 60)
@@ -22,7 +25,7 @@ def format_output(result: dict) -> str:
         output_lines.append("=" * 60)
         output_lines.append(result["response"])
         output_lines.append("")
-    
+
     # Show classification if available
     if "classification" in result:
         classification = result["classification"]
@@ -34,7 +37,7 @@ def format_output(result: dict) -> str:
         if classification.get("signals"):
             output_lines.append(f"Signals: {classification['signals']}")
         output_lines.append("")
-    
+
     # Show action if available
     if "action" in result:
         output_lines.append("=" * 60)
@@ -43,7 +46,7 @@ def format_output(result: dict) -> str:
         output_lines.append(f"Action: {result['action']}")
         output_lines.append(f"Reason: {result.get('action_reason', 'N/A')}")
         output_lines.append("")
-    
+
     # Show playlist if available
     if "proposed_tracks" in result and result["proposed_tracks"]:
         output_lines.append("=" * 60)
@@ -56,7 +59,7 @@ def format_output(result: dict) -> str:
             uri_str = f" ({uri})" if uri else ""
             output_lines.append(f"{i}. {artist} – {title}{uri_str}")
         output_lines.append("")
-    
+
     # Show response type
     if "response_type" in result:
         output_lines.append("=" * 60)
@@ -64,7 +67,7 @@ def format_output(result: dict) -> str:
         output_lines.append("=" * 60)
         output_lines.append(result["response_type"])
         output_lines.append("")
-    
+
     # Show full state (for debugging)
     if "--debug" in sys.argv or "-d" in sys.argv:
         output_lines.append("=" * 60)
@@ -72,12 +75,84 @@ def format_output(result: dict) -> str:
         output_lines.append("=" * 60)
         output_lines.append(json.dumps(result, indent=2, default=str))
         output_lines.append("")
-    
+
     return "\n".join(output_lines)
 
 
+def run_streaming(inputs: dict) -> tuple[dict, float | None, float]:
+    """Stream the graph, echoing reply tokens and proposed tracks as they arrive.
+
+    Returns the final state, time to first token or track (None if the route
+    streamed nothing) and total wall time.
+    """
+    result = {}
+    first_token_at = None
+    start = time.perf_counter()
+    context = Context(stream_playlist=True)
+
+    for mode, chunk in graph.stream(
+        inputs, stream_mode=["custom", "values"], context=context
+    ):
+        if mode == "custom" and ("token" in chunk or "track" in chunk):
+            if first_token_at is None:
+                first_token_at = time.perf_counter() - start
+            if "token" in chunk:
+                print(chunk["token"], end="", flush=True)
+            else:
+                track = chunk["track"]
+                print(
+                    f"{chunk['index'] + 1}. {track['artist']} – {track['title']}",
+                    flush=True,
+                )
+        elif mode == "values":
+            result = chunk
+
+    if first_token_at is not None:
+        print("\n")
+    return result, first_token_at, time.perf_counter() - start
+
+
+def format_timing(ttft: float | None, total: float) -> str:
+    """Format latency metrics for display."""
+    ttft_str = f"{ttft:.2f}s" if ttft is not None else "N/A (nothing streamed)"
+    return "\n".join(
+        [
+            "=" * 60,
+            "TIMING:",
+            "=" * 60,
+            f"Time to first token/track: {ttft_str}",
+            f"Total: {total:.2f}s",
+            "",
+        ]
+    )
+
+
+def format_usage() -> str:
+    """Format per-node token usage, including prompt tokens served from cache."""
+    lines = ["=" * 60, "TOKENS (prompt / cached / completion, est. cost):", "=" * 60]
+    for node, row in usage_report().items():
+        lines.append(
+            f"{node}: {row['prompt_tokens']:.0f} / {row['cached_prompt_tokens']:.0f}"
+            f" ({row['cached_ratio']:.0%}) / {row['completion_tokens']:.0f}, ${row['cost_usd']:.4f}"
+        )
+    lines.append("")
+    return "\n".join(lines)
+
+
+def format_latency() -> str:
+    """Format per-node wall time and the part of it spent in LLM calls."""
+    lines = ["=" * 60, "NODES (wall time / LLM time):", "=" * 60]
+    for node, row in latency_report().items():
+        if "runs" in row:
+            lines.append(
+                f"{node}: {row['mean'] * 1000:.0f} ms / {row['llm_seconds'] / row['runs'] * 1000:.0f} ms"
+            )
+    lines.append("")
+    return "\n".join(lines)
+
+
 def main():
-    """Main function to run the graph."""
+    """Run the graph."""
     # Get input from command line or prompt
     if len(sys.argv) > 1 and sys.argv[1] not in ["--debug", "-d"]:
         user_input = sys.argv[1]
@@ -86,34 +161,33 @@ def main():
         if not user_input:
             print("No input provided. Exiting.")
             return
-    
+
     # Prepare input for the graph
-    inputs = {
-        "messages": [
-            {"role": "human", "content": user_input}
-        ]
-    }
-    
+    inputs = {"messages": [{"role": "human", "content": user_input}]}
+
     print("\n" + "=" * 60)
     print("RUNNING GRAPH...")
     print("=" * 60)
     print(f"Input: {user_input}\n")
-    
+
     try:
-        # Invoke the graph
-        result = graph.invoke(inputs)
-        
+        # Stream the graph so reply tokens show up as they are generated
+        result, ttft, total = run_streaming(inputs)
+
         # Format and display output
         output = format_output(result)
         print(output)
-        
+        print(format_timing(ttft, total))
+        print(format_latency())
+        print(format_usage())
+
     except Exception as e:
         print(f"\n❌ Error running graph: {e}")
         import traceback
+
         traceback.print_exc()
         sys.exit(1)
 
 
 if __name__ == "__main__":
     main()
-
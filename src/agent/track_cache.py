@@ -0,0 +1,136 @@
+"""Track resolution cache - reuse artist/title -> Spotify URI lookups across sessions.
+
+Keys are the normalized artist and title (case, accents, punctuation and
+"feat." credits ignored), checked in an in-memory LRU and then, when a
+``db_path`` is configured, in a SQLite file shared across worker processes.
+Tracks Spotify couldn't find are cached too (as None) with a shorter TTL, so
+a hallucinated track isn't searched again on every proposal.
+
+Configured from the environment by ``TrackCache.from_env()``:
+    DJ_TRACK_CACHE_DB            SQLite path (unset = memory only)
+    DJ_TRACK_CACHE_TTL           TTL of found tracks in seconds (default 30 days)
+    DJ_TRACK_CACHE_NEGATIVE_TTL  TTL of not-found tracks in seconds (default 1 day)
+"""
+
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any
+
+from agent.cache import MISSING, LRUCache, SQLiteStore
+from agent.metrics import metrics
+
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+DEFAULT_NEGATIVE_TTL_SECONDS = 24 * 60 * 60
+
+FEATURING_RE = re.compile(r"\s*[(\[]?\b(?:feat|ft|featuring)\b\.?.*$")
+
+
+def normalize_name(text: str) -> str:
+    """Canonical form of an artist or title for matching."""
+    text = unicodedata.normalize("NFKD", text)
+    text = (
+        "".join(c for c in text if not unicodedata.combining(c))
+        .casefold()
+        .replace("&", " and ")
+    )
+    text = FEATURING_RE.sub("", text)
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+
+def track_key(artist: str, title: str) -> str:
+    """Cache key for an artist/title pair."""
+    return f"{normalize_name(artist)}\x00{normalize_name(title)}"
+
+
+class TrackCache:
+    """Memory + SQLite cache of Spotify URIs, including negative results."""
+
+    def __init__(
+        self,
+        max_entries: int = 50_000,
+        ttl_seconds: float | None = DEFAULT_TTL_SECONDS,
+        negative_ttl_seconds: float | None = DEFAULT_NEGATIVE_TTL_SECONDS,
+        db_path: str | None = None,
+    ) -> None:
+        """Create the cache; ``db_path`` adds a persistent tier under the in-memory one."""
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._memory = LRUCache(max_entries, ttl_seconds)
+        self._disk = SQLiteStore(db_path, table="track_uris") if db_path else None
+        self._lock = threading.Lock()
+        self._outcomes: Counter[str] = Counter()
+
+    @classmethod
+    def from_env(cls) -> "TrackCache":
+        """Build the cache from the DJ_TRACK_CACHE_* environment variables."""
+        ttl = os.getenv("DJ_TRACK_CACHE_TTL")
+        negative_ttl = os.getenv("DJ_TRACK_CACHE_NEGATIVE_TTL")
+        return cls(
+            ttl_seconds=float(ttl) if ttl else DEFAULT_TTL_SECONDS,
+            negative_ttl_seconds=float(negative_ttl)
+            if negative_ttl
+            else DEFAULT_NEGATIVE_TTL_SECONDS,
+            db_path=os.getenv("DJ_TRACK_CACHE_DB") or None,
+        )
+
+    def _record(self, outcome: str) -> None:
+        with self._lock:
+            self._outcomes[outcome] += 1
+        metrics.incr("track_cache_total", outcome=outcome)
+
+    def _ttl(self, uri: str | None) -> float | None:
+        return self.ttl_seconds if uri is not None else self.negative_ttl_seconds
+
+    def get(self, artist: str, title: str) -> Any:
+        """Return the cached URI (None = known not found), or MISSING on a miss."""
+        key = track_key(artist, title)
+
+        value = self._memory.get(key)
+        if value is not MISSING:
+            self._record("hit_memory")
+            return value
+
+        if self._disk is not None:
+            value, remaining = self._disk.get_with_ttl(key)
+            if value is not MISSING:
+                # Promoted entries expire with their disk row, not a fresh TTL
+                self._memory.set(
+                    key, value, remaining if remaining is not None else self._ttl(value)
+                )
+                self._record("hit_disk")
+                return value
+
+        self._record("miss")
+        return MISSING
+
+    def put(self, artist: str, title: str, uri: str | None) -> None:
+        """Cache the URI of a track (None when the search found nothing)."""
+        key = track_key(artist, title)
+        ttl = self._ttl(uri)
+        self._memory.set(key, uri, ttl)
+        if self._disk is not None:
+            self._disk.set(key, uri, ttl)
+
+    def stats(self) -> dict[str, Any]:
+        """Lookup counts and hit rate of this cache since it was created."""
+        with self._lock:
+            outcomes = dict(self._outcomes)
+        lookups = sum(outcomes.values())
+        hits = lookups - outcomes.get("miss", 0)
+        return {
+            "lookups": lookups,
+            "hit_memory": outcomes.get("hit_memory", 0),
+            "hit_disk": outcomes.get("hit_disk", 0),
+            "miss": outcomes.get("miss", 0),
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self._memory),
+        }
+
+    def clear(self) -> None:
+        """Drop the in-memory entries and stats (the SQLite file is left untouched)."""
+        self._memory.clear()
+        with self._lock:
+            self._outcomes.clear()
@@ -1,6 +1,48 @@
+import json
+from collections import Counter
+
 import pytest
 
+# Opening user messages of DJ conversations, by the intent they express.
+# The greetings are answered by the fast path, the playlist requests need
+# the (fake) classifier model.
+CONVERSATIONS = {
+    "greeting": [
+        "hey there!",
+        "good evening dj",
+        "hi, how are you doing today?",
+        "hello again",
+        "hiya",
+    ],
+    "request_playlist": [
+        "make me a dark techno playlist for a late night drive",
+        "put together some laid-back jazz for a sunday morning",
+    ],
+}
+
 
 @pytest.fixture(scope="session")
 def anyio_backend():
     return "asyncio"
+
+
+@pytest.fixture
+def make_dataset(tmp_path):
+    """Write a JSONL eval dataset with one conversation per expected intent."""
+
+    def make(intents) -> str:
+        path = tmp_path / "dataset.jsonl"
+        used: Counter[str] = Counter()
+        with open(path, "w") as f:
+            for intent in intents:
+                messages = CONVERSATIONS[intent]
+                content = messages[used[intent] % len(messages)]
+                used[intent] += 1
+                row = {
+                    "inputs": {"messages": [{"role": "human", "content": content}]},
+                    "outputs": {"expected_intent": intent},
+                }
+                f.write(json.dumps(row) + "\n")
+        return str(path)
+
+    return make
@@ -0,0 +1,92 @@
+import json
+from itertools import cycle
+
+import pytest
+
+from agent.adaptive_evaluation import AdaptiveRepetitions, half_width
+from agent.benchmarks.fake_llm import FakeChatModel, patched_llm
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "dataset.jsonl"
+    with open(path, "w") as f:
+        for name in ("steady", "steady too", "noisy"):
+            f.write(
+                json.dumps(
+                    {
+                        "id": name,
+                        "inputs": {"messages": [{"role": "human", "content": name}]},
+                    }
+                )
+                + "\n"
+            )
+    return str(path)
+
+
+def _coin():
+    """Evaluator scoring "noisy" 0, 1, 0, 1, ... and everything else 1."""
+    flips = cycle([0.0, 1.0])
+
+    def coin(inputs, outputs):
+        noisy = inputs["messages"][0]["content"] == "noisy"
+        return {"key": "coin", "score": next(flips) if noisy else 1.0}
+
+    return coin
+
+
+def test_half_width() -> None:
+    assert half_width([1.0]) == float("inf")
+    assert half_width([1.0, 1.0, 1.0]) == 0.0
+    assert half_width([0.0, 1.0]) == pytest.approx(12.706 * 0.7071 / 1.4142, rel=1e-3)
+
+
+def test_repetitions_follow_variance(dataset) -> None:
+    scheduler = AdaptiveRepetitions(
+        [_coin()], target=0.1, min_repetitions=2, max_repetitions=6, concurrency=2
+    )
+    with patched_llm(FakeChatModel()):
+        rows = list(scheduler.evaluate_file(dataset))
+
+    assert scheduler.runs == {"steady": 2, "steady too": 2, "noisy": 6}
+    assert sorted(
+        row["repetition"] for row in rows if row["example_id"] == "noisy"
+    ) == list(range(6))
+
+    report = scheduler.report()
+    assert (report["runs"], report["fixed_runs"], report["saved_runs"]) == (10, 18, 8)
+    assert report["converged"] == 2
+    assert report["examples"]["steady"]["scores"]["coin"] == {
+        "n": 2,
+        "mean": 1.0,
+        "half_width": 0.0,
+    }
+    assert report["examples"]["noisy"]["scores"]["coin"]["half_width"] > 0.1
+    assert (
+        report["half_widths"]["coin"]["max"]
+        == report["examples"]["noisy"]["scores"]["coin"]["half_width"]
+    )
+
+
+def test_budget_goes_to_the_widest_intervals(dataset) -> None:
+    scheduler = AdaptiveRepetitions(
+        [_coin()], min_repetitions=2, max_repetitions=6, budget=8, concurrency=2
+    )
+    with patched_llm(FakeChatModel()):
+        rows = list(scheduler.evaluate_file(dataset))
+
+    assert len(rows) == 8
+    assert scheduler.runs == {"steady": 2, "steady too": 2, "noisy": 4}
+
+    # Too small for the first round: examples are served in dataset order
+    scheduler = AdaptiveRepetitions(
+        [_coin()], min_repetitions=2, budget=3, concurrency=2
+    )
+    with patched_llm(FakeChatModel()):
+        list(scheduler.evaluate_file(dataset))
+    assert scheduler.runs == {"steady": 2, "steady too": 1}
+    assert scheduler.report()["examples"]["noisy"] == {
+        "runs": 0,
+        "converged": False,
+        "scores": {},
+    }
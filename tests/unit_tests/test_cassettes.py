@@ -0,0 +1,105 @@
+import pytest
+from openai.types.chat import ChatCompletion
+
+from agent.benchmarks.fake_llm import FakeChatModel
+from agent.cassettes import Cassette, CassetteMiss, chat_completion
+from agent.metrics import metrics
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    metrics.reset()
+
+
+def _completion(content: str) -> ChatCompletion:
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-4o-mini",
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+            ],
+        }
+    )
+
+
+class _Client:
+    def __init__(self, content: str) -> None:
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+        self.content = content
+
+    def create(self, **request) -> ChatCompletion:
+        self.calls += 1
+        return _completion(self.content)
+
+
+def test_chat_model_replays_recorded_responses(tmp_path) -> None:
+    path = tmp_path / "cassette.db"
+    model = FakeChatModel(cache=Cassette(path))
+    assert model.invoke("hi").content == model.response
+
+    model.response = "something else entirely"
+    assert model.invoke("hi").content != model.response
+    assert model.invoke("a new prompt").content == model.response
+    assert metrics.counter("cassette_total", kind="chat_model", outcome="hit") == 1
+    assert metrics.counter("cassette_total", kind="chat_model", outcome="recorded") == 2
+
+    # Structured calls are keyed on their bound schema too
+    schema = dict(title="ChatClassification")
+    assert model.with_structured_output(schema).invoke("hi")["intent"] == "greeting"
+    replayed = FakeChatModel(cache=Cassette(path, "strict"))
+    replayed.structured_outputs["ChatClassification"] = {"intent": "explore"}
+    assert replayed.with_structured_output(schema).invoke("hi")["intent"] == "greeting"
+
+    with pytest.raises(CassetteMiss):
+        FakeChatModel(cache=Cassette(path, "strict")).invoke("never recorded")
+
+
+def test_record_mode_overwrites(tmp_path) -> None:
+    path = tmp_path / "cassette.db"
+    FakeChatModel(response="first", cache=Cassette(path)).invoke("hi")
+    assert (
+        FakeChatModel(response="second", cache=Cassette(path, "record"))
+        .invoke("hi")
+        .content
+        == "second"
+    )
+    assert (
+        FakeChatModel(response="third", cache=Cassette(path, "strict"))
+        .invoke("hi")
+        .content
+        == "second"
+    )
+
+
+def test_chat_completion_replays_without_a_client(tmp_path) -> None:
+    cassette = Cassette(tmp_path / "cassette.db")
+    client = _Client('{"score": 0.8}')
+    request = {
+        "model": "gpt-4o-mini",
+        "messages": [{"role": "user", "content": "judge"}],
+        "temperature": 0,
+    }
+
+    first = chat_completion(lambda: client, cassette, **request)
+    replayed = chat_completion(
+        lambda: pytest.fail("client created on replay"), cassette, **request
+    )
+    assert (
+        replayed.choices[0].message.content
+        == first.choices[0].message.content
+        == '{"score": 0.8}'
+    )
+    assert client.calls == 1
+
+    strict = Cassette(tmp_path / "cassette.db", "strict")
+    with pytest.raises(CassetteMiss):
+        chat_completion(lambda: client, strict, **{**request, "temperature": 1})
@@ -0,0 +1,110 @@
+import importlib
+import json
+
+from agent.benchmarks.fake_llm import FakeChatModel, patched_llm
+from agent.catalog import TrackCatalog
+from agent.graph import Context, graph
+from agent.metrics import metrics
+
+graph_module = importlib.import_module("agent.graph")
+
+RECORDS = [
+    {
+        "artist": "Daft Punk",
+        "title": "One More Time",
+        "spotify_uri": "spotify:track:omt",
+    },
+    {"artist": "Daft Punk", "title": "Digital Love", "spotify_uri": "spotify:track:dl"},
+    {"artist": "Four Tet", "title": "Baby", "spotify_uri": "spotify:track:baby"},
+    {"artist": "Bonobo", "title": "Kerala", "spotify_uri": None},
+]
+
+
+def test_exact_repaired_and_rejected() -> None:
+    catalog = TrackCatalog(RECORDS)
+    assert catalog.check({"artist": "daft punk", "title": "One More Time!"}) == (
+        "exact",
+        RECORDS[0],
+    )
+    assert catalog.check({"artist": "Daft Punk", "title": "Digtal Love"}) == (
+        "repaired",
+        RECORDS[1],
+    )
+    assert catalog.check({"artist": "Daf Punk", "title": "Digital Love"}) == (
+        "repaired",
+        RECORDS[1],
+    )
+    assert catalog.check({"artist": "Four Tet", "title": "Bab"})[1] == RECORDS[2]
+    assert catalog.check({"artist": "Daft Punk", "title": "Harder Better Faster"}) == (
+        "rejected",
+        None,
+    )
+    assert catalog.check({"artist": "Made Up Band", "title": "One More Time"}) == (
+        "rejected",
+        None,
+    )
+
+
+def test_unknown_genre_keeps_the_proposal(tmp_path) -> None:
+    path = tmp_path / "catalog.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in RECORDS))
+    catalog = TrackCatalog.load(str(path))
+    assert len(catalog) == 4
+    proposal = [{"artist": "Polka Kings", "title": "Oompah", "spotify_uri": None}]
+    assert catalog.validate(proposal) == proposal
+
+
+def test_generated_playlist_is_validated(monkeypatch) -> None:
+    monkeypatch.setattr(graph_module, "get_catalog", lambda: TrackCatalog(RECORDS))
+    model = FakeChatModel()
+    model.structured_outputs["ChatClassification"] = {
+        "intent": "request_playlist",
+        "confidence": 0.95,
+        "signals": {},
+    }
+    model.structured_outputs["PlaylistProposal"]["tracks"] = [
+        {"artist": "Daft Punk", "title": "One Mor Time", "spotify_uri": None},
+        {"artist": "Daft Punk", "title": "Hallucinated Anthem", "spotify_uri": None},
+        {"artist": "Bonobo", "title": "Kerala", "spotify_uri": None},
+    ]
+    inputs = {
+        "messages": [{"role": "human", "content": "make me a french house playlist"}]
+    }
+
+    with patched_llm(model):
+        for stream in (False, True):
+            context = Context(
+                classifier_model=None,
+                classification_cache=False,
+                stream_playlist=stream,
+            )
+            result = graph.invoke(inputs, context=context)
+            assert result["proposed_tracks"] == [RECORDS[0], RECORDS[3]]
+
+
+def test_uncovered_proposal_is_counted_alike_when_streamed(monkeypatch) -> None:
+    monkeypatch.setattr(graph_module, "get_catalog", lambda: TrackCatalog(RECORDS))
+    model = FakeChatModel()
+    model.structured_outputs["ChatClassification"] = {
+        "intent": "request_playlist",
+        "confidence": 0.95,
+        "signals": {},
+    }
+    polka = [
+        {"artist": "Polka Kings", "title": "Oompah", "spotify_uri": None},
+        {"artist": "Polka Kings", "title": "Accordion Dawn", "spotify_uri": None},
+    ]
+    model.structured_outputs["PlaylistProposal"]["tracks"] = polka
+    inputs = {"messages": [{"role": "human", "content": "make me a polka playlist"}]}
+
+    with patched_llm(model):
+        for stream in (False, True):
+            metrics.reset()
+            context = Context(
+                classifier_model=None,
+                classification_cache=False,
+                stream_playlist=stream,
+            )
+            assert graph.invoke(inputs, context=context)["proposed_tracks"] == polka
+            assert metrics.counter("catalog_validation_total", outcome="uncovered") == 2
+            assert metrics.counter("catalog_validation_total", outcome="rejected") == 0
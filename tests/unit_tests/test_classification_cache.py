@@ -0,0 +1,92 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from agent.classification_cache import ClassificationCache
+
+CLASSIFICATION = {"intent": "request_playlist", "confidence": 0.9, "signals": {}}
+
+
+def test_exact_hit_ignores_case_and_punctuation() -> None:
+    cache = ClassificationCache()
+    cache.put([HumanMessage(content="Make me a workout playlist")], CLASSIFICATION)
+    assert (
+        cache.get([HumanMessage(content="make me a workout playlist!")])
+        == CLASSIFICATION
+    )
+    assert (
+        cache.get([HumanMessage(content="make me a workout playlist")], namespace="v2")
+        is None
+    )
+
+
+def test_window_includes_previous_turns() -> None:
+    cache = ClassificationCache()
+    cache.put(
+        [
+            AIMessage(content="Want me to build a playlist?"),
+            HumanMessage(content="yes"),
+        ],
+        CLASSIFICATION,
+    )
+    assert (
+        cache.get([AIMessage(content="What's up?"), HumanMessage(content="yes")])
+        is None
+    )
+
+
+def test_ttl_expiry() -> None:
+    cache = ClassificationCache(ttl_seconds=0)
+    cache.put([HumanMessage(content="make me a workout playlist")], CLASSIFICATION)
+    assert cache.get([HumanMessage(content="make me a workout playlist")]) is None
+
+
+def test_sqlite_backend_is_shared(tmp_path) -> None:
+    db = str(tmp_path / "classifications.sqlite")
+    ClassificationCache(db_path=db).put(
+        [HumanMessage(content="make me a workout playlist")], CLASSIFICATION
+    )
+    assert (
+        ClassificationCache(db_path=db).get(
+            [HumanMessage(content="make me a workout playlist")]
+        )
+        == CLASSIFICATION
+    )
+
+
+def test_near_duplicate_lookup() -> None:
+    cache = ClassificationCache(near_duplicate_threshold=0.7)
+    cache.put(
+        [HumanMessage(content="can you make me a workout playlist for the gym")],
+        CLASSIFICATION,
+    )
+    assert (
+        cache.get(
+            [
+                HumanMessage(
+                    content="can you make me a workout playlist for the gym please"
+                )
+            ]
+        )
+        == CLASSIFICATION
+    )
+    assert (
+        cache.get([HumanMessage(content="who produced the last burial album")]) is None
+    )
+
+
+def test_earlier_context_scopes_the_entry() -> None:
+    cache = ClassificationCache(window=1)
+    latest = [HumanMessage(content="yes")]
+    jazz = [
+        SystemMessage(content="Summary: user likes jazz"),
+        AIMessage(content="Jazz set?"),
+        *latest,
+    ]
+    metal = [
+        SystemMessage(content="Summary: user likes metal"),
+        AIMessage(content="Jazz set?"),
+        *latest,
+    ]
+    cache.put(latest, CLASSIFICATION, history=jazz)
+    assert cache.get(latest, history=jazz) == CLASSIFICATION
+    assert cache.get(latest, history=metal) is None
+    assert cache.get(latest) is None
@@ -1,3 +1,7 @@
+import importlib
+import subprocess
+import sys
+
 from langgraph.pregel import Pregel
 
 from agent.graph import graph
@@ -7,3 +11,23 @@ def test_placeholder() -> None:
     # TODO: You can add actual unit tests
     # for your graph and other logic here.
     assert isinstance(graph, Pregel)
+
+
+def test_import_does_not_load_provider_sdks() -> None:
+    # Fresh interpreter - this one may have imported them already
+    probe = (
+        "import sys, agent.graph, agent.evaluators;"
+        "print(*(m for m in ('langchain_openai', 'openai', 'numpy') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", probe], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_llm_is_built_on_first_access(monkeypatch) -> None:
+    graph_module = importlib.import_module("agent.graph")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    assert "llm" not in vars(graph_module)
+    assert graph_module.llm is graph_module.get_chat_model(graph_module.MODEL_NAME)
+    assert graph_module.llm.model_name == graph_module.MODEL_NAME
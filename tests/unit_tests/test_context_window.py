@@ -0,0 +1,150 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from agent.benchmarks.fake_llm import FakeChatModel, patched_llm
+from agent.context_window import (
+    build_history,
+    messages_to_summarize,
+    resume_cursor,
+    window_start,
+)
+from agent.graph import Context, builder
+
+
+def _conversation(turns: int) -> list:
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"user {i}", id=f"h{i}"))
+        messages.append(AIMessage(content=f"dj {i}", id=f"a{i}"))
+    return messages
+
+
+def test_window_keeps_last_turns() -> None:
+    messages = _conversation(5)
+    assert window_start(messages, 2) == 6
+    assert window_start(messages, 10) == 0
+
+
+def test_only_new_overflow_is_summarized() -> None:
+    messages = _conversation(5)
+    assert [m.id for m in messages_to_summarize(messages, None, 2)] == [
+        "h0",
+        "a0",
+        "h1",
+        "a1",
+        "h2",
+        "a2",
+    ]
+    assert [m.id for m in messages_to_summarize(messages, "a1", 2)] == ["h2", "a2"]
+    assert messages_to_summarize(messages, "a2", 2) == []
+
+
+def test_messages_dropped_for_the_budget_are_summarized() -> None:
+    messages = _conversation(3)
+    # All three turns fit the turn window, but only the last reply fits the budget
+    assert [m.id for m in messages_to_summarize(messages, None, 5, token_budget=1)] == [
+        "h0",
+        "a0",
+        "h1",
+        "a1",
+        "h2",
+    ]
+
+
+def test_overflow_is_summarized_in_batches() -> None:
+    # One turn over the window waits, kept verbatim, for the batch to fill
+    messages = _conversation(3)
+    assert messages_to_summarize(messages, None, 2, batch_turns=2) == []
+    assert [m.id for m in build_history(messages, None, 2, batch_turns=2)] == [
+        "h0",
+        "a0",
+        "h1",
+        "a1",
+        "h2",
+        "a2",
+    ]
+
+    messages = _conversation(4)
+    assert [m.id for m in messages_to_summarize(messages, None, 2, batch_turns=2)] == [
+        "h0",
+        "a0",
+        "h1",
+        "a1",
+    ]
+    assert [
+        m.id for m in build_history(messages, "s", 2, cursor="a1", batch_turns=2)[1:]
+    ] == [
+        "h2",
+        "a2",
+        "h3",
+        "a3",
+    ]
+
+    # ... unless the budget would drop it first
+    assert (
+        messages_to_summarize(_conversation(3), None, 2, token_budget=1, batch_turns=2)
+        != []
+    )
+
+
+def test_missing_cursor_keeps_the_summary_and_restarts_at_the_window() -> None:
+    messages = _conversation(5)
+    assert messages_to_summarize(messages, "gone", 2) == []
+    assert resume_cursor(messages, "gone", 2) == "a2"
+    assert resume_cursor(messages, "a1", 2) is None
+    assert [
+        m.id
+        for m in messages_to_summarize(messages, resume_cursor(messages, "gone", 2), 2)
+    ] == []
+
+
+def test_history_prepends_summary_and_respects_budget() -> None:
+    messages = _conversation(5)
+    history = build_history(messages, "likes jazz", max_turns=2)
+    assert isinstance(history[0], SystemMessage)
+    assert [m.id for m in history[1:]] == ["h3", "a3", "h4", "a4"]
+
+    trimmed = build_history(messages, None, max_turns=2, token_budget=1)
+    assert [m.id for m in trimmed] == ["a4"]
+
+
+def test_summary_updates_incrementally_across_turns() -> None:
+    graph = builder.compile(checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "t1"}}
+    context = Context(history_turns=2, summary_batch_turns=1)
+    summarizer = FakeChatModel(response="User likes jazz.")
+
+    with patched_llm(FakeChatModel(), tiers={"gpt-4o-mini": summarizer}):
+        for i in range(2):
+            state = graph.invoke(
+                {"messages": [("human", f"hello {i}")]}, config, context=context
+            )
+        assert "summary" not in state
+
+        state = graph.invoke(
+            {"messages": [("human", "hello 2")]}, config, context=context
+        )
+        assert state["summary"] == "User likes jazz."
+        assert state["summary_cursor"] == state["messages"][1].id
+
+
+def test_summary_waits_for_a_full_batch() -> None:
+    graph = builder.compile(checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "t2"}}
+    context = Context(history_turns=2, summary_batch_turns=2)
+
+    with patched_llm(
+        FakeChatModel(),
+        tiers={"gpt-4o-mini": FakeChatModel(response="User likes jazz.")},
+    ):
+        for i in range(3):
+            state = graph.invoke(
+                {"messages": [("human", f"hello {i}")]}, config, context=context
+            )
+        assert "summary" not in state
+
+        state = graph.invoke(
+            {"messages": [("human", "hello 3")]}, config, context=context
+        )
+        assert state["summary"] == "User likes jazz."
+        assert state["summary_cursor"] == state["messages"][3].id
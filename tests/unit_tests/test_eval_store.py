@@ -0,0 +1,102 @@
+import importlib
+
+import pytest
+
+from agent.benchmarks.fake_llm import FakeChatModel, patched_llm
+from agent.eval_store import EvalStore, evaluate_incremental, store_stats
+from agent.evaluators import classification_accuracy
+from agent.metrics import metrics
+
+# ``agent.graph`` the attribute is the compiled graph
+graph_module = importlib.import_module("agent.graph")
+
+
+@pytest.fixture
+def dataset(make_dataset):
+    # Greetings go to chat and never reach clarify
+    return make_dataset(["greeting"] * 3)
+
+
+def _run(path, store, evaluators=(classification_accuracy,), **kwargs):
+    metrics.reset()
+    with patched_llm(FakeChatModel()):
+        rows = list(
+            evaluate_incremental(
+                path, list(evaluators), store, repetitions=2, concurrency=2, **kwargs
+            )
+        )
+    return rows, store_stats()
+
+
+def test_only_examples_through_changed_nodes_rerun(
+    tmp_path, dataset, monkeypatch
+) -> None:
+    store = EvalStore(tmp_path / "store.sqlite")
+    rows, stats = _run(dataset, store)
+    assert len(rows) == 6 and not any(row.get("cached") for row in rows)
+    assert stats == {"reused_examples": 0, "rerun_examples": 3}
+    assert "chat" in rows[0]["nodes"] and "clarify" not in rows[0]["nodes"]
+
+    rows, stats = _run(dataset, store)
+    assert len(rows) == 6 and all(row["cached"] for row in rows)
+    assert stats == {"reused_examples": 3, "rerun_examples": 0}
+    assert rows[0]["scores"] == {"classification_accuracy": 1.0}
+
+    # No example reached clarify, so changing its prompt reruns nothing
+    fingerprints = graph_module.node_fingerprints()
+    monkeypatch.setattr(
+        graph_module,
+        "node_fingerprints",
+        lambda: {**fingerprints, "clarify": "changed"},
+    )
+    assert _run(dataset, store)[1] == {"reused_examples": 3, "rerun_examples": 0}
+
+    monkeypatch.setattr(
+        graph_module, "node_fingerprints", lambda: {**fingerprints, "chat": "changed"}
+    )
+    assert _run(dataset, store)[1] == {"reused_examples": 0, "rerun_examples": 3}
+    assert _run(dataset, store)[1] == {"reused_examples": 3, "rerun_examples": 0}
+
+    assert _run(dataset, store, full=True)[1] == {
+        "reused_examples": 0,
+        "rerun_examples": 3,
+    }
+
+
+def test_evaluator_changes_rerun_every_example(tmp_path, dataset) -> None:
+    store = EvalStore(tmp_path / "store.sqlite")
+    _run(dataset, store)
+
+    def strict(inputs, outputs):
+        return {"key": "strict", "score": 0.0}
+
+    strict.version = "1"
+    rows, stats = _run(dataset, store, evaluators=(classification_accuracy, strict))
+    assert stats["rerun_examples"] == 3
+    assert rows[0]["scores"] == {"classification_accuracy": 1.0, "strict": 0.0}
+
+
+def test_fast_path_changes_the_classify_fingerprint(tmp_path, monkeypatch) -> None:
+    fast_classifier = importlib.import_module("agent.fast_classifier")
+    before = graph_module.node_fingerprints()
+
+    model = tmp_path / "fast_classifier.json"
+    model.write_bytes(fast_classifier.MODEL_PATH.read_bytes() + b"\n")
+    monkeypatch.setattr(
+        graph_module,
+        "fast_path_fingerprint",
+        lambda: fast_classifier.fingerprint(model),
+    )
+    after = graph_module.node_fingerprints()
+    assert after["classify_intent"] != before["classify_intent"]
+    assert after["chat"] == before["chat"]
+
+    monkeypatch.undo()
+    monkeypatch.setattr(
+        graph_module.classification_cache,
+        "window",
+        graph_module.classification_cache.window + 1,
+    )
+    assert (
+        graph_module.node_fingerprints()["classify_intent"] != before["classify_intent"]
+    )
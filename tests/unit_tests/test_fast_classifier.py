@@ -0,0 +1,73 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent.fast_classifier import fast_classify
+
+
+def test_greeting_rule() -> None:
+    result = fast_classify([HumanMessage(content="Hey there!")])
+    assert result is not None
+    assert result["intent"] == "greeting"
+
+
+def test_affirmation_after_offer() -> None:
+    messages = [
+        HumanMessage(content="Something chill, I've been into soul lately"),
+        AIMessage(content="Want me to put together a playlist with that vibe?"),
+        HumanMessage(content="Yes, do it!"),
+    ]
+    result = fast_classify(messages)
+    assert result is not None
+    assert result["intent"] == "request_playlist"
+    assert result["signals"] == {"genre": ["soul"], "mood": ["chill"]}
+
+
+def test_affirmation_without_offer_is_not_a_request() -> None:
+    messages = [
+        AIMessage(content="What have you been listening to?"),
+        HumanMessage(content="yes"),
+    ]
+    result = fast_classify(messages)
+    assert result is None or result["intent"] != "request_playlist"
+
+
+def test_ambiguous_message_falls_through() -> None:
+    assert fast_classify([HumanMessage(content="my dog ate my homework")]) is None
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "don't make a playlist",
+        "what's the history of jazz? I don't want a playlist",
+        "maybe a playlist, not sure, what do you think",
+        "I want to discover some new music",
+        "make me a chill playlist",
+    ],
+)
+def test_lexical_model_never_starts_or_steers_a_playlist(text) -> None:
+    result = fast_classify([HumanMessage(content=text)])
+    assert result is None or result["intent"] in ("greeting", "ask_question")
+
+
+@pytest.mark.parametrize(
+    "reply",
+    ["please don't", "sure, but not now", "ok no thanks", "yes but with more jazz"],
+)
+def test_qualified_affirmation_after_offer_falls_through(reply) -> None:
+    messages = [
+        AIMessage(content="Want me to put together a playlist with that vibe?"),
+        HumanMessage(content=reply),
+    ]
+    assert fast_classify(messages) is None
+
+
+@pytest.mark.parametrize(
+    "reply", ["yes please", "sure, go ahead", "ok sure", "make it"]
+)
+def test_complete_affirmations_after_offer(reply) -> None:
+    messages = [
+        AIMessage(content="Want me to put together a playlist with that vibe?"),
+        HumanMessage(content=reply),
+    ]
+    assert fast_classify(messages)["intent"] == "request_playlist"
@@ -0,0 +1,351 @@
+import importlib
+import threading
+
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.types import Command
+
+from agent.benchmarks.fake_llm import FakeChatModel, patched_llm
+from agent.graph import Context, builder, graph
+from agent.instrumentation import usage_report
+from agent.metrics import metrics
+
+graph_module = importlib.import_module("agent.graph")
+
+INPUTS = {"messages": [{"role": "human", "content": "hey!"}]}
+
+
+@pytest.fixture(autouse=True)
+def _clear_classification_cache():
+    graph_module.classification_cache.clear()
+
+
+@pytest.fixture
+def fake_llm():
+    with patched_llm(FakeChatModel()) as model:
+        yield model
+
+
+def test_chat_turn_sync(fake_llm) -> None:
+    result = graph.invoke(INPUTS)
+    assert result["action"] == "chat"
+    assert result["response"] == fake_llm.response
+
+
+@pytest.mark.anyio
+async def test_chat_turn_async(fake_llm) -> None:
+    result = await graph.ainvoke(INPUTS)
+    assert result["action"] == "chat"
+    assert result["response"] == fake_llm.response
+    assert result["messages"][-1].content == fake_llm.response
+
+
+def test_chat_streams_reply_tokens(fake_llm) -> None:
+    chunks = list(graph.stream(INPUTS, stream_mode=["custom", "values"]))
+    tokens = [chunk["token"] for mode, chunk in chunks if mode == "custom"]
+    final = [chunk for mode, chunk in chunks if mode == "values"][-1]
+    assert len(tokens) > 1
+    assert "".join(tokens) == fake_llm.response == final["response"]
+
+
+def test_fast_path_skips_llm_classification(fake_llm) -> None:
+    fake_llm.structured_outputs["ChatClassification"] = {
+        "intent": "request_playlist",
+        "confidence": 1.0,
+        "signals": {},
+    }
+    result = graph.invoke(INPUTS)
+    assert result["classification"]["intent"] == "greeting"
+    assert result["action"] == "chat"
+
+
+def _classifier(intent: str, confidence: float) -> FakeChatModel:
+    model = FakeChatModel()
+    model.structured_outputs["ChatClassification"] = {
+        "intent": intent,
+        "confidence": confidence,
+        "signals": {},
+    }
+    return model
+
+
+def test_cascade_escalates_ambiguous_confidence() -> None:
+    inputs = {"messages": [{"role": "human", "content": "my dog ate my homework"}]}
+    cheap = _classifier("request_playlist", 0.65)
+    big = _classifier("request_playlist", 0.9)
+    with patched_llm(big, tiers={"gpt-4o-mini": cheap}):
+        result = graph.invoke(inputs, context=Context(classifier_model="gpt-4o-mini"))
+    assert result["classification"]["confidence"] == 0.9
+    assert result["action"] == "generate_playlist"
+
+
+def test_cascade_keeps_confident_cheap_answer() -> None:
+    inputs = {"messages": [{"role": "human", "content": "my dog ate my homework"}]}
+    cheap = _classifier("unknown", 0.95)
+    big = _classifier("request_playlist", 0.9)
+    with patched_llm(big, tiers={"gpt-4o-mini": cheap}):
+        result = graph.invoke(inputs, context=Context(classifier_model="gpt-4o-mini"))
+    assert result["classification"]["intent"] == "unknown"
+
+
+def test_nodes_share_prompt_prefix_and_report_cached_tokens() -> None:
+    metrics.reset()
+    inputs = {"messages": [{"role": "human", "content": "my dog ate my homework"}]}
+    model = _classifier("explore", 0.5)
+    model.prompt_cache = True
+    with patched_llm(model):
+        result = graph.invoke(inputs, context=Context(classifier_model=None))
+    assert result["action"] == "clarify"
+
+    report = usage_report()
+    assert report["classify_intent"]["cached_prompt_tokens"] == 0
+    # clarify reuses the static instructions + history sent by classify_intent
+    assert report["clarify"]["cached_prompt_tokens"] > 0
+
+
+def test_repeated_window_reuses_cached_classification() -> None:
+    inputs = {"messages": [{"role": "human", "content": "my dog ate my homework"}]}
+    context = Context(classification_cache=True)
+    with patched_llm(_classifier("unknown", 0.95)):
+        graph.invoke(inputs, context=context)
+    with patched_llm(_classifier("request_playlist", 0.95)):
+        assert (
+            graph.invoke(inputs, context=context)["classification"]["intent"]
+            == "unknown"
+        )
+        # Off by default: every run classifies afresh
+        assert graph.invoke(inputs)["classification"]["intent"] == "request_playlist"
+
+
+@pytest.mark.anyio
+async def test_speculative_chat_is_committed_or_discarded() -> None:
+    inputs = {"messages": [{"role": "human", "content": "my dog ate my homework"}]}
+    context = Context(
+        classifier_model=None, classification_cache=False, speculative_chat=True
+    )
+    metrics.reset()
+
+    model = _classifier("ask_question", 0.9)
+    with patched_llm(model):
+        result = await graph.ainvoke(inputs, context=context)
+    assert result["response"] == model.response
+    assert result["speculative_reply"] is None
+    assert metrics.counter("speculative_chat_total", outcome="committed") == 1
+
+    with patched_llm(_classifier("explore", 0.5)):
+        result = await graph.ainvoke(inputs, context=context)
+    assert result["action"] == "clarify"
+    assert "speculative_reply" not in result
+    assert metrics.counter("speculative_chat_total", outcome="cancelled") == 1
+
+
+def test_tracks_prefetched_during_confirmation() -> None:
+    checkpointed = builder.compile(checkpointer=InMemorySaver())
+    inputs = {
+        "messages": [
+            {"role": "human", "content": "make me a techno playlist for the gym"}
+        ]
+    }
+    context = Context(classifier_model=None, classification_cache=False)
+    metrics.reset()
+
+    with patched_llm(_classifier("request_playlist", 0.95)):
+        accepted = {"configurable": {"thread_id": "accepted"}}
+        state = checkpointed.invoke(inputs, accepted, context=context)
+        assert "__interrupt__" in state
+        state = checkpointed.invoke(Command(resume="yes"), accepted, context=context)
+        assert state["response_type"] == "playlist_created"
+        assert all(t["spotify_uri"] for t in state["proposed_tracks"])
+        assert metrics.counter("track_prefetch_total", outcome="hit") == 1
+
+        declined = {"configurable": {"thread_id": "declined"}}
+        checkpointed.invoke(inputs, declined, context=context)
+        checkpointed.invoke(Command(resume="no"), declined, context=context)
+        assert metrics.counter("track_prefetch_total", outcome="discarded") == 1
+
+
+def test_streamed_playlist_emits_tracks_and_prefetches() -> None:
+    checkpointed = builder.compile(checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "streamed"}}
+    inputs = {"messages": [{"role": "human", "content": "make me a long techno set"}]}
+    context = Context(
+        classifier_model=None,
+        classification_cache=False,
+        stream_playlist=True,
+        playlist_length=5,
+    )
+    model = _classifier("request_playlist", 0.95)
+    tracks = [
+        {"artist": f"Artist {i}", "title": f"Track {i}", "spotify_uri": None}
+        for i in range(5)
+    ]
+    model.structured_outputs["PlaylistProposal"] = {
+        "tracks": tracks,
+        "vibe_description": "Relentless.",
+    }
+    metrics.reset()
+
+    with patched_llm(model):
+        events = [
+            chunk
+            for mode, chunk in checkpointed.stream(
+                inputs, config, stream_mode=["custom", "values"], context=context
+            )
+            if mode == "custom" and "track" in chunk
+        ]
+        assert [e["track"] for e in events] == tracks
+        assert [e["index"] for e in events] == list(range(5))
+
+        state = checkpointed.invoke(Command(resume="yes"), config, context=context)
+    assert state["response_type"] == "playlist_created"
+    assert metrics.counter("track_prefetch_total", outcome="hit") == 1
+
+
+def test_playlist_speculated_during_clarify(monkeypatch) -> None:
+    monkeypatch.setattr(graph_module, "fast_classify", lambda messages: None)
+    checkpointed = builder.compile(checkpointer=InMemorySaver())
+    context = Context(
+        classifier_model=None, classification_cache=False, speculative_playlist=True
+    )
+    model = FakeChatModel()
+    speculated = model.structured_outputs["PlaylistProposal"]
+    signals = {"genre": "techno", "mood": ["dark"]}
+    metrics.reset()
+
+    def turn(
+        thread_id: str, text: str, intent: str, confidence: float, signals: dict
+    ) -> dict:
+        model.structured_outputs["ChatClassification"] = {
+            "intent": intent,
+            "confidence": confidence,
+            "signals": signals,
+        }
+        inputs = {"messages": [{"role": "human", "content": text}]}
+        return checkpointed.invoke(
+            inputs, {"configurable": {"thread_id": thread_id}}, context=context
+        )
+
+    with patched_llm(model):
+        for thread_id in ("confirmed", "changed"):
+            assert (
+                turn(thread_id, "some dark techno maybe?", "explore", 0.6, signals)[
+                    "action"
+                ]
+                == "clarify"
+            )
+            # Let the speculative generation finish before the proposal changes
+            graph_module.proposal_speculator._pending[thread_id].future.result()
+
+        model.structured_outputs["PlaylistProposal"] = {
+            "tracks": [{"artist": "Fresh", "title": "Generation", "spotify_uri": None}],
+            "vibe_description": "Generated after the answer.",
+        }
+        state = turn(
+            "confirmed", "yeah that", "request_playlist", 0.9, {"genre": "techno"}
+        )
+        assert state["proposed_tracks"] == speculated["tracks"]
+
+        state = turn(
+            "changed",
+            "actually make it house",
+            "request_playlist",
+            0.9,
+            {"genre": ["house"]},
+        )
+        assert state["proposed_tracks"][0]["artist"] == "Fresh"
+
+    assert metrics.counter("speculative_playlist_total", outcome="hit") == 1
+    assert metrics.counter("speculative_playlist_total", outcome="miss") == 1
+    assert metrics.counter("speculative_playlist_wasted_tokens_total") > 0
+
+
+def test_speculative_retrieval_runs_off_the_clarify_turn(monkeypatch) -> None:
+    monkeypatch.setattr(graph_module, "fast_classify", lambda messages: None)
+    released = threading.Event()
+
+    def slow_candidates(state, context):
+        assert released.wait(5)
+        return [{"artist": "Catalog", "title": "Candidate", "spotify_uri": None}]
+
+    monkeypatch.setattr(graph_module, "_candidates", slow_candidates)
+    context = Context(
+        classifier_model=None, classification_cache=False, speculative_playlist=True
+    )
+    config = {"configurable": {"thread_id": "slow-retrieval"}}
+    model = FakeChatModel()
+    model.structured_outputs["ChatClassification"] = {
+        "intent": "explore",
+        "confidence": 0.6,
+        "signals": {"genre": "techno"},
+    }
+    inputs = {"messages": [{"role": "human", "content": "some dark techno maybe?"}]}
+
+    with patched_llm(model):
+        state = graph.invoke(inputs, config, context=context)
+        assert state["action"] == "clarify"
+        future = graph_module.proposal_speculator._pending["slow-retrieval"].future
+        assert not future.done()
+        released.set()
+        assert future.result(5) == model.structured_outputs["PlaylistProposal"]
+    graph_module.proposal_speculator.discard("slow-retrieval")
+
+
+def test_speculation_is_dropped_when_the_next_turn_routes_elsewhere(
+    monkeypatch,
+) -> None:
+    monkeypatch.setattr(graph_module, "fast_classify", lambda messages: None)
+    checkpointed = builder.compile(checkpointer=InMemorySaver())
+    context = Context(
+        classifier_model=None, classification_cache=False, speculative_playlist=True
+    )
+    config = {"configurable": {"thread_id": "clarify-chat-playlist"}}
+    model = FakeChatModel()
+    metrics.reset()
+
+    def turn(text: str, intent: str, confidence: float) -> dict:
+        model.structured_outputs["ChatClassification"] = {
+            "intent": intent,
+            "confidence": confidence,
+            "signals": {},
+        }
+        inputs = {"messages": [{"role": "human", "content": text}]}
+        return checkpointed.invoke(inputs, config, context=context)
+
+    with patched_llm(model):
+        assert (
+            turn("something dark for tonight?", "explore", 0.6)["action"] == "clarify"
+        )
+        assert (
+            turn("who produced that last record?", "ask_question", 0.9)["action"]
+            == "chat"
+        )
+        assert "clarify-chat-playlist" not in graph_module.proposal_speculator._pending
+
+        model.structured_outputs["PlaylistProposal"] = {
+            "tracks": [{"artist": "Fresh", "title": "Generation", "spotify_uri": None}],
+            "vibe_description": "Generated for this turn.",
+        }
+        state = turn("ok, make me a playlist", "request_playlist", 0.9)
+        assert state["proposed_tracks"][0]["artist"] == "Fresh"
+
+    assert metrics.counter("speculative_playlist_total", outcome="discarded") == 1
+    assert metrics.counter("speculative_playlist_total", outcome="hit") == 0
+
+
+def test_nodes_are_timed_and_llm_calls_costed(fake_llm) -> None:
+    metrics.reset()
+    graph.invoke(
+        INPUTS, context=Context(classifier_model=None, classification_cache=False)
+    )
+
+    timed = {
+        s["labels"]["node"]
+        for s in metrics.snapshot()["summaries"]
+        if s["name"] == "node_latency_seconds"
+    }
+    assert timed == {"summarize_history", "classify_intent", "decide_action", "chat"}
+    assert (
+        metrics.quantile("llm_latency_seconds", 0.5, node="chat", model="gpt-4o")
+        is not None
+    )
+    assert usage_report()["chat"]["cost_usd"] > 0
@@ -0,0 +1,25 @@
+import json
+
+from agent.json_stream import ArrayItemScanner
+
+
+def test_items_are_returned_as_soon_as_they_close() -> None:
+    document = {
+        "tracks": [
+            {"artist": "Tycho", "title": "Awake [Live, 2015]"},
+            {"artist": "Bonobo", "title": "Kerala"},
+        ],
+        "vibe_description": "Warm",
+    }
+    text = json.dumps(document, indent=2)
+    scanner = ArrayItemScanner("tracks")
+
+    seen = []
+    for i, char in enumerate(text):
+        for item in scanner.feed(char):
+            seen.append((item, i))
+
+    assert [item for item, _ in seen] == document["tracks"]
+    assert seen[0][1] < text.index("Bonobo")
+    assert scanner.done
+    assert json.loads(scanner.text) == document
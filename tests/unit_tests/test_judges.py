@@ -0,0 +1,99 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from agent.evaluators import MultiCriteria, conversation_tone, judge, playlist_quality
+from agent.metrics import metrics
+
+INPUTS = {
+    "messages": [{"role": "human", "content": "Something mellow for a rainy sunday"}]
+}
+OUTPUTS = {
+    "response": "Here's a slow one for you.",
+    "proposed_tracks": [{"artist": "Bonobo", "title": "Kerala"}],
+}
+
+
+class _Judge:
+    """Stands in for the OpenAI client; scores every requested criterion 0.8."""
+
+    def __init__(self) -> None:
+        self.requests = []
+        self.chat = self
+        self.completions = self
+
+    def create(self, **request):
+        self.requests.append(request)
+        schema = request.get("response_format")
+        if schema is None:
+            content = {"score": 0.8, "reason": "fine"}
+        else:
+            criteria = schema["json_schema"]["schema"]["required"]
+            content = {c: {"score": 0.8, "reason": f"{c} ok"} for c in criteria}
+        message = SimpleNamespace(content=json.dumps(content))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def fake_judge(monkeypatch):
+    client = _Judge()
+    monkeypatch.setattr(judge, "_client", lambda: client)
+    judge.judge_cache.clear()
+    metrics.reset()
+    yield client
+    judge.judge_cache.clear()
+
+
+def test_multi_criteria_scores_all_criteria_in_one_call(fake_judge) -> None:
+    result = MultiCriteria()(INPUTS, OUTPUTS)
+
+    assert [(r["key"], r["score"]) for r in result["results"]] == [
+        ("playlist_quality", 0.8),
+        ("conversation_tone", 0.8),
+    ]
+    assert len(fake_judge.requests) == 1
+    prompt = fake_judge.requests[0]["messages"][0]["content"]
+    assert "Bonobo – Kerala" in prompt and "friendly underground DJ friend" in prompt
+
+
+def test_inapplicable_criteria_are_not_sent(fake_judge) -> None:
+    result = MultiCriteria()(INPUTS, {"response": "What are you in the mood for?"})
+
+    assert result["results"][0] == {
+        "key": "playlist_quality",
+        "score": 0,
+        "comment": "No playlist generated",
+    }
+    assert result["results"][1]["score"] == 0.8
+    (request,) = fake_judge.requests
+    assert request["response_format"]["json_schema"]["schema"]["required"] == [
+        "conversation_tone"
+    ]
+
+
+def test_unchanged_outputs_are_not_rejudged(fake_judge) -> None:
+    for _ in range(3):
+        MultiCriteria()(INPUTS, OUTPUTS)
+        conversation_tone(INPUTS, OUTPUTS)
+    assert len(fake_judge.requests) == 2
+    assert metrics.counter("judge_calls_total", model=judge.JUDGE_MODEL) == 2
+    assert metrics.counter("judge_cache_total", outcome="hit") == 4
+
+    MultiCriteria()(INPUTS, {**OUTPUTS, "response": "Here's a different one."})
+    assert len(fake_judge.requests) == 3
+
+
+def test_judge_cache_persists_across_processes(tmp_path, fake_judge) -> None:
+    db_path = str(tmp_path / "judge.sqlite")
+    judge.JudgeCache(db_path=db_path).set("key", {"score": 1.0})
+    assert judge.JudgeCache(db_path=db_path).get("key") == {"score": 1.0}
+
+
+def test_unparseable_verdicts_score_zero(fake_judge) -> None:
+    message = SimpleNamespace(content="not json")
+    fake_judge.create = lambda **request: SimpleNamespace(
+        choices=[SimpleNamespace(message=message)]
+    )
+    assert conversation_tone(INPUTS, OUTPUTS)["comment"] == "Failed to parse"
+    assert playlist_quality(INPUTS, OUTPUTS)["score"] == 0
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from agent.benchmarks.fake_llm import FakeChatModel, patched_llm
+from agent.evaluators import classification_accuracy
+from agent.local_evaluation import (
+    ResultWriter,
+    aevaluate,
+    evaluate_file,
+    read_examples,
+    summarize,
+)
+
+
+def test_read_examples_shards_and_hashes_ids(make_dataset) -> None:
+    path = make_dataset(["greeting"] * 5)
+    ids = [example.id for example in read_examples(path)]
+    assert len(set(ids)) == 5
+    assert ids == [example.id for example in read_examples(path)]
+    shards = [[e.id for e in read_examples(path, shard, 2)] for shard in range(2)]
+    assert shards == [ids[0::2], ids[1::2]]
+
+
+def test_evaluate_file_scores_every_repetition(tmp_path, make_dataset) -> None:
+    # The fake classifier model calls everything a greeting, so only the
+    # playlist request (which the fast path leaves to it) is misclassified
+    path = make_dataset(["greeting", "greeting", "request_playlist"])
+
+    def failing(inputs, outputs):
+        raise RuntimeError("judge down")
+
+    with patched_llm(FakeChatModel()):
+        rows = list(
+            evaluate_file(
+                path, [classification_accuracy, failing], concurrency=2, repetitions=2
+            )
+        )
+
+    assert len(rows) == 6
+    assert all(row["error"] is None for row in rows)
+    assert rows[0]["outputs"]["messages"][-1]["role"] == "ai"
+    assert rows[0]["comments"]["failing"] == "RuntimeError: judge down"
+
+    summary = summarize(rows)
+    assert summary["runs"] == 6 and summary["examples"] == 3
+    assert summary["scores"]["classification_accuracy"] == pytest.approx(
+        {"count": 6, "mean": 4 / 6, "min": 0.0, "max": 1.0}
+    )
+    assert "failing" not in summary["scores"]
+
+    output = tmp_path / "results.jsonl"
+    with ResultWriter(str(output)) as writer:
+        for row in rows:
+            writer.write(row)
+    assert [json.loads(line)["example_id"] for line in open(output)] == [
+        row["example_id"] for row in rows
+    ]
+
+
+def test_latency_is_measured_per_example(make_dataset) -> None:
+    examples = list(read_examples(make_dataset(["greeting"] * 3)))
+    slow = examples[0].inputs["messages"][0]["content"]
+
+    async def turn(inputs: dict) -> dict:
+        # The first example is slow, the others answer at once
+        if inputs["messages"][0]["content"] == slow:
+            await asyncio.sleep(0.2)
+        return {"response": "ok"}
+
+    async def collect() -> list[dict]:
+        return [
+            row
+            async for row in aevaluate(
+                examples, [], graph=RunnableLambda(turn), concurrency=3
+            )
+        ]
+
+    latencies = {row["example_id"]: row["latency_s"] for row in asyncio.run(collect())}
+    assert latencies[examples[0].id] >= 0.2
+    assert max(latencies[e.id] for e in examples[1:]) < 0.1
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from agent.metrics import Metrics, prometheus_text, write_jsonl
+
+
+def test_histogram_quantiles_and_exports(tmp_path) -> None:
+    registry = Metrics(buckets=(0.1, 1.0))
+    for value in (0.05, 0.2, 0.4, 0.6, 3.0):
+        registry.observe("node_latency_seconds", value, node="chat")
+    registry.incr("llm_calls_total", 2, node='say "hi"')
+
+    # Interpolated within the (0.1, 1.0] bucket holding observations 2-4
+    assert registry.quantile("node_latency_seconds", 0.5, node="chat") == pytest.approx(
+        0.55
+    )
+    assert registry.quantile("node_latency_seconds", 1.0, node="chat") == 3.0
+    assert registry.quantile("node_latency_seconds", 0.5, node="clarify") is None
+
+    text = prometheus_text(registry)
+    assert (
+        '# TYPE llm_calls_total counter\nllm_calls_total{node="say \\"hi\\""} 2\n'
+        in text
+    )
+    assert 'node_latency_seconds_bucket{le="0.1",node="chat"} 1\n' in text
+    assert 'node_latency_seconds_bucket{le="1.0",node="chat"} 4\n' in text
+    assert 'node_latency_seconds_bucket{le="+Inf",node="chat"} 5\n' in text
+    assert 'node_latency_seconds_count{node="chat"} 5\n' in text
+
+    path = tmp_path / "metrics.jsonl"
+    assert write_jsonl(str(path), registry) == 2
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert {r["type"] for r in records} == {"counter", "histogram"}
+    assert records[1]["buckets"][-1] == ["+Inf", 5]
@@ -0,0 +1,119 @@
+import importlib
+
+import numpy as np
+import pytest
+
+from agent.benchmarks.fake_llm import FakeChatModel, patched_llm
+from agent.graph import Context, graph
+from agent.retrieval import EmbeddingIndex, build_index, hash_embed, track_text
+
+graph_module = importlib.import_module("agent.graph")
+
+RECORDS = [
+    {
+        "artist": "Surgeon",
+        "title": "Klonk",
+        "genre": "techno",
+        "mood": ["dark", "driving"],
+    },
+    {"artist": "Nala Sinephro", "title": "Space 1", "genre": "jazz", "mood": "dreamy"},
+    {
+        "artist": "Blawan",
+        "title": "Why They Hide",
+        "genre": "techno",
+        "tags": ["industrial", "dark"],
+    },
+    {
+        "artist": "Khruangbin",
+        "title": "Maria También",
+        "genre": "funk",
+        "mood": "laid-back",
+    },
+    {
+        "artist": "Floating Points",
+        "title": "Silhouettes",
+        "genre": "jazz",
+        "mood": "mellow",
+    },
+]
+
+
+def test_search_ranks_matching_tracks_first(tmp_path) -> None:
+    assert build_index(RECORDS, str(tmp_path), batch_rows=2) == 5
+    index = EmbeddingIndex(str(tmp_path))
+
+    found = index.search("dark techno", 2)
+    assert {t["artist"] for _, t in found} == {"Surgeon", "Blawan"}
+    assert found[0][0] >= found[1][0]
+    assert (
+        index.candidates({"genre": "jazz", "mood": ["mellow"]}, 1)[0]["artist"]
+        == "Floating Points"
+    )
+    assert index.candidates({}, 3) == []
+
+
+def test_chunked_top_k_matches_full_scan(tmp_path) -> None:
+    rng = np.random.default_rng(0)
+    texts = [
+        " ".join(rng.choice(["dark", "house", "jazz", "deep", "warm", "acid"], 3))
+        for _ in range(500)
+    ]
+    records = [{"artist": t, "title": f"Track {i}"} for i, t in enumerate(texts)]
+    build_index(records, str(tmp_path))
+    index = EmbeddingIndex(str(tmp_path))
+
+    query = hash_embed(["deep acid house"])[0]
+    expected = np.sort(hash_embed([track_text(r) for r in records]) @ query)[::-1][:10]
+    scores = [score for score, _ in index.top_k(query, 10, chunk_rows=64)]
+    np.testing.assert_allclose(scores, expected, rtol=1e-5)
+
+
+def test_candidates_are_listed_in_the_playlist_prompt(tmp_path, monkeypatch) -> None:
+    build_index(RECORDS, str(tmp_path))
+    monkeypatch.setattr(
+        graph_module, "get_embedding_index", lambda: EmbeddingIndex(str(tmp_path))
+    )
+    prompts = []
+    task_msg = graph_module._playlist_task_msg
+    monkeypatch.setattr(
+        graph_module,
+        "_playlist_task_msg",
+        lambda *a: prompts.append(task_msg(*a)) or prompts[-1],
+    )
+
+    model = FakeChatModel()
+    model.structured_outputs["ChatClassification"] = {
+        "intent": "request_playlist",
+        "confidence": 0.95,
+        "signals": {"genre": "techno", "mood": "dark"},
+    }
+    inputs = {"messages": [{"role": "human", "content": "dark techno playlist please"}]}
+    with patched_llm(model):
+        graph.invoke(
+            inputs,
+            context=Context(
+                classifier_model=None,
+                classification_cache=False,
+                retrieval_candidates=2,
+            ),
+        )
+
+    assert "Surgeon – Klonk" in prompts[0].text
+    assert "Blawan – Why They Hide" in prompts[0].text
+
+
+def test_index_built_with_another_embedding_is_refused(tmp_path) -> None:
+    build_index(RECORDS, str(tmp_path))
+
+    with pytest.raises(ValueError, match="'hash' embedding, not 'minilm'"):
+        EmbeddingIndex(str(tmp_path), embedding="minilm")
+    with pytest.raises(ValueError, match="256-dimensional"):
+        EmbeddingIndex(str(tmp_path), embed=lambda texts: hash_embed(texts, dim=64))
+
+    build_index([], str(tmp_path / "empty"), embed=lambda t: hash_embed(t, dim=64))
+    assert (
+        EmbeddingIndex(
+            str(tmp_path / "empty"), embed=lambda t: hash_embed(t, dim=64)
+        ).candidates({"genre": "techno"}, 3)
+        == []
+    )
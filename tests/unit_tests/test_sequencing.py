@@ -0,0 +1,111 @@
+import importlib
+import itertools
+import random
+
+from agent.benchmarks.fake_llm import FakeChatModel, patched_llm
+from agent.catalog import TrackCatalog
+from agent.graph import Context, graph
+from agent.sequencing import (
+    TrackFeatures,
+    _Costs,
+    arc_targets,
+    camelot_key,
+    detect_arc,
+    sequence,
+)
+
+graph_module = importlib.import_module("agent.graph")
+
+
+def test_detect_arc() -> None:
+    assert (
+        detect_arc("something that starts mellow and builds up over 45 minutes")
+        == "build"
+    )
+    assert detect_arc("sunset vibes transitioning into night") == "build"
+    assert detect_arc("a set that peaks and then comes down") == "peak"
+    assert detect_arc("music to wind down after work") == "wind_down"
+    assert detect_arc("Build me that road trip playlist!") is None
+
+
+def test_camelot_key() -> None:
+    assert camelot_key({"key": "8B"}) == camelot_key({"key": 0, "mode": 1})  # C major
+    assert camelot_key({"key": "8A"}) == camelot_key({"key": 9, "mode": 0})  # A minor
+    assert camelot_key({"key": "13A"}) is None and camelot_key({}) is None
+
+
+def test_exact_order_is_optimal() -> None:
+    rng = random.Random(3)
+    features = [
+        TrackFeatures(rng.uniform(90, 130), rng.random(), rng.randrange(24))
+        for _ in range(6)
+    ]
+    costs = _Costs(features, arc_targets("peak", 6))
+    best = min(costs.total(p) for p in itertools.permutations(range(6)))
+    assert abs(costs.total(sequence(features, "peak")) - best) < 1e-9
+
+
+def test_long_playlist_follows_the_arc() -> None:
+    rng = random.Random(5)
+    features = [
+        TrackFeatures(rng.uniform(118, 126), rng.random(), rng.randrange(24))
+        for _ in range(200)
+    ]
+    features[7] = None
+    order = sequence(features, "wind_down")
+    assert sorted(order) == list(range(200))
+    energies = [features[i].energy for i in order if features[i] is not None]
+    assert sum(energies[:50]) > 3 * sum(energies[-50:])
+
+
+def test_proposal_is_sequenced(monkeypatch) -> None:
+    records = [
+        {"artist": "Tycho", "title": "Awake", "bpm": 96, "energy": 0.3, "key": "4A"},
+        {
+            "artist": "RÜFÜS DU SOL",
+            "title": "Innerbloom",
+            "bpm": 122,
+            "energy": 0.55,
+            "key": "5A",
+        },
+        {"artist": "Four Tet", "title": "Baby", "bpm": 124, "energy": 0.8, "key": "5A"},
+    ]
+    monkeypatch.setattr(graph_module, "get_catalog", lambda: TrackCatalog(records))
+    model = FakeChatModel()
+    model.structured_outputs["ChatClassification"] = {
+        "intent": "request_playlist",
+        "confidence": 0.95,
+        "signals": {},
+    }
+    model.structured_outputs["PlaylistProposal"]["tracks"] = [
+        {"artist": r["artist"], "title": r["title"], "spotify_uri": None}
+        for r in reversed(records)
+    ]
+    inputs = {
+        "messages": [
+            {
+                "role": "human",
+                "content": "A morning run playlist that starts mellow and builds up",
+            }
+        ]
+    }
+
+    with patched_llm(model):
+        result = graph.invoke(
+            inputs, context=Context(classifier_model=None, classification_cache=False)
+        )
+        assert [t["title"] for t in result["proposed_tracks"]] == [
+            "Awake",
+            "Innerbloom",
+            "Baby",
+        ]
+
+        context = Context(
+            classifier_model=None, classification_cache=False, stream_playlist=True
+        )
+        events = [
+            c
+            for c in graph.stream(inputs, stream_mode="custom", context=context)
+            if "order" in c
+        ]
+        assert events == [{"node": "generate_playlist", "order": [2, 1, 0]}]
@@ -0,0 +1,90 @@
+import importlib
+import time
+
+import pytest
+
+from agent.benchmarks.fake_spotify import FakeSpotifyServer, fake_uri
+from agent.metrics import metrics
+from agent.spotify import (
+    PlaylistLedger,
+    SpotifyClient,
+    SpotifyError,
+    TokenBucket,
+    configure,
+    create_playlist,
+)
+
+spotify = importlib.import_module("agent.spotify")
+
+pytestmark = pytest.mark.anyio
+
+
+def _tracks(n: int) -> list[dict]:
+    return [
+        {"artist": f"Artist {i}", "title": f"Track {i}", "spotify_uri": None}
+        for i in range(n)
+    ]
+
+
+def _client(server: FakeSpotifyServer, **kwargs) -> SpotifyClient:
+    return SpotifyClient(
+        "id", "secret", api_url=server.api_url, token_url=server.token_url, **kwargs
+    )
+
+
+async def test_search_is_concurrent_and_bounded() -> None:
+    with FakeSpotifyServer(latency=0.02, unknown_artists=("Artist 3",)) as server:
+        client = _client(server, max_concurrency=4)
+        found = await client.search_tracks(_tracks(20))
+        await client.aclose()
+
+    assert [t["spotify_uri"] for t in found[:3]] == [
+        fake_uri(f"Artist {i}", f"Track {i}") for i in range(3)
+    ]
+    assert found[3]["spotify_uri"] is None
+    assert server.requests == {"token": 1, "search": 20}
+    assert 1 < server.max_in_flight <= 4
+
+
+async def test_rate_limited_requests_honor_retry_after() -> None:
+    metrics.reset()
+    with FakeSpotifyServer(rate_limit=5, retry_after=1) as server:
+        client = _client(server)
+        found = await client.search_tracks(_tracks(8))
+        await client.aclose()
+
+    assert all(t["spotify_uri"] for t in found)
+    assert server.rate_limited > 0
+    assert metrics.counter("spotify_rate_limited_total") == server.rate_limited
+
+
+async def test_token_bucket_spaces_requests() -> None:
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+async def test_playlist_is_created_once_in_chunks(monkeypatch) -> None:
+    monkeypatch.setattr(spotify, "playlist_ledger", PlaylistLedger())
+    uris = [f"spotify:track:{i}" for i in range(250)]
+    with FakeSpotifyServer(fail_add_tracks=1) as server:
+        client = SpotifyClient(
+            "id", "secret", api_url=server.api_url, token_url=server.token_url
+        )
+        configure(client)
+        try:
+            # The first chunk is applied but its response is an error
+            with pytest.raises(SpotifyError):
+                await create_playlist("Mix", uris, key="thread-1")
+            url = await create_playlist("Mix", uris, key="thread-1")
+            again = await create_playlist("Mix", uris, key="thread-1")
+        finally:
+            configure(None)
+            await client.aclose()
+
+    assert url == again == "https://open.spotify.com/playlist/playlist1"
+    assert list(server.playlists) == ["playlist1"]
+    assert server.playlists["playlist1"]["uris"] == uris
+    assert server.requests["add_tracks"] == 3
@@ -0,0 +1,84 @@
+import importlib
+
+import pytest
+
+from agent.benchmarks.fake_spotify import FakeSpotifyServer
+from agent.cache import MISSING
+from agent.spotify import SpotifyClient, configure, search_tracks
+from agent.track_cache import TrackCache, track_key
+
+spotify = importlib.import_module("agent.spotify")
+
+
+def test_key_ignores_case_accents_and_featuring() -> None:
+    assert track_key("Beyoncé", "Crazy in Love (feat. Jay-Z)") == track_key(
+        "beyonce", "Crazy In Love"
+    )
+    assert track_key("Daft Punk", "One More Time") != track_key(
+        "Daft Punk", "One More Time Remix"
+    )
+
+
+def test_negative_results_are_cached_with_their_own_ttl() -> None:
+    cache = TrackCache(negative_ttl_seconds=0)
+    cache.put("Daft Punk", "One More Time", "spotify:track:1")
+    cache.put("Made Up", "Not A Song", None)
+    assert cache.get("daft punk", "one more time") == "spotify:track:1"
+    assert cache.get("Made Up", "Not A Song") is MISSING
+    assert TrackCache().get("x", "y") is MISSING
+
+
+def test_sqlite_backend_is_shared_and_stats_track_hits(tmp_path) -> None:
+    db = str(tmp_path / "tracks.sqlite")
+    TrackCache(db_path=db).put("Daft Punk", "One More Time", "spotify:track:1")
+    TrackCache(db_path=db).put("Made Up", "Not A Song", None)
+
+    cache = TrackCache(db_path=db)
+    assert cache.get("Daft Punk", "One More Time") == "spotify:track:1"
+    assert cache.get("Daft Punk", "One More Time") == "spotify:track:1"
+    assert cache.get("Made Up", "Not A Song") is None
+    assert cache.get("Justice", "D.A.N.C.E.") is MISSING
+    stats = cache.stats()
+    assert (stats["hit_memory"], stats["hit_disk"], stats["miss"]) == (1, 2, 1)
+    assert stats["hit_rate"] == 0.75
+
+
+def test_promoted_entries_expire_with_their_disk_row(tmp_path) -> None:
+    db = str(tmp_path / "tracks.sqlite")
+    now = [1000.0]
+
+    def cache() -> TrackCache:
+        c = TrackCache(negative_ttl_seconds=100, db_path=db)
+        c._memory.clock = c._disk.clock = lambda: now[0]
+        return c
+
+    cache().put("Made Up", "Not A Song", None)
+    now[0] = 1090.0
+    reader = cache()
+    assert reader.get("Made Up", "Not A Song") is None
+    now[0] = 1101.0
+    assert reader.get("Made Up", "Not A Song") is MISSING
+
+
+@pytest.mark.anyio
+async def test_repeat_tracks_skip_the_api(monkeypatch) -> None:
+    monkeypatch.setattr(spotify, "track_cache", TrackCache())
+    tracks = [
+        {"artist": f"Artist {i}", "title": f"Track {i}", "spotify_uri": None}
+        for i in range(4)
+    ]
+    with FakeSpotifyServer(unknown_artists=("Artist 3",)) as server:
+        client = SpotifyClient(
+            "id", "secret", api_url=server.api_url, token_url=server.token_url
+        )
+        configure(client)
+        try:
+            first = await search_tracks(tracks)
+            second = await search_tracks(tracks[::-1])
+        finally:
+            configure(None)
+            await client.aclose()
+
+    assert server.requests["search"] == 4
+    assert second == first[::-1]
+    assert second[0]["spotify_uri"] is None